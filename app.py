@@ -12,12 +12,12 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from app.config.config import Config
-from app.tools.analyseur_logs import AnalyseurLogs
-from app.tools.generateur_scripts import GenerateurScripts
-from app.tools.architecte_docker_k8s import ArchitecteDockerK8s
-from app.tools.troubleshooting_reseau import TroubleshootingReseau
-from app.tools.generateur_doc_infra import GenerateurDocInfra
+from app.utils.metrics import Span
 from app.utils.prompt_loader import PromptLoader
+from app.utils.response_cache import get_response_cache
+
+# Les outils (et le SDK du fournisseur) sont importés à la première utilisation,
+# dans la page correspondante
 
 
 # Configuration de la page
@@ -46,6 +46,41 @@ def _load_secrets_into_config():
 
 _load_secrets_into_config()
 
+
+# Client LLM partagé entre les reruns et les sessions (connexions HTTP réutilisées)
+@st.cache_resource(show_spinner=False)
+def get_llm_client(provider: str, api_key: str, fallback_providers: tuple = ()) -> "LLMClient":
+    from app.utils.llm_client import LLMClient
+
+    return LLMClient(provider=provider, api_key=api_key, fallback_providers=list(fallback_providers))
+
+
+def afficher_estimation(classe_outil, texte, prompt_version: str, **options):
+    """Affiche les tokens et le coût estimés de la requête, sans appeler le LLM (texte ou LogSource)"""
+    if not texte or not Config.get_api_key():
+        return
+    try:
+        outil = classe_outil(
+            prompt_version=prompt_version,
+            llm_client=get_llm_client(
+                Config.LLM_PROVIDER, Config.get_api_key(), tuple(Config.LLM_FALLBACK_PROVIDERS)
+            )
+        )
+        estimation = outil.estimer_cout(texte, prompt_version=prompt_version, **options)
+    except Exception:
+        return
+    message = (
+        f"🔢 Estimation : ~{estimation.tokens_entree:,} tokens en entrée + {estimation.tokens_sortie:,} max en sortie "
+        f"(fenêtre de {estimation.fenetre:,} tokens, {estimation.model})"
+    )
+    if estimation.cout is not None:
+        message += f" · coût max ≈ {estimation.cout:.4f} $"
+    if estimation.depasse:
+        st.warning(f"{message} — la requête dépasse la fenêtre de contexte du modèle")
+    else:
+        st.caption(message)
+
+
 # Titre principal
 st.title("🤖 AI-Powered AdminSysRes Toolkit")
 st.markdown("**Boîte à outils IA pour Administrateurs Système et DevOps**")
@@ -120,6 +155,30 @@ with st.sidebar:
     else:
         Config.GOOGLE_API_KEY = api_key or Config.GOOGLE_API_KEY
     
+    # Fournisseurs de secours (bascule sur erreur ou lenteur)
+    fallback_options = [p for p in providers if p != llm_provider]
+    fallback_providers = st.multiselect(
+        "Fournisseurs de secours",
+        fallback_options,
+        default=[p for p in Config.LLM_FALLBACK_PROVIDERS if p in fallback_options],
+        help="Utilisés dans l'ordre si le fournisseur principal échoue ou dépasse le budget de latence. Seuls les fournisseurs dont la clé est configurée sont utilisés."
+    )
+    Config.LLM_FALLBACK_PROVIDERS = fallback_providers
+    if fallback_providers:
+        Config.LLM_HEDGE_ENABLED = st.checkbox(
+            "Requêtes couvertes (hedging)",
+            value=Config.LLM_HEDGE_ENABLED,
+            help="Double la requête vers le premier fournisseur de secours si la réponse tarde au-delà du p95 observé. La première réponse l'emporte."
+        )
+    
+    st.divider()
+    
+    # Cache des réponses LLM (statistiques remplies en fin de script)
+    st.header("🗄️ Cache des réponses")
+    cache_stats_placeholder = st.empty()
+    if Config.CACHE_ENABLED and st.button("🧹 Vider le cache", use_container_width=True):
+        get_response_cache().clear()
+    
     st.divider()
     
     # Navigation vers les outils
@@ -135,6 +194,9 @@ with st.sidebar:
         ]
     )
 
+# Durée du rendu de la page (chargement du prompt, appels LLM et affichage compris)
+rendu = Span("ui_render", page=tool_selected)
+
 # Contenu principal selon l'outil sélectionné
 if tool_selected == "1. Analyseur de Logs":
     st.header("📊 Analyseur de Logs")
@@ -197,57 +259,281 @@ if tool_selected == "1. Analyseur de Logs":
         placeholder="Collez vos logs ici...\n\nExemple:\n[2025-12-19 10:23:45] ERROR: Database connection failed\n[2025-12-19 10:23:46] WARN: Retry attempt failed"
     )
     
+    # Fichiers téléversés : copiés une fois sur disque puis lus par blocs (mmap),
+    # sans jamais charger tout le fichier décodé en mémoire. Les fichiers compressés
+    # et les archives tar sont décompressés en flux et fusionnés par ordre chronologique.
+    from app.utils.log_archive import EXTENSIONS_ARCHIVES, charger_archives, est_archive
+    from app.utils.log_source import LogSource
+
+    uploaded_files = st.file_uploader(
+        "📄 Ou chargez des fichiers de logs (prioritaires sur la saisie)",
+        type=["txt", "log"] + EXTENSIONS_ARCHIVES,
+        accept_multiple_files=True,
+        help="Fichiers texte, logs rotatés compressés (.gz, .bz2, .xz, .zst) ou archives tar"
+    )
+    source_precedente = st.session_state.get("log_source")
+    if not uploaded_files:
+        if source_precedente is not None:
+            source_precedente.close()
+            del st.session_state["log_source"]
+        log_source = None
+    else:
+        identifiant = tuple(
+            getattr(f, "file_id", None) or (f.name, f.size) for f in uploaded_files
+        )
+        if source_precedente is None or st.session_state.get("log_source_id") != identifiant:
+            if source_precedente is not None:
+                source_precedente.close()
+            copies = []
+            try:
+                for fichier in uploaded_files:
+                    fichier.seek(0)
+                    copies.append(LogSource.spool(fichier, name=fichier.name))
+                if len(copies) == 1 and not est_archive(copies[0].path):
+                    nouvelle_source = copies.pop()
+                else:
+                    with st.spinner("Décompression et fusion des fichiers..."):
+                        nouvelle_source = charger_archives(
+                            [copie.path for copie in copies], noms=[copie.name for copie in copies]
+                        )
+            except Exception as e:
+                st.error(f"❌ Erreur lors de la lecture des fichiers: {e}")
+                nouvelle_source = None
+            finally:
+                for copie in copies:
+                    copie.close()
+            st.session_state.log_source = nouvelle_source
+            st.session_state.log_source_id = identifiant
+        log_source = st.session_state.log_source
+        if log_source is not None:
+            membres = f" ({len(log_source.members)} fichiers fusionnés)" if len(log_source.members) > 1 else ""
+            st.caption(
+                f"**{log_source.name}**{membres} : {log_source.size / (1024 * 1024):.1f} Mo, "
+                f"{log_source.count_lines():,} lignes"
+            )
+    logs = log_source if log_source is not None else logs_input
+    
+    # Options d'analyse par blocs (gros volumes)
+    with st.expander("⚙️ Analyse des gros volumes"):
+        pretraitement = st.checkbox(
+            "Pré-traitement local (regroupement par templates)",
+            value=False,
+            help="Masque les parties variables (IP, UUID, nombres, horodatages) et regroupe les lignes répétées : seul le résumé compact est envoyé au LLM."
+        )
+        agregats = st.checkbox(
+            "Agrégats locaux uniquement (format détecté automatiquement)",
+            value=False,
+            help="Extrait horodatage, sévérité, source et message de chaque ligne (syslog, journald, nginx, Kubernetes, JSON...) : seuls la répartition par sévérité, la chronologie des erreurs et les sources les plus actives sont envoyées au LLM."
+        )
+        mode_blocs = st.checkbox(
+            "Analyse par blocs (map-reduce)",
+            value=False,
+            help="Découpe les logs en blocs analysés en parallèle, puis fusionne les analyses partielles en un rapport unique."
+        )
+        col_bloc1, col_bloc2 = st.columns(2)
+        with col_bloc1:
+            taille_bloc = st.number_input(
+                "Taille d'un bloc (tokens)",
+                min_value=500,
+                max_value=100000,
+                value=Config.LOG_CHUNK_TOKENS,
+                step=500
+            )
+        with col_bloc2:
+            concurrence = st.number_input(
+                "Appels simultanés",
+                min_value=1,
+                max_value=16,
+                value=Config.LOG_CHUNK_CONCURRENCY
+            )
+    
+    # Filtrage local : seules les lignes utiles (et leur contexte) sont envoyées
+    from datetime import datetime, timezone
+    
+    from app.tools.analyseur_logs import AnalyseurLogs
+    from app.utils.log_chunker import estimer_tokens
+    from app.utils.log_filter import NIVEAUX_FILTRE, LogFilter, periode_logs
+    
+    filtre = None
+    with st.expander("🧹 Filtrage local avant envoi"):
+        periode = None
+        if logs:
+            try:
+                periode = periode_logs(logs)
+            except Exception:
+                periode = None
+        plage = None
+        if periode and periode[1] > periode[0]:
+            debut_logs, fin_logs = (
+                datetime.fromtimestamp(t, tz=timezone.utc).replace(tzinfo=None, microsecond=0) for t in periode
+            )
+            if st.checkbox("Restreindre à une plage horaire", value=False):
+                plage = st.slider(
+                    "Plage horaire (UTC)",
+                    min_value=debut_logs,
+                    max_value=fin_logs,
+                    value=(debut_logs, fin_logs),
+                    format="YYYY-MM-DD HH:mm:ss"
+                )
+        elif logs:
+            st.caption("Aucun horodatage reconnu : filtrage par plage horaire indisponible")
+        col_filtre1, col_filtre2 = st.columns(2)
+        with col_filtre1:
+            severite_min = st.selectbox("Sévérité minimale", ["(toutes)"] + list(NIVEAUX_FILTRE))
+        with col_filtre2:
+            contexte = st.number_input("Lignes de contexte (±N)", min_value=0, max_value=100, value=0)
+        inclure = st.text_area("Motifs à inclure (une expression régulière par ligne)", height=68)
+        exclure = st.text_area("Motifs à exclure (une expression régulière par ligne)", height=68)
+        try:
+            filtre = LogFilter(
+                debut=plage[0].replace(tzinfo=timezone.utc).timestamp() if plage else None,
+                fin=plage[1].replace(tzinfo=timezone.utc).timestamp() if plage else None,
+                severite_min=None if severite_min == "(toutes)" else severite_min,
+                inclure=tuple(m.strip() for m in inclure.splitlines()),
+                exclure=tuple(m.strip() for m in exclure.splitlines()),
+                contexte=int(contexte),
+            )
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            filtre = None
+        if filtre is not None and filtre.actif and logs:
+            # Filtrage local : pas de client LLM nécessaire
+            try:
+                resultat_filtre = AnalyseurLogs.filtrer(logs, filtre)
+            except Exception as e:
+                st.error(f"❌ Erreur lors du filtrage: {e}")
+                filtre = None
+            else:
+                tokens_avant = logs.estimated_tokens() if log_source is not None else estimer_tokens(logs_input)
+                tokens_apres = estimer_tokens(resultat_filtre.texte)
+                economie = max(0, tokens_avant - tokens_apres)
+                st.caption(
+                    f"🧹 {resultat_filtre.lignes_retenues:,} ligne(s) retenue(s) + {resultat_filtre.lignes_contexte:,} "
+                    f"de contexte sur {resultat_filtre.lignes_total:,} · ~{economie:,} tokens économisés "
+                    f"({100 * economie / max(1, tokens_avant):.0f} %)"
+                )
+    
+    # Estimation des tokens et du coût, avant l'envoi
+    afficher_estimation(
+        AnalyseurLogs, logs, prompt_version, pretraitement=pretraitement, agregats=agregats, filtre=filtre
+    )
+    
     col1, col2 = st.columns([1, 4])
     
     with col1:
         analyser_btn = st.button("🔍 Analyser", type="primary", use_container_width=True)
     
-    with col2:
-        if st.button("📄 Charger depuis un fichier", use_container_width=True):
-            uploaded_file = st.file_uploader("Choisissez un fichier de logs", type=["txt", "log"])
-            if uploaded_file:
-                logs_input = uploaded_file.read().decode("utf-8")
-                st.rerun()
-    
     # Analyse des logs
-    if analyser_btn and logs_input:
+    if analyser_btn and logs:
         # Test de prompt injection
-        analyseur = AnalyseurLogs(prompt_version=prompt_version)
+        analyseur = AnalyseurLogs(
+            prompt_version=prompt_version,
+            llm_client=get_llm_client(
+                Config.LLM_PROVIDER, Config.get_api_key(), tuple(Config.LLM_FALLBACK_PROVIDERS)
+            )
+        )
         
-        if analyseur.test_prompt_injection(logs_input):
+        injections = analyseur.detecter_injections(logs)
+        if injections:
             st.error("⚠️ Tentative de prompt injection détectée ! Veuillez vérifier vos logs.")
+            for injection in injections[:5]:
+                if log_source is not None:
+                    ligne = log_source.line_of(injection.position)
+                else:
+                    ligne = logs_input.count("\n", 0, injection.position) + 1
+                st.caption(f"Ligne {ligne} : « {injection.text} » (règle : {injection.rule})")
         else:
-            with st.spinner("Analyse en cours..."):
-                try:
-                    # Validation de la configuration
-                    Config.validate()
-                    
-                    # Analyse
-                    resultat = analyseur.analyser(logs_input, prompt_version=prompt_version)
-                    
-                    # Affichage du résultat
-                    st.subheader("📋 Résultat de l'analyse")
-                    st.markdown(f"**Version utilisée** : `{prompt_version}`")
-                    st.markdown("---")
+            try:
+                # Validation de la configuration
+                Config.validate()
+                
+                # Affichage du résultat
+                st.subheader("📋 Résultat de l'analyse")
+                st.markdown(f"**Version utilisée** : `{prompt_version}`")
+                st.markdown("---")
+                
+                # Agrégats calculés localement, affichés avant l'analyse
+                if agregats:
+                    with st.spinner("Extraction des champs..."):
+                        colonnes = analyseur.structurer(logs, filtre=filtre)
+                    with st.expander(f"📈 Agrégats locaux — format {colonnes.format}, {len(colonnes):,} lignes"):
+                        st.bar_chart(colonnes.histogramme_severites())
+                        st.markdown(colonnes.rendu())
+                
+                # Analyse
+                if mode_blocs and not agregats:
+                    with st.spinner("Analyse en cours..."):
+                        barre = st.progress(0.0, text="Analyse des blocs...")
+                        
+                        def _progression(termines, total):
+                            barre.progress(termines / total, text=f"Bloc {termines}/{total} analysé")
+                        
+                        resultat = analyseur.analyser_par_blocs(
+                            logs,
+                            prompt_version=prompt_version,
+                            taille_bloc=int(taille_bloc),
+                            concurrence=int(concurrence),
+                            progression=_progression,
+                            pretraitement=pretraitement,
+                            filtre=filtre
+                        )
+                        barre.empty()
                     st.markdown(resultat)
-                    
-                    # Informations supplémentaires
-                    with st.expander("ℹ️ Informations sur l'analyse"):
-                        st.write(f"- **Version du prompt** : {prompt_version}")
+                else:
+                    # Affichage progressif de l'analyse (streaming)
+                    resultat = st.write_stream(
+                        analyseur.analyser_stream(
+                            logs,
+                            prompt_version=prompt_version,
+                            pretraitement=pretraitement,
+                            agregats=agregats,
+                            filtre=filtre
+                        )
+                    )
+                
+                # Informations supplémentaires
+                with st.expander("ℹ️ Informations sur l'analyse"):
+                    st.write(f"- **Version du prompt** : {prompt_version}")
+                    if log_source is not None:
+                        st.write(f"- **Fichier** : {log_source.name}")
+                        st.write(f"- **Nombre de lignes analysées** : {log_source.count_lines()}")
+                        st.write(f"- **Taille des logs** : {log_source.size} octets")
+                        if log_source.decode_errors:
+                            st.write(
+                                f"- **Encodage** : {log_source.decode_errors} bloc(s) avec des octets invalides "
+                                "(caractères remplacés)"
+                            )
+                    else:
                         st.write(f"- **Nombre de lignes analysées** : {len(logs_input.splitlines())}")
                         st.write(f"- **Taille des logs** : {len(logs_input)} caractères")
-                    
-                    # Bouton de téléchargement
-                    col_dl1, col_dl2 = st.columns([1, 1])
-                    with col_dl1:
-                        st.download_button(
-                            label="💾 Télécharger l'analyse (Markdown)",
-                            data=resultat,
-                            file_name=f"analyse_logs_{prompt_version}_{st.session_state.get('analysis_count', 1)}.md",
-                            mime="text/markdown",
-                            use_container_width=True
+                    if agregats:
+                        st.write("- **Agrégats** : seules les statistiques calculées localement ont été envoyées au LLM")
+                    elif pretraitement:
+                        st.write("- **Pré-traitement** : résumé par templates envoyé au LLM")
+                    if mode_blocs and not agregats:
+                        st.write(f"- **Mode** : analyse par blocs de {int(taille_bloc)} tokens")
+                    usage = None if mode_blocs and not agregats else analyseur.llm_client.last_usage
+                    if usage is not None and usage.cached_response:
+                        st.write("- **Tokens** : réponse servie par le cache local")
+                    elif usage is not None:
+                        st.write(
+                            f"- **Tokens** : {usage.input_tokens} en entrée, {usage.output_tokens} en sortie, "
+                            f"{usage.cache_read_tokens} lus / {usage.cache_write_tokens} écrits dans le cache du fournisseur"
                         )
-                    with col_dl2:
+                
+                # Bouton de téléchargement
+                col_dl1, col_dl2 = st.columns([1, 1])
+                with col_dl1:
+                    st.download_button(
+                        label="💾 Télécharger l'analyse (Markdown)",
+                        data=resultat,
+                        file_name=f"analyse_logs_{prompt_version}_{st.session_state.get('analysis_count', 1)}.md",
+                        mime="text/markdown",
+                        use_container_width=True
+                    )
+                with col_dl2:
+                    # Un fichier téléversé est déjà sur le poste de l'utilisateur : pas de copie en mémoire
+                    if log_source is None:
                         st.download_button(
                             label="📄 Télécharger les logs originaux",
                             data=logs_input,
@@ -255,19 +541,19 @@ if tool_selected == "1. Analyseur de Logs":
                             mime="text/plain",
                             use_container_width=True
                         )
-                    
-                    # Incrémente le compteur d'analyses
-                    if 'analysis_count' not in st.session_state:
-                        st.session_state.analysis_count = 1
-                    else:
-                        st.session_state.analysis_count += 1
-                    
-                except ValueError as e:
-                    st.error(f"❌ Erreur de configuration: {e}")
-                except Exception as e:
-                    st.error(f"❌ Erreur lors de l'analyse: {e}")
-    
-    elif analyser_btn and not logs_input:
+                
+                # Incrémente le compteur d'analyses
+                if 'analysis_count' not in st.session_state:
+                    st.session_state.analysis_count = 1
+                else:
+                    st.session_state.analysis_count += 1
+                
+            except ValueError as e:
+                st.error(f"❌ Erreur de configuration: {e}")
+            except Exception as e:
+                st.error(f"❌ Erreur lors de l'analyse: {e}")
+    
+    elif analyser_btn and not logs:
         st.warning("⚠️ Veuillez entrer des logs à analyser")
 
 elif tool_selected == "2. Générateur de Scripts":
@@ -315,36 +601,48 @@ elif tool_selected == "2. Générateur de Scripts":
         placeholder="Exemple: Script pour sauvegarder un dossier vers S3 avec rotation des backups..."
     )
     
+    # Estimation des tokens et du coût, avant l'envoi
+    from app.tools.generateur_scripts import GenerateurScripts
+
+    afficher_estimation(GenerateurScripts, besoin_input, prompt_version)
+    
     col1, col2 = st.columns([1, 4])
     with col1:
         generer_btn = st.button("🚀 Générer", type="primary", use_container_width=True)
     
     # Génération du script
     if generer_btn and besoin_input:
-        generateur = GenerateurScripts(prompt_version=prompt_version)
+        generateur = GenerateurScripts(
+            prompt_version=prompt_version,
+            llm_client=get_llm_client(
+                Config.LLM_PROVIDER, Config.get_api_key(), tuple(Config.LLM_FALLBACK_PROVIDERS)
+            )
+        )
         
         if generateur.test_prompt_injection(besoin_input):
             st.error("⚠️ Tentative de prompt injection détectée !")
         else:
-            with st.spinner("Génération en cours..."):
-                try:
-                    Config.validate()
-                    resultat = generateur.generer(besoin_input, prompt_version=prompt_version)
-                    
-                    st.subheader("📋 Script généré")
-                    st.markdown(f"**Version utilisée** : `{prompt_version}`")
-                    st.markdown("---")
-                    st.markdown(resultat)
-                    
-                    st.download_button(
-                        label="💾 Télécharger le script",
-                        data=resultat,
-                        file_name=f"script_{prompt_version}.sh",
-                        mime="text/plain",
-                        use_container_width=True
-                    )
-                except Exception as e:
-                    st.error(f"❌ Erreur lors de la génération: {e}")
+            try:
+                Config.validate()
+                
+                st.subheader("📋 Script généré")
+                st.markdown(f"**Version utilisée** : `{prompt_version}`")
+                st.markdown("---")
+                
+                # Affichage progressif de la réponse (streaming)
+                resultat = st.write_stream(
+                    generateur.generer_stream(besoin_input, prompt_version=prompt_version)
+                )
+                
+                st.download_button(
+                    label="💾 Télécharger le script",
+                    data=resultat,
+                    file_name=f"script_{prompt_version}.sh",
+                    mime="text/plain",
+                    use_container_width=True
+                )
+            except Exception as e:
+                st.error(f"❌ Erreur lors de la génération: {e}")
     
     elif generer_btn and not besoin_input:
         st.warning("⚠️ Veuillez décrire votre besoin")
@@ -394,36 +692,48 @@ elif tool_selected == "3. Architecte Docker/K8s":
         placeholder="Exemple: Application Flask Python avec base de données PostgreSQL, besoin de scalabilité..."
     )
     
+    # Estimation des tokens et du coût, avant l'envoi
+    from app.tools.architecte_docker_k8s import ArchitecteDockerK8s
+
+    afficher_estimation(ArchitecteDockerK8s, besoins_input, prompt_version)
+    
     col1, col2 = st.columns([1, 4])
     with col1:
         generer_btn = st.button("🚀 Générer", type="primary", use_container_width=True)
     
     # Génération des configurations
     if generer_btn and besoins_input:
-        architecte = ArchitecteDockerK8s(prompt_version=prompt_version)
+        architecte = ArchitecteDockerK8s(
+            prompt_version=prompt_version,
+            llm_client=get_llm_client(
+                Config.LLM_PROVIDER, Config.get_api_key(), tuple(Config.LLM_FALLBACK_PROVIDERS)
+            )
+        )
         
         if architecte.test_prompt_injection(besoins_input):
             st.error("⚠️ Tentative de prompt injection détectée !")
         else:
-            with st.spinner("Génération en cours..."):
-                try:
-                    Config.validate()
-                    resultat = architecte.generer(besoins_input, prompt_version=prompt_version)
-                    
-                    st.subheader("📋 Configurations générées")
-                    st.markdown(f"**Version utilisée** : `{prompt_version}`")
-                    st.markdown("---")
-                    st.markdown(resultat)
-                    
-                    st.download_button(
-                        label="💾 Télécharger les configurations",
-                        data=resultat,
-                        file_name=f"docker_k8s_{prompt_version}.yaml",
-                        mime="text/yaml",
-                        use_container_width=True
-                    )
-                except Exception as e:
-                    st.error(f"❌ Erreur lors de la génération: {e}")
+            try:
+                Config.validate()
+                
+                st.subheader("📋 Configurations générées")
+                st.markdown(f"**Version utilisée** : `{prompt_version}`")
+                st.markdown("---")
+                
+                # Affichage progressif de la réponse (streaming)
+                resultat = st.write_stream(
+                    architecte.generer_stream(besoins_input, prompt_version=prompt_version)
+                )
+                
+                st.download_button(
+                    label="💾 Télécharger les configurations",
+                    data=resultat,
+                    file_name=f"docker_k8s_{prompt_version}.yaml",
+                    mime="text/yaml",
+                    use_container_width=True
+                )
+            except Exception as e:
+                st.error(f"❌ Erreur lors de la génération: {e}")
     
     elif generer_btn and not besoins_input:
         st.warning("⚠️ Veuillez décrire vos besoins")
@@ -473,36 +783,48 @@ elif tool_selected == "4. Troubleshooting Réseau":
         placeholder="Exemple: Je ne peux pas me connecter à un serveur distant, timeout sur les requêtes..."
     )
     
+    # Estimation des tokens et du coût, avant l'envoi
+    from app.tools.troubleshooting_reseau import TroubleshootingReseau
+
+    afficher_estimation(TroubleshootingReseau, probleme_input, prompt_version)
+    
     col1, col2 = st.columns([1, 4])
     with col1:
         diagnostiquer_btn = st.button("🔍 Diagnostiquer", type="primary", use_container_width=True)
     
     # Diagnostic
     if diagnostiquer_btn and probleme_input:
-        troubleshooting = TroubleshootingReseau(prompt_version=prompt_version)
+        troubleshooting = TroubleshootingReseau(
+            prompt_version=prompt_version,
+            llm_client=get_llm_client(
+                Config.LLM_PROVIDER, Config.get_api_key(), tuple(Config.LLM_FALLBACK_PROVIDERS)
+            )
+        )
         
         if troubleshooting.test_prompt_injection(probleme_input):
             st.error("⚠️ Tentative de prompt injection détectée !")
         else:
-            with st.spinner("Diagnostic en cours..."):
-                try:
-                    Config.validate()
-                    resultat = troubleshooting.diagnostiquer(probleme_input, prompt_version=prompt_version)
-                    
-                    st.subheader("📋 Diagnostic et solutions")
-                    st.markdown(f"**Version utilisée** : `{prompt_version}`")
-                    st.markdown("---")
-                    st.markdown(resultat)
-                    
-                    st.download_button(
-                        label="💾 Télécharger le diagnostic",
-                        data=resultat,
-                        file_name=f"diagnostic_reseau_{prompt_version}.md",
-                        mime="text/markdown",
-                        use_container_width=True
-                    )
-                except Exception as e:
-                    st.error(f"❌ Erreur lors du diagnostic: {e}")
+            try:
+                Config.validate()
+                
+                st.subheader("📋 Diagnostic et solutions")
+                st.markdown(f"**Version utilisée** : `{prompt_version}`")
+                st.markdown("---")
+                
+                # Affichage progressif de la réponse (streaming)
+                resultat = st.write_stream(
+                    troubleshooting.diagnostiquer_stream(probleme_input, prompt_version=prompt_version)
+                )
+                
+                st.download_button(
+                    label="💾 Télécharger le diagnostic",
+                    data=resultat,
+                    file_name=f"diagnostic_reseau_{prompt_version}.md",
+                    mime="text/markdown",
+                    use_container_width=True
+                )
+            except Exception as e:
+                st.error(f"❌ Erreur lors du diagnostic: {e}")
     
     elif diagnostiquer_btn and not probleme_input:
         st.warning("⚠️ Veuillez décrire votre problème")
@@ -552,40 +874,62 @@ elif tool_selected == "5. Générateur de Documentation":
         placeholder="Exemple: Architecture microservices avec API Gateway, 3 services backend, base de données PostgreSQL, cache Redis..."
     )
     
+    # Estimation des tokens et du coût, avant l'envoi
+    from app.tools.generateur_doc_infra import GenerateurDocInfra
+
+    afficher_estimation(GenerateurDocInfra, infra_input, prompt_version)
+    
     col1, col2 = st.columns([1, 4])
     with col1:
         generer_btn = st.button("🚀 Générer", type="primary", use_container_width=True)
     
     # Génération de la documentation
     if generer_btn and infra_input:
-        generateur = GenerateurDocInfra(prompt_version=prompt_version)
+        generateur = GenerateurDocInfra(
+            prompt_version=prompt_version,
+            llm_client=get_llm_client(
+                Config.LLM_PROVIDER, Config.get_api_key(), tuple(Config.LLM_FALLBACK_PROVIDERS)
+            )
+        )
         
         if generateur.test_prompt_injection(infra_input):
             st.error("⚠️ Tentative de prompt injection détectée !")
         else:
-            with st.spinner("Génération en cours..."):
-                try:
-                    Config.validate()
-                    resultat = generateur.generer(infra_input, prompt_version=prompt_version)
-                    
-                    st.subheader("📋 Documentation générée")
-                    st.markdown(f"**Version utilisée** : `{prompt_version}`")
-                    st.markdown("---")
-                    st.markdown(resultat)
-                    
-                    st.download_button(
-                        label="💾 Télécharger la documentation",
-                        data=resultat,
-                        file_name=f"doc_infra_{prompt_version}.md",
-                        mime="text/markdown",
-                        use_container_width=True
-                    )
-                except Exception as e:
-                    st.error(f"❌ Erreur lors de la génération: {e}")
+            try:
+                Config.validate()
+                
+                st.subheader("📋 Documentation générée")
+                st.markdown(f"**Version utilisée** : `{prompt_version}`")
+                st.markdown("---")
+                
+                # Affichage progressif de la réponse (streaming)
+                resultat = st.write_stream(
+                    generateur.generer_stream(infra_input, prompt_version=prompt_version)
+                )
+                
+                st.download_button(
+                    label="💾 Télécharger la documentation",
+                    data=resultat,
+                    file_name=f"doc_infra_{prompt_version}.md",
+                    mime="text/markdown",
+                    use_container_width=True
+                )
+            except Exception as e:
+                st.error(f"❌ Erreur lors de la génération: {e}")
     
     elif generer_btn and not infra_input:
         st.warning("⚠️ Veuillez décrire votre infrastructure")
 
+# Statistiques du cache, après l'exécution de l'outil pour inclure la requête courante
+if Config.CACHE_ENABLED:
+    cache_stats = get_response_cache().stats()
+    cache_stats_placeholder.caption(
+        f"Hits : {cache_stats['hits']} | Misses : {cache_stats['misses']} | "
+        f"Entrées : {cache_stats['entries']}"
+    )
+else:
+    cache_stats_placeholder.caption("Cache désactivé (CACHE_ENABLED=false)")
+
 # Footer
 st.divider()
 st.markdown(
@@ -597,3 +941,4 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+rendu.finish()
@@ -0,0 +1,9 @@
+"""Point d'entrée : python -m app <outil> [fichiers] [options]"""
+
+import sys
+
+from app.cli import main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,548 @@
+"""
+Interface en ligne de commande du toolkit (sans navigateur)
+Usage : python -m app <outil> [fichiers|globs|-] [options]
+
+N'importe ni streamlit ni les SDK des fournisseurs au démarrage : seuls
+l'outil demandé et le SDK du fournisseur configuré sont chargés.
+"""
+
+import argparse
+import glob
+import importlib
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# Sous-commande -> (module, classe, méthode)
+TOOLS: Dict[str, Tuple[str, str, str]] = {
+    "analyser": ("app.tools.analyseur_logs", "AnalyseurLogs", "analyser"),
+    "generer-script": ("app.tools.generateur_scripts", "GenerateurScripts", "generer"),
+    "generer-docker-k8s": ("app.tools.architecte_docker_k8s", "ArchitecteDockerK8s", "generer"),
+    "diagnostiquer": ("app.tools.troubleshooting_reseau", "TroubleshootingReseau", "diagnostiquer"),
+    "generer-doc": ("app.tools.generateur_doc_infra", "GenerateurDocInfra", "generer"),
+}
+
+TOOL_HELP = {
+    "analyser": "Analyse de logs",
+    "generer-script": "Génération de scripts Bash/Python",
+    "generer-docker-k8s": "Configurations Docker/Kubernetes",
+    "diagnostiquer": "Troubleshooting réseau",
+    "generer-doc": "Documentation d'infrastructure (Mermaid)",
+}
+
+# Préfixes des messages d'erreur retournés (et non levés) par les outils
+ERROR_PREFIXES = ("Erreur lors de l'analyse:", "Erreur lors de la génération:", "Erreur lors du diagnostic:")
+
+STDIN = "-"
+
+
+def _load_dotenv():
+    """Charge .env si python-dotenv est installé (optionnel en CLI)"""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Construit l'analyseur d'arguments"""
+    parser = argparse.ArgumentParser(
+        prog="python -m app",
+        description="AI-Powered AdminSysRes Toolkit en ligne de commande",
+    )
+    subparsers = parser.add_subparsers(dest="outil", metavar="outil")
+    subparsers.required = True
+
+    for name, help_text in TOOL_HELP.items():
+        sub = subparsers.add_parser(name, help=help_text, description=help_text)
+        sub.add_argument(
+            "entrees",
+            nargs="*",
+            default=[STDIN],
+            help="Fichiers ou globs à traiter ('-' pour l'entrée standard, par défaut)",
+        )
+        sub.add_argument("--version", "-V", dest="prompt_version", default="vFinal",
+                         help="Version du prompt (défaut: vFinal)")
+        sub.add_argument("--fournisseur", choices=["openai", "claude", "google", "mock"],
+                         help="Fournisseur LLM (défaut: LLM_PROVIDER)")
+        sub.add_argument("--workers", "-j", type=int, default=4,
+                         help="Nombre d'entrées traitées simultanément (défaut: 4)")
+        sub.add_argument("--format", "-f", choices=["jsonl", "markdown"], default="jsonl",
+                         help="Format de sortie (défaut: jsonl)")
+        sub.add_argument("--sortie", "-o",
+                         help="Fichier JSONL, ou dossier des fichiers Markdown (défaut: sortie standard)")
+        sub.add_argument("--sans-cache", action="store_true",
+                         help="Désactive le cache des réponses")
+        sub.add_argument("--ignorer-injection", action="store_true",
+                         help="Traite les entrées même si une prompt injection est détectée")
+        if name == "analyser":
+            sub.add_argument("--pretraitement", action="store_true",
+                             help="Envoie un résumé par templates au lieu des logs bruts")
+            sub.add_argument("--agregats", action="store_true",
+                             help="Envoie uniquement les agrégats calculés localement (format détecté)")
+            sub.add_argument("--format-logs",
+                             help="Format des logs pour --agregats (défaut: détecté sur les premières lignes)")
+            sub.add_argument("--depuis",
+                             help="Ne garde que les lignes postérieures à cette date (ex: 2024-01-15T10:00:00Z)")
+            sub.add_argument("--jusqua",
+                             help="Ne garde que les lignes antérieures à cette date")
+            sub.add_argument("--severite-min",
+                             choices=["DEBUG", "INFO", "NOTICE", "WARNING", "ERROR", "CRITICAL", "FATAL"],
+                             help="Sévérité minimale des lignes envoyées")
+            sub.add_argument("--inclure", action="append", default=[], metavar="REGEX",
+                             help="Ne garde que les lignes correspondant à ce motif (répétable)")
+            sub.add_argument("--exclure", action="append", default=[], metavar="REGEX",
+                             help="Écarte les lignes correspondant à ce motif (répétable)")
+            sub.add_argument("--contexte", "-C", type=int, default=0,
+                             help="Lignes de contexte conservées autour des lignes retenues (défaut: 0)")
+            sub.add_argument("--blocs", action="store_true",
+                             help="Analyse par blocs (map-reduce) des gros volumes")
+            sub.add_argument("--taille-bloc", type=int,
+                             help="Budget de tokens par bloc en mode --blocs")
+
+    evaluer = subparsers.add_parser(
+        "evaluer",
+        help="Comparaison des versions de prompts sur un jeu de cas",
+        description="Compare les versions de prompts et les fournisseurs sur un jeu de cas JSONL",
+    )
+    evaluer.add_argument("jeu", help="Jeu de cas JSONL (voir app/evaluation.py)")
+    evaluer.add_argument("--versions", nargs="+", help="Versions à comparer (défaut: toutes)")
+    evaluer.add_argument("--fournisseurs", nargs="+", choices=["openai", "claude", "google", "mock"],
+                         help="Fournisseurs à comparer (défaut: LLM_PROVIDER et LLM_FALLBACK_PROVIDERS)")
+    evaluer.add_argument("--workers", "-j", type=int, default=4,
+                         help="Exécutions simultanées (défaut: 4)")
+    evaluer.add_argument("--format", "-f", choices=["markdown", "json"], default="markdown",
+                         help="Format du rapport (défaut: markdown)")
+    evaluer.add_argument("--sortie", "-o", help="Fichier du rapport (défaut: sortie standard)")
+    evaluer.add_argument("--tolerance", type=float, default=0.05,
+                         help="Écart de score toléré par rapport à la meilleure version (défaut: 0.05)")
+    evaluer.add_argument("--rafraichir", action="store_true",
+                         help="Ignore les résultats en cache et rappelle le LLM")
+
+    suivre = subparsers.add_parser(
+        "suivre",
+        help="Suivi continu de logs (à la manière de tail -F)",
+        description="Suit des fichiers de logs ou l'entrée standard et analyse les nouvelles lignes "
+                    "lorsqu'un seuil d'erreurs ou une fenêtre de temps est atteint",
+    )
+    suivre.add_argument("entrees", nargs="*", default=[STDIN],
+                        help="Fichiers à suivre ('-' pour l'entrée standard, par défaut)")
+    suivre.add_argument("--version", "-V", dest="prompt_version", default="vFinal",
+                        help="Version du prompt (défaut: vFinal)")
+    suivre.add_argument("--fournisseur", choices=["openai", "claude", "google", "mock"],
+                        help="Fournisseur LLM (défaut: LLM_PROVIDER)")
+    suivre.add_argument("--format", "-f", choices=["jsonl", "markdown"], default="jsonl",
+                        help="Format de sortie (défaut: jsonl)")
+    suivre.add_argument("--sans-cache", action="store_true",
+                        help="Désactive le cache des réponses")
+    suivre.add_argument("--ignorer-injection", action="store_true",
+                        help="Envoie les nouvelles lignes même si une prompt injection est détectée")
+    suivre.add_argument("--depuis-debut", action="store_true",
+                        help="Lit aussi le contenu existant des fichiers (défaut: seules les nouvelles lignes)")
+    suivre.add_argument("--seuil-erreurs", type=int,
+                        help="Lignes d'erreur déclenchant une analyse (défaut: LOG_FOLLOW_ERROR_THRESHOLD)")
+    suivre.add_argument("--seuil-nouvelles-erreurs", type=int,
+                        help="Nouveaux types d'erreurs déclenchant une analyse "
+                             "(défaut: LOG_FOLLOW_NEW_ERROR_TEMPLATES)")
+    suivre.add_argument("--intervalle", type=float,
+                        help="Secondes au bout desquelles les nouvelles lignes sont analysées "
+                             "(défaut: LOG_FOLLOW_WINDOW_SECONDS)")
+    suivre.add_argument("--delai-min", type=float,
+                        help="Secondes minimum entre deux analyses (défaut: LOG_FOLLOW_COOLDOWN_SECONDS)")
+    suivre.add_argument("--duree", type=float,
+                        help="Durée maximale du suivi en secondes (défaut: jusqu'à Ctrl+C ou la fin de l'entrée)")
+
+    return parser
+
+
+def expand_inputs(patterns: List[str]) -> List[str]:
+    """
+    Développe les globs en liste de fichiers (dédoublonnée, ordre conservé)
+
+    Raises:
+        FileNotFoundError: Si un motif ne correspond à aucun fichier
+    """
+    paths: List[str] = []
+    for pattern in patterns:
+        if pattern == STDIN:
+            paths.append(STDIN)
+            continue
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches:
+            raise FileNotFoundError(f"Aucun fichier ne correspond à: {pattern}")
+        paths.extend(m for m in matches if os.path.isfile(m))
+    return list(dict.fromkeys(paths))
+
+
+def _iter_lines(path: str) -> Iterator[str]:
+    """Lit un fichier ligne par ligne (mémoire bornée)"""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        yield from f
+
+
+def _is_archive(path: str) -> bool:
+    """Fichier compressé (.gz, .bz2, .xz, .zst) ou archive tar"""
+    from app.utils.log_archive import est_archive
+
+    return est_archive(path)
+
+
+def _read_input(path: str) -> str:
+    if path == STDIN:
+        return sys.stdin.read()
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def build_filter(args: argparse.Namespace):
+    """
+    Filtre local construit à partir des options (--depuis, --severite-min, --inclure...)
+
+    Returns:
+        LogFilter, ou None si aucun critère n'est demandé
+
+    Raises:
+        ValueError: Si une date ou une expression régulière est invalide
+    """
+    from app.utils.log_archive import extraire_horodatage
+    from app.utils.log_filter import LogFilter
+
+    bornes = []
+    for option, valeur in (("--depuis", args.depuis), ("--jusqua", args.jusqua)):
+        horodatage = extraire_horodatage(valeur) if valeur else None
+        if valeur and horodatage is None:
+            raise ValueError(f"Date invalide pour {option}: {valeur} (format attendu: 2024-01-15T10:00:00Z)")
+        bornes.append(horodatage)
+    filtre = LogFilter(
+        debut=bornes[0],
+        fin=bornes[1],
+        severite_min=args.severite_min,
+        inclure=tuple(args.inclure),
+        exclure=tuple(args.exclure),
+        contexte=args.contexte,
+    )
+    return filtre if filtre.actif else None
+
+
+def process_input(tool, method: str, path: str, args: argparse.Namespace) -> Dict:
+    """
+    Traite une entrée et retourne l'enregistrement de résultat
+
+    Args:
+        tool: Instance de l'outil
+        method: Méthode à appeler (analyser, generer, diagnostiquer)
+        path: Chemin du fichier, ou '-' pour l'entrée standard
+        args: Arguments de la ligne de commande
+
+    Returns:
+        Enregistrement (source, outil, version, resultat, erreur, duree)
+    """
+    record = {
+        "source": "<stdin>" if path == STDIN else path,
+        "outil": args.outil,
+        "version": args.prompt_version,
+        "resultat": None,
+        "erreur": None,
+    }
+    start = time.monotonic()
+    archive = None
+    filtre = getattr(args, "filtre", None)
+    try:
+        if args.outil != "analyser":
+            contenu = _read_input(path)
+        else:
+            if path != STDIN and _is_archive(path):
+                # Fichier compressé ou archive tar : décompressé en flux, lu par blocs
+                from app.utils.log_archive import charger_archives
+
+                source = archive = charger_archives([path])
+            elif path != STDIN and filtre is not None:
+                # Fichier filtré : lu par blocs, l'index des horodatages évite de tout parcourir
+                from app.utils.log_source import LogSource
+
+                source = archive = LogSource(path)
+            elif args.agregats or args.pretraitement or filtre is not None:
+                # Traitement en flux, sans charger le fichier
+                source = sys.stdin if path == STDIN else _iter_lines(path)
+            else:
+                source = _read_input(path)
+
+            resultat_filtre = None
+            if filtre is not None:
+                resultat_filtre = tool.filtrer(source, filtre)
+                record["filtre"] = {
+                    "lignes_total": resultat_filtre.lignes_total,
+                    "lignes_retenues": resultat_filtre.lignes_retenues,
+                    "lignes_contexte": resultat_filtre.lignes_contexte,
+                }
+                source = resultat_filtre.texte
+
+            if args.agregats:
+                # Seuls les agrégats calculés localement sont envoyés au LLM
+                if resultat_filtre is not None:
+                    # Lignes conservées seulement (sans les marqueurs), au format détecté avant filtrage
+                    contenu = tool.structurer(
+                        resultat_filtre.lignes, args.format_logs or resultat_filtre.format
+                    ).rendu()
+                else:
+                    contenu = tool.structurer(source, args.format_logs).rendu()
+            elif args.pretraitement:
+                contenu = tool.resumer(source)
+            else:
+                contenu = source
+
+        if not args.ignorer_injection:
+            if contenu is archive:
+                injection = bool(tool.detecter_injections(archive))
+            else:
+                injection = tool.test_prompt_injection(contenu)
+            if injection:
+                record["erreur"] = "Tentative de prompt injection détectée"
+                return record
+
+        if args.outil == "analyser" and args.blocs:
+            resultat = tool.analyser_par_blocs(
+                contenu, prompt_version=args.prompt_version, taille_bloc=args.taille_bloc
+            )
+        else:
+            resultat = getattr(tool, method)(contenu, prompt_version=args.prompt_version)
+
+        if resultat.startswith(ERROR_PREFIXES):
+            record["erreur"] = resultat
+        else:
+            record["resultat"] = resultat
+    except Exception as e:
+        record["erreur"] = str(e)
+    finally:
+        if archive is not None:
+            archive.close()
+        record["duree"] = round(time.monotonic() - start, 3)
+    return record
+
+
+def _markdown_name(source: str, outil: str, version: str, chemin_complet: bool = False) -> str:
+    if source in (STDIN, "<stdin>"):
+        base = "stdin"
+    elif chemin_complet:
+        # Chemin relatif, séparateurs remplacés : a/app.log -> a_app.log
+        relatif = os.path.relpath(source) if not os.path.isabs(source) else source.lstrip(os.sep)
+        base = relatif.replace(os.sep, "_").replace("/", "_").lstrip("._") or "entree"
+    else:
+        base = os.path.basename(source)
+    return f"{os.path.splitext(base)[0]}_{outil}_{version}.md"
+
+
+def _markdown_names(sources: List[str], outil: str, version: str) -> Dict[str, str]:
+    """
+    Noms des fichiers Markdown, uniques dans le dossier de sortie
+
+    Le nom de base suffit en général ; les entrées de même nom de base
+    (a/app.log, b/app.log) prennent leur chemin relatif, et un dernier
+    conflit éventuel un suffixe numérique.
+    """
+    simples = {source: _markdown_name(source, outil, version) for source in sources}
+    occurrences = Counter(simples.values())
+    noms: Dict[str, str] = {}
+    pris: set = set()
+    for source in sources:
+        nom = simples[source]
+        if occurrences[nom] > 1:
+            nom = _markdown_name(source, outil, version, chemin_complet=True)
+        racine, indice = nom[:-len(".md")], 2
+        while nom in pris:
+            nom = f"{racine}_{indice}.md"
+            indice += 1
+        pris.add(nom)
+        noms[source] = nom
+    return noms
+
+
+class _Writer:
+    """Écrit les résultats au fil de l'eau, au format demandé"""
+
+    def __init__(self, fmt: str, destination: Optional[str], noms: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            fmt: Format de sortie (markdown ou jsonl)
+            destination: Fichier JSONL ou dossier des fichiers Markdown (par défaut: sortie standard)
+            noms: Source -> nom du fichier Markdown (voir _markdown_names)
+        """
+        self.fmt = fmt
+        self.destination = destination
+        self.noms = noms or {}
+        self._stream = None
+        if fmt == "jsonl":
+            self._stream = open(destination, "w", encoding="utf-8") if destination else sys.stdout
+        elif destination:
+            os.makedirs(destination, exist_ok=True)
+
+    def write(self, record: Dict):
+        if self.fmt == "jsonl":
+            self._stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._stream.flush()
+            return
+
+        if record["erreur"]:
+            print(f"[{record['source']}] {record['erreur']}", file=sys.stderr)
+            return
+        if self.destination:
+            name = self.noms.get(record["source"]) or _markdown_name(
+                record["source"], record["outil"], record["version"]
+            )
+            with open(os.path.join(self.destination, name), "w", encoding="utf-8") as f:
+                f.write(record["resultat"])
+        else:
+            sys.stdout.write(f"<!-- {record['source']} -->\n{record['resultat']}\n\n")
+            sys.stdout.flush()
+
+    def close(self):
+        if self._stream is not None and self._stream is not sys.stdout:
+            self._stream.close()
+
+
+def follow(args: argparse.Namespace) -> int:
+    """
+    Sous-commande suivre : suivi continu, une ligne (ou section Markdown) par analyse déclenchée
+
+    Returns:
+        0 à la fin du suivi (fin de l'entrée, --duree ou Ctrl+C), 2 si arguments invalides
+    """
+    from app.tools.analyseur_logs import AnalyseurLogs
+    from app.utils.log_follow import SeuilsSuivi, SuiviFichier, SuiviFlux
+
+    if args.entrees.count(STDIN) > 1:
+        print("Erreur: l'entrée standard ne peut être lue qu'une fois", file=sys.stderr)
+        return 2
+    try:
+        seuils = SeuilsSuivi(
+            erreurs=args.seuil_erreurs,
+            nouvelles_erreurs=args.seuil_nouvelles_erreurs,
+            intervalle=args.intervalle,
+            delai_min=args.delai_min,
+        )
+    except ValueError as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 2
+
+    # Les fichiers absents sont suivis dès leur création (rotation en cours, service pas encore démarré)
+    suivis = [
+        SuiviFlux(sys.stdin) if path == STDIN else SuiviFichier(path, depuis_debut=args.depuis_debut)
+        for path in args.entrees
+    ]
+    tool = AnalyseurLogs(prompt_version=args.prompt_version)
+    writer = _Writer(args.format, None)
+
+    # Ctrl+C termine le suivi proprement : les lignes reçues depuis la dernière
+    # analyse sont encore analysées (motif "fin") ; un second Ctrl+C interrompt tout
+    arret = threading.Event()
+
+    def interrompre(signum, frame):
+        if arret.is_set():
+            raise KeyboardInterrupt
+        print("Arrêt du suivi : analyse des dernières lignes (Ctrl+C à nouveau pour quitter)", file=sys.stderr)
+        arret.set()
+
+    gestionnaire_precedent = signal.signal(signal.SIGINT, interrompre)
+    try:
+        for declenchement in tool.suivre(
+            suivis,
+            seuils=seuils,
+            verifier_injection=not args.ignorer_injection,
+            duree=args.duree,
+            arret=arret,
+        ):
+            erreur = declenchement.resultat.startswith(ERROR_PREFIXES)
+            writer.write({
+                "source": declenchement.source,
+                "outil": args.outil,
+                "version": args.prompt_version,
+                "motif": declenchement.motif,
+                "lignes": declenchement.lignes,
+                "erreurs": declenchement.erreurs,
+                "nouvelles_erreurs": declenchement.nouvelles_erreurs,
+                "horodatage": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(declenchement.horodatage)),
+                "resultat": None if erreur else declenchement.resultat,
+                "erreur": declenchement.resultat if erreur else None,
+            })
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGINT, gestionnaire_precedent)
+        for suivi in suivis:
+            suivi.fermer()
+        writer.close()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Point d'entrée de la CLI
+
+    Returns:
+        0 si toutes les entrées ont été traitées, 1 en cas d'erreur, 2 si arguments invalides
+    """
+    args = build_parser().parse_args(argv)
+    _load_dotenv()
+
+    if args.outil == "evaluer":
+        from app.evaluation import main as evaluer
+        return evaluer(args)
+
+    from app.config.config import Config
+
+    if args.fournisseur:
+        Config.LLM_PROVIDER = args.fournisseur
+    if args.sans_cache:
+        Config.CACHE_ENABLED = False
+
+    if args.outil == "suivre":
+        try:
+            Config.validate()
+        except ValueError as e:
+            print(f"Erreur: {e}", file=sys.stderr)
+            return 2
+        return follow(args)
+
+    try:
+        Config.validate()
+        paths = expand_inputs(args.entrees)
+        args.filtre = build_filter(args) if args.outil == "analyser" else None
+    except (ValueError, FileNotFoundError) as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 2
+
+    if paths.count(STDIN) > 1:
+        print("Erreur: l'entrée standard ne peut être lue qu'une fois", file=sys.stderr)
+        return 2
+
+    module_name, class_name, method = TOOLS[args.outil]
+    tool_class = getattr(importlib.import_module(module_name), class_name)
+    tool = tool_class(prompt_version=args.prompt_version)
+
+    noms = None
+    if args.format == "markdown":
+        noms = _markdown_names(
+            ["<stdin>" if path == STDIN else path for path in paths], args.outil, args.prompt_version
+        )
+    writer = _Writer(args.format, args.sortie, noms)
+    failures = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            futures = [executor.submit(process_input, tool, method, path, args) for path in paths]
+            for future in as_completed(futures):
+                record = future.result()
+                if record["erreur"]:
+                    failures += 1
+                writer.write(record)
+    finally:
+        writer.close()
+
+    return 1 if failures else 0
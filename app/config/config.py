@@ -4,7 +4,7 @@ Gère les variables d'environnement et la configuration des LLM
 """
 
 import os
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 
@@ -13,6 +13,7 @@ class LLMProvider(str, Enum):
     OPENAI = "openai"
     CLAUDE = "claude"
     GOOGLE = "google"
+    MOCK = "mock"  # Réponses simulées, sans réseau (benchmarks, essais hors ligne)
 
 
 class Config:
@@ -28,15 +29,119 @@ class Config:
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4")
     CLAUDE_MODEL: str = os.getenv("CLAUDE_MODEL", "claude-3-5-sonnet-20241022")
     GOOGLE_MODEL: str = os.getenv("GOOGLE_MODEL", "gemini-1.5-pro")
+    MOCK_MODEL: str = os.getenv("MOCK_MODEL", "mock-1")
+    
+    # Fournisseur simulé : latence avant le premier token (s), débit (tokens/s, 0 = instantané),
+    # taille des réponses synthétiques (tokens) et réponse fixe optionnelle
+    MOCK_LATENCY: float = float(os.getenv("MOCK_LATENCY", "0.05"))
+    MOCK_TOKENS_PER_SECOND: float = float(os.getenv("MOCK_TOKENS_PER_SECOND", "200"))
+    MOCK_OUTPUT_TOKENS: int = int(os.getenv("MOCK_OUTPUT_TOKENS", "256"))
+    MOCK_RESPONSE: Optional[str] = os.getenv("MOCK_RESPONSE")
+    
+    # Claude : prompt système marqué comme mis en cache (cache_control)
+    CLAUDE_PROMPT_CACHE: bool = os.getenv("CLAUDE_PROMPT_CACHE", "true").lower() in ("1", "true", "yes")
+    
+    # Gemini : modèles réutilisés et mise en cache du prompt système côté Google
+    GOOGLE_MODEL_CACHE_SIZE: int = int(os.getenv("GOOGLE_MODEL_CACHE_SIZE", "32"))
+    GOOGLE_CONTEXT_CACHE: bool = os.getenv("GOOGLE_CONTEXT_CACHE", "false").lower() in ("1", "true", "yes")
+    GOOGLE_CONTEXT_CACHE_TTL: int = int(os.getenv("GOOGLE_CONTEXT_CACHE_TTL", "3600"))
+    GOOGLE_CONTEXT_CACHE_MIN_TOKENS: int = int(os.getenv("GOOGLE_CONTEXT_CACHE_MIN_TOKENS", "4096"))
     
     # Paramètres de génération
     TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.3"))
     MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "2000"))
     
+    # Fenêtre de contexte : 0 = table des modèles ; politique de dépassement "reject" ou "truncate"
+    CONTEXT_WINDOW: int = int(os.getenv("CONTEXT_WINDOW", "0"))
+    CONTEXT_OVERFLOW_POLICY: str = os.getenv("CONTEXT_OVERFLOW_POLICY", "reject")
+    
+    # Analyse par blocs (map-reduce) des gros volumes de logs
+    LOG_CHUNK_TOKENS: int = int(os.getenv("LOG_CHUNK_TOKENS", "6000"))
+    LOG_CHUNK_CONCURRENCY: int = int(os.getenv("LOG_CHUNK_CONCURRENCY", "4"))
+    
+    # Fichiers de logs téléversés : copie sur disque (dossier temporaire du système
+    # si vide) puis lecture par blocs via mmap
+    LOG_SPOOL_DIR: str = os.getenv("LOG_SPOOL_DIR", "")
+    LOG_READ_CHUNK_BYTES: int = int(os.getenv("LOG_READ_CHUNK_BYTES", str(4 * 1024 * 1024)))
+    # Processus de décompression des archives (.gz, .bz2, .xz, .zst, tar) ; 0 = nombre de CPU
+    LOG_ARCHIVE_WORKERS: int = int(os.getenv("LOG_ARCHIVE_WORKERS", "0"))
+    
+    # Extraction structurée des logs (format détecté sur les premières lignes) ;
+    # au-delà de LOG_PARSE_PARALLEL_BYTES, le fichier est découpé entre processus (0 = nombre de CPU)
+    LOG_PARSE_SAMPLE_LINES: int = int(os.getenv("LOG_PARSE_SAMPLE_LINES", "200"))
+    LOG_PARSE_WORKERS: int = int(os.getenv("LOG_PARSE_WORKERS", "0"))
+    LOG_PARSE_PARALLEL_BYTES: int = int(os.getenv("LOG_PARSE_PARALLEL_BYTES", str(32 * 1024 * 1024)))
+    
+    # Suivi continu (python -m app suivre) : une analyse est déclenchée par un seuil
+    # d'erreurs, de nouveaux types d'erreurs ou une fenêtre de temps (0 = critère désactivé)
+    LOG_FOLLOW_POLL_SECONDS: float = float(os.getenv("LOG_FOLLOW_POLL_SECONDS", "1"))
+    LOG_FOLLOW_ERROR_THRESHOLD: int = int(os.getenv("LOG_FOLLOW_ERROR_THRESHOLD", "20"))
+    LOG_FOLLOW_NEW_ERROR_TEMPLATES: int = int(os.getenv("LOG_FOLLOW_NEW_ERROR_TEMPLATES", "3"))
+    LOG_FOLLOW_WINDOW_SECONDS: float = float(os.getenv("LOG_FOLLOW_WINDOW_SECONDS", "300"))
+    LOG_FOLLOW_COOLDOWN_SECONDS: float = float(os.getenv("LOG_FOLLOW_COOLDOWN_SECONDS", "30"))
+    LOG_FOLLOW_MAX_DELTA_LINES: int = int(os.getenv("LOG_FOLLOW_MAX_DELTA_LINES", "2000"))
+    
     # Chemins des fichiers
     PROMPTS_DIR: str = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "prompts")
     DOCS_DIR: str = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "docs")
     
+    # Cache persistant des réponses LLM
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    CACHE_PATH: str = os.getenv(
+        "CACHE_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".cache", "llm_responses.sqlite3")
+    )
+    CACHE_TTL: int = int(os.getenv("CACHE_TTL", "86400"))
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
+    
+    # Résultats des évaluations de prompts (sans expiration : une mesure reste valable
+    # tant que le prompt, l'entrée et le modèle sont identiques)
+    EVAL_CACHE_PATH: str = os.getenv(
+        "EVAL_CACHE_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".cache", "evaluations.sqlite3")
+    )
+    
+    # Pools de connexions HTTP vers les fournisseurs
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "120"))
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "600"))
+    
+    # Client asynchrone (traitements par lots)
+    ASYNC_MAX_CONCURRENCY: int = int(os.getenv("ASYNC_MAX_CONCURRENCY", "8"))
+    
+    # Retries et limitation de débit côté client (0 = pas de limite)
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    LLM_BACKOFF_BASE: float = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+    LLM_BACKOFF_MAX: float = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+    # Attente Retry-After maximale acceptée (au-delà, échec immédiat ; 0 = sans limite)
+    LLM_RETRY_AFTER_MAX: float = float(os.getenv("LLM_RETRY_AFTER_MAX", "300"))
+    LLM_RPM_LIMIT: int = int(os.getenv("LLM_RPM_LIMIT", "0"))
+    LLM_TPM_LIMIT: int = int(os.getenv("LLM_TPM_LIMIT", "0"))
+    
+    # Bascule entre fournisseurs et requêtes couvertes (hedging)
+    LLM_FALLBACK_PROVIDERS: List[str] = [
+        p.strip() for p in os.getenv("LLM_FALLBACK_PROVIDERS", "").split(",") if p.strip()
+    ]
+    LLM_LATENCY_BUDGET: float = float(os.getenv("LLM_LATENCY_BUDGET", "0"))
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+    LLM_HEDGE_MIN_DELAY: float = float(os.getenv("LLM_HEDGE_MIN_DELAY", "2.0"))
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    
+    # Règles supplémentaires de détection de prompt injection (une par ligne, "re:" pour une regex)
+    INJECTION_RULES_FILE: Optional[str] = os.getenv("INJECTION_RULES_FILE")
+    
+    # Serveur d'API HTTP (ASGI)
+    API_HOST: str = os.getenv("API_HOST", "127.0.0.1")
+    API_PORT: int = int(os.getenv("API_PORT", "8000"))
+    API_WORKERS: int = int(os.getenv("API_WORKERS", "4"))
+    API_QUEUE_SIZE: int = int(os.getenv("API_QUEUE_SIZE", "32"))
+    API_MAX_BODY_BYTES: int = int(os.getenv("API_MAX_BODY_BYTES", str(10 * 1024 * 1024)))
+    
+    # Métriques (latence, tokens, coût) et traces JSONL des opérations
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    TRACE_FILE: Optional[str] = os.getenv("TRACE_FILE")
+    
     @classmethod
     def validate(cls) -> bool:
         """Valide la configuration"""
@@ -49,20 +154,39 @@ class Config:
         elif cls.LLM_PROVIDER == LLMProvider.GOOGLE.value:
             if not cls.GOOGLE_API_KEY:
                 raise ValueError("GOOGLE_API_KEY doit être définie dans les variables d'environnement")
+        elif cls.LLM_PROVIDER == LLMProvider.MOCK.value:
+            pass  # Aucune clé requise
         else:
             raise ValueError(f"Fournisseur LLM non supporté: {cls.LLM_PROVIDER}")
         return True
     
     @classmethod
-    def get_api_key(cls) -> str:
-        """Retourne la clé API appropriée"""
-        if cls.LLM_PROVIDER == LLMProvider.OPENAI.value:
+    def get_api_key(cls, provider: Optional[str] = None) -> str:
+        """Retourne la clé API appropriée (fournisseur configuré par défaut)"""
+        provider = provider or cls.LLM_PROVIDER
+        if provider == LLMProvider.OPENAI.value:
             return cls.OPENAI_API_KEY
-        elif cls.LLM_PROVIDER == LLMProvider.CLAUDE.value:
+        elif provider == LLMProvider.CLAUDE.value:
             return cls.ANTHROPIC_API_KEY
-        elif cls.LLM_PROVIDER == LLMProvider.GOOGLE.value:
+        elif provider == LLMProvider.GOOGLE.value:
             return cls.GOOGLE_API_KEY
+        elif provider == LLMProvider.MOCK.value:
+            return ""
         raise ValueError("Aucune clé API configurée")
+    
+    @classmethod
+    def get_model(cls, provider: Optional[str] = None) -> str:
+        """Retourne le modèle par défaut d'un fournisseur (fournisseur configuré par défaut)"""
+        provider = provider or cls.LLM_PROVIDER
+        if provider == LLMProvider.OPENAI.value:
+            return cls.OPENAI_MODEL
+        elif provider == LLMProvider.CLAUDE.value:
+            return cls.CLAUDE_MODEL
+        elif provider == LLMProvider.GOOGLE.value:
+            return cls.GOOGLE_MODEL
+        elif provider == LLMProvider.MOCK.value:
+            return cls.MOCK_MODEL
+        raise ValueError(f"Fournisseur LLM non supporté: {provider}")
 
 
 
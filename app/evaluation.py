@@ -0,0 +1,480 @@
+"""
+Évaluation A/B des versions de prompts
+
+Exécute un jeu de cas (JSONL) sur toutes les versions de prompts disponibles
+et tous les fournisseurs configurés, en parallèle. Chaque exécution est notée
+(longueur, latence, tokens, coût, critères de la grille) et mise en cache :
+relancer l'évaluation ne rappelle le LLM que pour les prompts modifiés.
+
+Format du jeu de cas, une ligne JSON par cas :
+    {"id": "oom", "outil": "analyser", "entree": "...", "criteres": {"contient": ["OOM"]}}
+    {"outil": "diagnostiquer", "fichier": "cas/dns.txt", "criteres": {"sections": ["Diagnostic"]}}
+
+Critères disponibles : contient, exclut, regex, sections (titres Markdown),
+longueur_min, longueur_max (en caractères).
+
+Usage : python -m app evaluer jeu.jsonl [--versions v1 vFinal] [--fournisseurs openai claude]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.cli import ERROR_PREFIXES, TOOLS
+from app.config.config import Config, LLMProvider
+from app.utils.llm_client import LLMClient
+from app.utils.prompt_loader import PromptLoader
+from app.utils.response_cache import ResponseCache
+from app.utils.token_counter import cout_usage
+from app.utils.usage import collect_usage
+
+
+# Sous-commande -> dossier de prompts (le jeu de cas accepte l'un ou l'autre)
+PROMPT_DIRS = {name: module.rsplit(".", 1)[1] for name, (module, _, _) in TOOLS.items()}
+
+CRITERES = ("contient", "exclut", "regex", "sections", "longueur_min", "longueur_max")
+# Critères dont la valeur est une liste de chaînes
+CRITERES_LISTES = ("contient", "exclut", "regex", "sections")
+
+
+@dataclass
+class CasEvaluation:
+    """Une entrée du jeu de cas"""
+    id: str
+    outil: str  # Nom de sous-commande (analyser, diagnostiquer...)
+    entree: str
+    criteres: Dict = field(default_factory=dict)
+
+
+@dataclass
+class ResultatEvaluation:
+    """Mesures d'un cas pour une version de prompt et un fournisseur"""
+    cas: str
+    outil: str
+    version: str
+    fournisseur: str
+    modele: str
+    sortie: str = ""
+    erreur: Optional[str] = None
+    latence: float = 0.0
+    tokens_entree: int = 0
+    tokens_sortie: int = 0
+    tokens_cache: int = 0
+    cout: Optional[float] = None
+    longueur: int = 0
+    score: Optional[float] = None  # Part des critères respectés, None sans critère
+    echecs: List[str] = field(default_factory=list)
+    depuis_cache: bool = False
+
+
+def charger_jeu(path: str) -> List[CasEvaluation]:
+    """
+    Charge un jeu de cas JSONL
+
+    Args:
+        path: Fichier JSONL (les chemins "fichier" sont relatifs à ce fichier)
+
+    Returns:
+        Les cas, dans l'ordre du fichier
+
+    Raises:
+        ValueError: Si une ligne est invalide (numéro de ligne dans le message)
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    noms = {dossier: nom for nom, dossier in PROMPT_DIRS.items()}
+    cas: List[CasEvaluation] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for numero, ligne in enumerate(f, start=1):
+            if not ligne.strip() or ligne.lstrip().startswith("#"):
+                continue
+            try:
+                donnees = json.loads(ligne)
+            except ValueError as e:
+                raise ValueError(f"{path}:{numero}: JSON invalide ({e})")
+            outil = donnees.get("outil")
+            outil = noms.get(outil, outil)
+            if outil not in TOOLS:
+                raise ValueError(f"{path}:{numero}: outil inconnu: {donnees.get('outil')}")
+            entree = donnees.get("entree")
+            if entree is None and donnees.get("fichier"):
+                with open(os.path.join(base, donnees["fichier"]), "r", encoding="utf-8", errors="replace") as g:
+                    entree = g.read()
+            if not isinstance(entree, str) or not entree.strip():
+                raise ValueError(f"{path}:{numero}: 'entree' ou 'fichier' requis")
+            criteres = donnees.get("criteres") or {}
+            _valider_criteres(criteres, f"{path}:{numero}")
+            cas.append(CasEvaluation(
+                id=str(donnees.get("id") or f"{outil}-{numero}"),
+                outil=outil,
+                entree=entree,
+                criteres=criteres,
+            ))
+    return cas
+
+
+def _valider_criteres(criteres: Dict, lieu: str):
+    """
+    Vérifie la grille de critères d'un cas (types, expressions régulières)
+
+    Raises:
+        ValueError: Si un critère est inconnu ou mal formé (lieu "fichier:ligne" dans le message)
+    """
+    if not isinstance(criteres, dict):
+        raise ValueError(f"{lieu}: 'criteres' doit être un objet JSON")
+    inconnus = [c for c in criteres if c not in CRITERES]
+    if inconnus:
+        raise ValueError(f"{lieu}: critères inconnus: {', '.join(inconnus)}")
+    for nom in CRITERES_LISTES:
+        valeurs = criteres.get(nom, [])
+        if not isinstance(valeurs, list) or not all(isinstance(v, str) for v in valeurs):
+            raise ValueError(f"{lieu}: le critère '{nom}' doit être une liste de chaînes")
+    for motif in criteres.get("regex", []):
+        try:
+            re.compile(motif, re.MULTILINE)
+        except re.error as e:
+            raise ValueError(f"{lieu}: expression régulière invalide « {motif} » : {e}")
+    for nom in ("longueur_min", "longueur_max"):
+        valeur = criteres.get(nom, 0)
+        if isinstance(valeur, bool) or not isinstance(valeur, int) or valeur < 0:
+            raise ValueError(f"{lieu}: le critère '{nom}' doit être un entier positif")
+
+
+def verifier_criteres(sortie: str, criteres: Dict) -> Tuple[Optional[float], List[str]]:
+    """
+    Applique la grille de critères à une sortie
+
+    Returns:
+        Tuple (part des critères respectés ou None sans critère, critères non respectés)
+    """
+    verifications: List[Tuple[str, bool]] = []
+    minuscule = sortie.lower()
+    titres = [l.lstrip("#").strip().lower() for l in sortie.splitlines() if l.startswith("#")]
+
+    for texte in criteres.get("contient", []):
+        verifications.append((f"contient '{texte}'", texte.lower() in minuscule))
+    for texte in criteres.get("exclut", []):
+        verifications.append((f"exclut '{texte}'", texte.lower() not in minuscule))
+    for motif in criteres.get("regex", []):
+        verifications.append((f"regex /{motif}/", re.search(motif, sortie, re.MULTILINE) is not None))
+    for section in criteres.get("sections", []):
+        verifications.append((f"section '{section}'", any(section.lower() in t for t in titres)))
+    if "longueur_min" in criteres:
+        verifications.append((f"longueur >= {criteres['longueur_min']}", len(sortie) >= criteres["longueur_min"]))
+    if "longueur_max" in criteres:
+        verifications.append((f"longueur <= {criteres['longueur_max']}", len(sortie) <= criteres["longueur_max"]))
+
+    if not verifications:
+        return None, []
+    echecs = [nom for nom, ok in verifications if not ok]
+    return 1 - len(echecs) / len(verifications), echecs
+
+
+def fournisseurs_configures() -> List[str]:
+    """Fournisseur principal et fournisseurs de secours dont la clé est définie"""
+    fournisseurs = [Config.LLM_PROVIDER] + list(Config.LLM_FALLBACK_PROVIDERS)
+    return [
+        p for p in dict.fromkeys(fournisseurs)
+        if p == LLMProvider.MOCK.value or Config.get_api_key(p)
+    ]
+
+
+class EvaluateurPrompts:
+    """Exécute un jeu de cas sur les combinaisons version × fournisseur"""
+
+    def __init__(
+        self,
+        versions: Optional[List[str]] = None,
+        fournisseurs: Optional[List[str]] = None,
+        workers: int = 4,
+        rafraichir: bool = False,
+        cache: Optional[ResponseCache] = None,
+    ):
+        """
+        Args:
+            versions: Versions à comparer (par défaut: toutes celles de chaque outil)
+            fournisseurs: Fournisseurs à comparer (par défaut: fournisseurs_configures())
+            workers: Nombre d'exécutions simultanées
+            rafraichir: Ignore les résultats en cache et les remplace
+            cache: Stockage des résultats (par défaut: Config.EVAL_CACHE_PATH, sans expiration)
+        """
+        self.versions = versions
+        self.fournisseurs = fournisseurs or fournisseurs_configures()
+        self.workers = max(1, workers)
+        self.rafraichir = rafraichir
+        self.cache = cache or ResponseCache(path=Config.EVAL_CACHE_PATH, ttl=0, max_entries=0)
+        self.prompt_loader = PromptLoader()
+        # Un client par fournisseur : cache des réponses désactivé pour mesurer de vrais appels
+        self._clients = {
+            p: LLMClient(provider=p, fallback_providers=[], use_cache=False) for p in self.fournisseurs
+        }
+
+    def versions_outil(self, outil: str) -> List[str]:
+        """Versions de prompt évaluées pour un outil"""
+        disponibles = self.prompt_loader.list_available_versions(PROMPT_DIRS[outil])
+        if not self.versions:
+            return disponibles
+        return [v for v in self.versions if v in disponibles]
+
+    def evaluer(
+        self,
+        cas: List[CasEvaluation],
+        progression: Optional[Callable[[int, int], None]] = None,
+    ) -> List[ResultatEvaluation]:
+        """
+        Évalue tous les cas sur toutes les combinaisons version × fournisseur
+
+        Args:
+            cas: Jeu de cas
+            progression: Callback (terminées, total) appelé depuis le thread appelant
+
+        Returns:
+            Les résultats, triés par outil, cas, fournisseur et version
+        """
+        taches = [
+            (c, version, fournisseur)
+            for c in cas
+            for version in self.versions_outil(c.outil)
+            for fournisseur in self.fournisseurs
+        ]
+        resultats = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._executer, *tache) for tache in taches]
+            for terminees, future in enumerate(as_completed(futures), start=1):
+                resultats.append(future.result())
+                if progression:
+                    progression(terminees, len(taches))
+        resultats.sort(key=lambda r: (r.outil, r.cas, r.fournisseur, r.version))
+        return resultats
+
+    def _cle(self, cas: CasEvaluation, version: str, fournisseur: str, modele: str) -> str:
+        """Clé de cache : change avec le contenu du prompt, l'entrée, le modèle et les paramètres"""
+        return ResponseCache.make_key(
+            fournisseur,
+            modele,
+            Config.TEMPERATURE,
+            Config.MAX_TOKENS,
+            self.prompt_loader.load_prompt(PROMPT_DIRS[cas.outil], version),
+            cas.entree,
+            extra={"outil": cas.outil, "version": version},
+        )
+
+    def _executer(self, cas: CasEvaluation, version: str, fournisseur: str) -> ResultatEvaluation:
+        client = self._clients[fournisseur]
+        modele = Config.get_model(fournisseur)
+        resultat = ResultatEvaluation(
+            cas=cas.id, outil=cas.outil, version=version, fournisseur=fournisseur, modele=modele
+        )
+        cle = self._cle(cas, version, fournisseur, modele)
+
+        en_cache = None if self.rafraichir else self.cache.get(cle)
+        if en_cache is not None:
+            for nom, valeur in json.loads(en_cache).items():
+                setattr(resultat, nom, valeur)
+            resultat.depuis_cache = True
+        else:
+            module_name, class_name, method = TOOLS[cas.outil]
+            outil = getattr(importlib.import_module(module_name), class_name)(
+                prompt_version=version, llm_client=client
+            )
+            debut = time.perf_counter()
+            try:
+                with collect_usage() as usages:
+                    sortie = getattr(outil, method)(cas.entree, prompt_version=version)
+            except Exception as e:
+                sortie = f"Erreur lors de l'évaluation: {e}"
+            resultat.latence = time.perf_counter() - debut
+
+            if sortie.startswith(ERROR_PREFIXES) or sortie.startswith("Erreur lors de l'évaluation:"):
+                # Les erreurs ne sont pas mises en cache : elles seront retentées
+                resultat.erreur = sortie
+            else:
+                resultat.sortie = sortie
+                resultat.longueur = len(sortie)
+                resultat.tokens_entree = sum(u.input_tokens + u.cache_write_tokens for u in usages)
+                resultat.tokens_sortie = sum(u.output_tokens for u in usages)
+                resultat.tokens_cache = sum(u.cache_read_tokens for u in usages)
+                couts = [cout_usage(u) for u in usages]
+                if usages and all(c is not None for c in couts):
+                    resultat.cout = sum(couts)
+                self.cache.set(cle, json.dumps({
+                    nom: getattr(resultat, nom)
+                    for nom in ("sortie", "latence", "tokens_entree", "tokens_sortie", "tokens_cache", "cout", "longueur")
+                }, ensure_ascii=False))
+
+        if resultat.erreur is None:
+            # La grille est réappliquée à chaque évaluation : elle peut changer sans rappeler le LLM
+            resultat.score, resultat.echecs = verifier_criteres(resultat.sortie, cas.criteres)
+        return resultat
+
+
+def _percentile(valeurs: List[float], q: float) -> Optional[float]:
+    if not valeurs:
+        return None
+    ordonnees = sorted(valeurs)
+    return ordonnees[min(len(ordonnees) - 1, max(0, int(round(q * len(ordonnees) + 0.5)) - 1))]
+
+
+def _moyenne(valeurs: List[float]) -> Optional[float]:
+    return sum(valeurs) / len(valeurs) if valeurs else None
+
+
+def agreger(resultats: List[ResultatEvaluation]) -> List[Dict]:
+    """Agrège les résultats par outil, fournisseur et version"""
+    groupes: Dict[Tuple[str, str, str], List[ResultatEvaluation]] = {}
+    for r in resultats:
+        groupes.setdefault((r.outil, r.fournisseur, r.version), []).append(r)
+
+    agregats = []
+    for (outil, fournisseur, version), groupe in sorted(groupes.items()):
+        reussis = [r for r in groupe if r.erreur is None]
+        scores = [r.score for r in reussis if r.score is not None]
+        couts = [r.cout for r in reussis if r.cout is not None]
+        latences = [r.latence for r in reussis]
+        agregats.append({
+            "outil": outil,
+            "fournisseur": fournisseur,
+            "version": version,
+            "modele": groupe[0].modele,
+            "cas": len(groupe),
+            "erreurs": len(groupe) - len(reussis),
+            "score": _moyenne(scores),
+            "longueur": _moyenne([r.longueur for r in reussis]),
+            "latence_p50": _percentile(latences, 0.50),
+            "latence_p95": _percentile(latences, 0.95),
+            "tokens_entree": _moyenne([r.tokens_entree for r in reussis]),
+            "tokens_sortie": _moyenne([r.tokens_sortie for r in reussis]),
+            "cout": _moyenne(couts) if len(couts) == len(reussis) else None,
+        })
+    return agregats
+
+
+def recommander(agregats: List[Dict], tolerance: float = 0.05) -> List[Dict]:
+    """
+    Version la moins chère qui maintient la qualité, par outil et fournisseur
+
+    Sont éligibles les versions sans erreur dont le score moyen est au plus
+    `tolerance` sous le meilleur score ; parmi elles, la moins chère l'emporte
+    (coût moyen, à défaut tokens moyens).
+    """
+    par_couple: Dict[Tuple[str, str], List[Dict]] = {}
+    for a in agregats:
+        par_couple.setdefault((a["outil"], a["fournisseur"]), []).append(a)
+
+    recommandations = []
+    for (outil, fournisseur), versions in sorted(par_couple.items()):
+        candidates = [a for a in versions if a["erreurs"] == 0 and a["cas"]]
+        if not candidates:
+            recommandations.append({"outil": outil, "fournisseur": fournisseur, "version": None,
+                                    "raison": "aucune version sans erreur"})
+            continue
+        scores = [a["score"] for a in candidates if a["score"] is not None]
+        reference = max(scores) if scores else None
+        if reference is not None:
+            candidates = [a for a in candidates if a["score"] is not None and a["score"] >= reference - tolerance]
+        choix = min(candidates, key=lambda a: (
+            a["cout"] if a["cout"] is not None else float("inf"),
+            (a["tokens_entree"] or 0) + (a["tokens_sortie"] or 0),
+        ))
+        if reference is None:
+            raison = "aucun critère de qualité : version la moins chère"
+        else:
+            raison = f"score {choix['score']:.2f}, meilleur {reference:.2f}, tolérance {tolerance:.2f}"
+        recommandations.append({"outil": outil, "fournisseur": fournisseur, "version": choix["version"],
+                                "raison": raison})
+    return recommandations
+
+
+def _fmt(valeur, format_spec: str) -> str:
+    return "-" if valeur is None else format(valeur, format_spec)
+
+
+def rapport_markdown(resultats: List[ResultatEvaluation], tolerance: float = 0.05) -> str:
+    """Rapport de comparaison au format Markdown"""
+    agregats = agreger(resultats)
+    recommandations = recommander(agregats, tolerance)
+    lignes = ["# Évaluation des versions de prompts", ""]
+    en_cache = sum(r.depuis_cache for r in resultats)
+    lignes.append(f"{len(resultats)} exécutions ({en_cache} depuis le cache), tolérance de score {tolerance:.2f}.")
+
+    for outil in sorted({a["outil"] for a in agregats}):
+        lignes += ["", f"## {outil}", ""]
+        lignes.append("| Fournisseur | Version | Cas | Erreurs | Score | Longueur | Latence p50 | Latence p95 "
+                      "| Tokens entrée | Tokens sortie | Coût moyen |")
+        lignes.append("|---|---|---|---|---|---|---|---|---|---|---|")
+        for a in (a for a in agregats if a["outil"] == outil):
+            lignes.append(
+                f"| {a['fournisseur']} ({a['modele']}) | {a['version']} | {a['cas']} | {a['erreurs']} "
+                f"| {_fmt(a['score'], '.2f')} | {_fmt(a['longueur'], '.0f')} "
+                f"| {_fmt(a['latence_p50'], '.2f')} s | {_fmt(a['latence_p95'], '.2f')} s "
+                f"| {_fmt(a['tokens_entree'], '.0f')} | {_fmt(a['tokens_sortie'], '.0f')} "
+                f"| {'?' if a['cout'] is None else format(a['cout'], '.5f') + ' $'} |"
+            )
+        lignes.append("")
+        for r in (r for r in recommandations if r["outil"] == outil):
+            lignes.append(f"- **{r['fournisseur']}** : {r['version'] or 'aucune'} ({r['raison']})")
+
+    echecs = [r for r in resultats if r.erreur or r.echecs]
+    if echecs:
+        lignes += ["", "## Échecs", ""]
+        for r in echecs:
+            detail = r.erreur or ", ".join(r.echecs)
+            lignes.append(f"- {r.outil} / {r.cas} / {r.fournisseur} / {r.version} : {detail}")
+    return "\n".join(lignes) + "\n"
+
+
+def rapport_json(resultats: List[ResultatEvaluation], tolerance: float = 0.05) -> str:
+    """Rapport complet (agrégats, recommandations, résultats détaillés) au format JSON"""
+    agregats = agreger(resultats)
+    return json.dumps({
+        "tolerance": tolerance,
+        "agregats": agregats,
+        "recommandations": recommander(agregats, tolerance),
+        "resultats": [asdict(r) for r in resultats],
+    }, ensure_ascii=False, indent=2)
+
+
+def main(args: argparse.Namespace) -> int:
+    """
+    Exécute la sous-commande `evaluer`
+
+    Returns:
+        0 si toutes les exécutions ont abouti, 1 si certaines ont échoué, 2 si arguments invalides
+    """
+    try:
+        cas = charger_jeu(args.jeu)
+    except (OSError, ValueError) as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 2
+
+    fournisseurs = args.fournisseurs or fournisseurs_configures()
+    sans_cle = [p for p in fournisseurs if p != LLMProvider.MOCK.value and not Config.get_api_key(p)]
+    if sans_cle or not fournisseurs:
+        print(f"Erreur: clé API manquante pour: {', '.join(sans_cle) or Config.LLM_PROVIDER}", file=sys.stderr)
+        return 2
+
+    evaluateur = EvaluateurPrompts(
+        versions=args.versions, fournisseurs=fournisseurs, workers=args.workers, rafraichir=args.rafraichir
+    )
+
+    def progression(terminees: int, total: int):
+        print(f"\r{terminees}/{total} exécutions", end="", file=sys.stderr, flush=True)
+
+    resultats = evaluateur.evaluer(cas, progression=progression)
+    print(file=sys.stderr)
+
+    rapport = rapport_json(resultats, args.tolerance) if args.format == "json" else rapport_markdown(
+        resultats, args.tolerance
+    )
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            f.write(rapport)
+    else:
+        sys.stdout.write(rapport)
+    return 1 if any(r.erreur for r in resultats) else 0
@@ -0,0 +1,421 @@
+"""
+Serveur d'API HTTP (ASGI) exposant les 5 outils
+Lancement : python -m app.server (nécessite uvicorn), ou tout serveur ASGI : uvicorn app.server:app
+
+Routes :
+    GET  /health                 État du service et de la file d'attente
+    GET  /tools                  Outils et versions de prompts disponibles
+    GET  /metrics                Métriques au format texte Prometheus
+    POST /tools/<outil>          Réponse complète (JSON)
+    POST /tools/<outil>/stream   Réponse en flux (Server-Sent Events)
+
+Corps des requêtes POST : {"input": "...", "version": "vFinal"}
+
+Les requêtes identiques en cours (même outil, version et entrée) partagent
+un seul appel LLM. Au-delà de API_WORKERS + API_QUEUE_SIZE traitements
+admis, le serveur répond 429 au lieu de laisser grossir la file.
+"""
+
+import asyncio
+import hashlib
+import importlib
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    pass
+else:
+    # Avant l'import de Config, qui lit les variables d'environnement
+    load_dotenv()
+
+from app.cli import ERROR_PREFIXES, TOOLS
+from app.config.config import Config
+from app.utils.metrics import registry
+from app.utils.prompt_loader import PromptLoader
+
+
+# Sous-commande -> dossier de prompts
+PROMPT_DIRS = {name: module.rsplit(".", 1)[1] for name, (module, _, _) in TOOLS.items()}
+
+
+class QueueFullError(Exception):
+    """Plus de place dans la file d'attente du serveur"""
+
+
+class _StreamError(str):
+    """Erreur levée pendant une génération en flux, diffusée aux abonnés comme un fragment"""
+
+
+class _StreamJob:
+    """
+    Génération en flux partagée entre plusieurs abonnés
+
+    Chaque fragment est conservé : un abonné arrivé en cours de route
+    reçoit d'abord les fragments déjà produits, puis la suite.
+    """
+
+    def __init__(self):
+        self.fragments: List[str] = []
+        self.done = False
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> asyncio.Queue:
+        """Abonne la boucle courante et retourne sa file de fragments (None = fin)"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            for fragment in self.fragments:
+                queue.put_nowait(fragment)
+            if self.done:
+                queue.put_nowait(None)
+            else:
+                self._subscribers.append((loop, queue))
+        return queue
+
+    def publish(self, fragment: Optional[str]):
+        """Diffuse un fragment (None pour la fin du flux) ; appelé depuis un thread du pool"""
+        with self._lock:
+            if fragment is None:
+                self.done = True
+            else:
+                self.fragments.append(fragment)
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, fragment)
+
+
+class ToolService:
+    """Pool de workers borné, avec regroupement des requêtes identiques en cours"""
+
+    def __init__(self, workers: Optional[int] = None, queue_size: Optional[int] = None):
+        self.workers = workers or Config.API_WORKERS
+        self.capacity = self.workers + (Config.API_QUEUE_SIZE if queue_size is None else queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="api-tool")
+        self._tools: Dict[Tuple[str, str], Any] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._streams: Dict[str, _StreamJob] = {}
+        self._active = 0
+        self._lock = threading.Lock()
+        self.coalesced = 0
+        self.rejected = 0
+
+    @staticmethod
+    def request_key(tool: str, version: str, text: str, stream: bool) -> str:
+        """Empreinte d'une requête (outil, version, entrée)"""
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{tool}:{version}:{'stream' if stream else 'full'}:{digest}"
+
+    def get_tool(self, tool: str, version: str):
+        """Instance (partagée) de l'outil pour une version de prompt"""
+        with self._lock:
+            instance = self._tools.get((tool, version))
+            if instance is None:
+                module_name, class_name, _ = TOOLS[tool]
+                tool_class = getattr(importlib.import_module(module_name), class_name)
+                instance = tool_class(prompt_version=version)
+                self._tools[(tool, version)] = instance
+            return instance
+
+    def _admit(self):
+        # Appelé sous self._lock
+        if self._active >= self.capacity:
+            self.rejected += 1
+            raise QueueFullError("File d'attente pleine, réessayez plus tard")
+        self._active += 1
+
+    def _release(self, key: str, registry: Dict):
+        with self._lock:
+            self._active -= 1
+            registry.pop(key, None)
+
+    def submit(self, tool: str, version: str, text: str) -> Tuple[Future, bool]:
+        """
+        Lance (ou rejoint) un traitement complet
+
+        Returns:
+            (future du résultat, True si la requête a rejoint un traitement en cours)
+
+        Raises:
+            QueueFullError: Si la capacité du serveur est atteinte
+        """
+        key = self.request_key(tool, version, text, stream=False)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, True
+            self._admit()
+            future = self._executor.submit(self._run, tool, version, text)
+            self._inflight[key] = future
+        future.add_done_callback(lambda _: self._release(key, self._inflight))
+        return future, False
+
+    def submit_stream(self, tool: str, version: str, text: str) -> Tuple[_StreamJob, bool]:
+        """
+        Lance (ou rejoint) une génération en flux
+
+        Returns:
+            (génération partagée, True si la requête a rejoint un flux en cours)
+
+        Raises:
+            QueueFullError: Si la capacité du serveur est atteinte
+        """
+        key = self.request_key(tool, version, text, stream=True)
+        with self._lock:
+            job = self._streams.get(key)
+            if job is not None:
+                self.coalesced += 1
+                return job, True
+            self._admit()
+            job = _StreamJob()
+            self._streams[key] = job
+        future = self._executor.submit(self._run_stream, job, tool, version, text)
+        future.add_done_callback(lambda _: self._release(key, self._streams))
+        return job, False
+
+    def _run(self, tool: str, version: str, text: str) -> str:
+        _, _, method = TOOLS[tool]
+        result = getattr(self.get_tool(tool, version), method)(text, prompt_version=version)
+        if result.startswith(ERROR_PREFIXES):
+            raise RuntimeError(result)
+        return result
+
+    def _run_stream(self, job: _StreamJob, tool: str, version: str, text: str):
+        _, _, method = TOOLS[tool]
+        try:
+            generator: Callable[..., Iterator[str]] = getattr(self.get_tool(tool, version), f"{method}_stream")
+            for fragment in generator(text, prompt_version=version):
+                job.publish(fragment)
+        except Exception as e:
+            # SDK ou clé API manquants, erreur avant le try de l'outil : signalée au client
+            job.publish(_StreamError(str(e)))
+        finally:
+            job.publish(None)
+
+    def stats(self) -> Dict[str, int]:
+        """Occupation du pool et compteurs"""
+        with self._lock:
+            return {
+                "actifs": self._active,
+                "capacite": self.capacity,
+                "workers": self.workers,
+                "regroupees": self.coalesced,
+                "rejetees": self.rejected,
+            }
+
+    def shutdown(self):
+        """Arrête le pool (les traitements en cours se terminent)"""
+        self._executor.shutdown(wait=False)
+
+
+class HTTPError(Exception):
+    """Erreur à renvoyer au client avec un code HTTP"""
+
+    def __init__(self, status: int, message: str, headers: Optional[List[Tuple[bytes, bytes]]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or []
+
+
+class ToolkitAPI:
+    """Application ASGI (sans framework) au-dessus de ToolService"""
+
+    def __init__(self, service: Optional[ToolService] = None):
+        self._service = service
+
+    @property
+    def service(self) -> ToolService:
+        # Créé au premier appel, pour que la configuration soit celle du processus serveur
+        if self._service is None:
+            self._service = ToolService()
+        return self._service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        try:
+            await self._dispatch(scope, receive, send)
+        except HTTPError as e:
+            await self._send_json(send, e.status, {"erreur": e.message}, e.headers)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._service is not None:
+                    self._service.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _dispatch(self, scope, receive, send):
+        method = scope["method"]
+        parts = [p for p in scope["path"].split("/") if p]
+
+        if parts == ["health"] and method == "GET":
+            await self._send_json(send, 200, {"statut": "ok", "file": self.service.stats()})
+            return
+        if parts == ["metrics"] and method == "GET":
+            body = registry.render_prometheus().encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain; version=0.0.4; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        if parts == ["tools"] and method == "GET":
+            loader = PromptLoader()
+            tools = {name: loader.list_available_versions(folder) for name, folder in PROMPT_DIRS.items()}
+            await self._send_json(send, 200, {"outils": tools})
+            return
+        if len(parts) in (2, 3) and parts[0] == "tools" and (len(parts) == 2 or parts[2] == "stream"):
+            if parts[1] not in TOOLS:
+                raise HTTPError(404, f"Outil inconnu: {parts[1]}")
+            if method != "POST":
+                raise HTTPError(405, "Méthode non autorisée", [(b"allow", b"POST")])
+            tool = parts[1]
+            text, version = await self._parse_request(tool, await self._read_body(receive))
+            if len(parts) == 3:
+                await self._handle_stream(send, tool, version, text)
+            else:
+                await self._handle_full(send, tool, version, text)
+            return
+
+        raise HTTPError(404, "Route inconnue")
+
+    async def _read_body(self, receive) -> bytes:
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise HTTPError(400, "Connexion interrompue")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > Config.API_MAX_BODY_BYTES:
+                raise HTTPError(413, f"Corps de requête trop volumineux (max {Config.API_MAX_BODY_BYTES} octets)")
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    async def _parse_request(self, tool: str, body: bytes) -> Tuple[str, str]:
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Corps JSON invalide")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Le corps doit être un objet JSON")
+        text = payload.get("input")
+        if not isinstance(text, str) or not text.strip():
+            raise HTTPError(400, "Le champ 'input' (texte non vide) est requis")
+        version = payload.get("version", "vFinal")
+        if version not in PromptLoader().list_available_versions(PROMPT_DIRS[tool]):
+            raise HTTPError(400, f"Version de prompt inconnue: {version}")
+        # Création du client SDK et détection hors de la boucle d'événements
+        loop = asyncio.get_running_loop()
+        try:
+            injection = await loop.run_in_executor(None, self._detect_injection, tool, version, text)
+        except Exception as e:
+            raise HTTPError(502, str(e))
+        if injection:
+            raise HTTPError(400, "Tentative de prompt injection détectée")
+        return text, version
+
+    def _detect_injection(self, tool: str, version: str, text: str) -> bool:
+        return self.service.get_tool(tool, version).test_prompt_injection(text)
+
+    async def _handle_full(self, send, tool: str, version: str, text: str):
+        try:
+            future, coalesced = self.service.submit(tool, version, text)
+        except QueueFullError as e:
+            raise HTTPError(429, str(e), [(b"retry-after", b"1")])
+        try:
+            # shield : l'annulation d'un appelant ne doit pas annuler le traitement partagé
+            result = await asyncio.shield(asyncio.wrap_future(future))
+        except Exception as e:
+            raise HTTPError(502, str(e))
+        await self._send_json(send, 200, {
+            "outil": tool,
+            "version": version,
+            "resultat": result,
+            "regroupee": coalesced,
+        })
+
+    async def _handle_stream(self, send, tool: str, version: str, text: str):
+        try:
+            job, coalesced = self.service.submit_stream(tool, version, text)
+        except QueueFullError as e:
+            raise HTTPError(429, str(e), [(b"retry-after", b"1")])
+        queue = job.subscribe()
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        })
+        await self._send_event(send, "debut", {"outil": tool, "version": version, "regroupee": coalesced})
+        while True:
+            fragment = await queue.get()
+            if fragment is None:
+                break
+            if isinstance(fragment, _StreamError) or fragment.startswith(ERROR_PREFIXES):
+                await self._send_event(send, "erreur", {"erreur": str(fragment)})
+            else:
+                await self._send_event(send, None, {"fragment": fragment})
+        await self._send_event(send, "fin", {}, more_body=False)
+
+    @staticmethod
+    async def _send_event(send, event: Optional[str], data: Dict, more_body: bool = True):
+        message = f"event: {event}\n" if event else ""
+        message += f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+        await send({"type": "http.response.body", "body": message.encode("utf-8"), "more_body": more_body})
+
+    @staticmethod
+    async def _send_json(send, status: int, payload: Dict, headers: Optional[List[Tuple[bytes, bytes]]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                *(headers or []),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+app = ToolkitAPI()
+
+
+def main():
+    """Lance le serveur avec uvicorn"""
+    try:
+        import uvicorn
+    except ImportError:
+        raise ImportError("uvicorn n'est pas installé. Installez-le avec: pip install uvicorn")
+    Config.validate()
+    uvicorn.run("app.server:app", host=Config.API_HOST, port=Config.API_PORT)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,18 @@
-"""Outils IA du Dev Toolkit"""
+"""Outils IA du Dev Toolkit
 
-from app.tools.analyseur_logs import AnalyseurLogs
-from app.tools.generateur_scripts import GenerateurScripts
-from app.tools.architecte_docker_k8s import ArchitecteDockerK8s
-from app.tools.troubleshooting_reseau import TroubleshootingReseau
-from app.tools.generateur_doc_infra import GenerateurDocInfra
+Les modules des outils sont importés à la première utilisation (PEP 562) :
+`from app.tools import AnalyseurLogs` ne charge que l'analyseur de logs.
+"""
+
+import importlib
+
+_TOOL_MODULES = {
+    "AnalyseurLogs": "app.tools.analyseur_logs",
+    "GenerateurScripts": "app.tools.generateur_scripts",
+    "ArchitecteDockerK8s": "app.tools.architecte_docker_k8s",
+    "TroubleshootingReseau": "app.tools.troubleshooting_reseau",
+    "GenerateurDocInfra": "app.tools.generateur_doc_infra",
+}
 
 __all__ = [
     "AnalyseurLogs",
@@ -14,3 +22,18 @@ __all__ = [
     "GenerateurDocInfra"
 ]
 
+
+def __getattr__(name):
+    module_name = _TOOL_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
+
+
+
@@ -3,50 +3,257 @@ Outil 1: Analyseur de Logs
 Analyse les logs système et applications pour identifier les erreurs et problèmes
 """
 
-from typing import Optional
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import replace
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from app.config.config import Config
+from app.utils.injection_scanner import InjectionMatch, get_scanner
 from app.utils.llm_client import LLMClient
+from app.utils.metrics import tool_operation
+from app.utils.log_chunker import CARACTERES_PAR_TOKEN, decouper_en_blocs, estimer_tokens
+from app.utils.log_filter import LogFilter, ResultatFiltre, filtrer_logs
+from app.utils.log_follow import (
+    MOTIF_ERREURS,
+    MOTIF_FIN,
+    MOTIF_INTERVALLE,
+    MOTIF_NOUVELLES_ERREURS,
+    Declenchement,
+    SeuilsSuivi,
+    StatistiquesSuivi,
+    Suivi,
+)
+from app.utils.log_parser import ColonnesLogs, extraire_colonnes
+from app.utils.log_preprocessor import LogTemplateSummarizer
+from app.utils.log_source import LogSource
 from app.utils.prompt_loader import PromptLoader
+from app.utils.token_counter import ContextOverflowError, EstimationRequete
+
+
+# Consignes ajoutées aux prompts de l'analyse par blocs (map-reduce)
+CONSIGNE_BLOC = (
+    "Ce bloc ({index}/{total}) fait partie d'un volume de logs plus important. "
+    "Produis une analyse partielle concise : erreurs et warnings avec leurs horodatages, "
+    "composants concernés, patterns répétés et hypothèses de cause. "
+    "Elle sera fusionnée avec les analyses des autres blocs."
+)
+
+CONSIGNE_FUSION = (
+    "Les logs étaient trop volumineux pour une seule analyse : ils ont été découpés "
+    "en {total} blocs analysés séparément. Voici les analyses partielles. "
+    "Consolide-les en un rapport unique, au format de réponse standard, "
+    "en dédupliquant les problèmes et en reconstituant la chronologie globale."
+)
+
+CONSIGNE_SUIVI = (
+    "Suivi continu de {source} : analyse déclenchée ({motif}). Le résumé cumulé couvre "
+    "tout ce qui a été lu depuis le début du suivi ; seules les lignes arrivées depuis "
+    "la dernière analyse sont fournies. Concentre l'analyse sur ces nouvelles lignes "
+    "et signale ce qui a changé par rapport au résumé."
+)
+
+MOTIFS_SUIVI = {
+    MOTIF_ERREURS: "seuil d'erreurs atteint",
+    MOTIF_NOUVELLES_ERREURS: "nouveaux types d'erreurs",
+    MOTIF_INTERVALLE: "fenêtre de temps écoulée",
+    MOTIF_FIN: "fin du flux",
+}
+
+
+# Logs acceptés : texte, itérable de lignes, ou fichier lu par blocs
+Logs = Union[str, Iterable[str], LogSource]
 
 
 class AnalyseurLogs:
     """Analyseur de logs utilisant l'IA"""
     
-    def __init__(self, prompt_version: str = "v1"):
-        self.llm_client = LLMClient()
+    def __init__(self, prompt_version: str = "v1", llm_client: Optional[LLMClient] = None):
+        self.llm_client = llm_client or LLMClient()
         self.prompt_loader = PromptLoader()
         self.prompt_version = prompt_version
     
-    def analyser(self, logs: str, prompt_version: Optional[str] = None) -> str:
+    def _construire_prompts(self, logs: Union[str, Sequence[str]], version: str) -> Tuple[str, str]:
         """
-        Analyse les logs fournis
+        Construit le prompt système et le prompt utilisateur pour des logs
+        
+        Args:
+            logs: Contenu à insérer à la place des logs (ou fragments insérés bout à bout)
+            version: Version du prompt à utiliser
+        
+        Returns:
+            Tuple (system_prompt, user_prompt)
+        """
+        # Prompt précompilé : l'entrée n'est copiée qu'une fois dans le prompt final
+        prompt = self.prompt_loader.compile_prompt(
+            "analyseur_logs",
+            version,
+            fallback_header="## LOGS À ANALYSER",
+            input_name="logs"
+        )
+        return prompt.system_prompt, prompt.render(logs=logs)
+    
+    def resumer(self, logs: Union[str, Iterable[str]], max_templates: int = 2000) -> str:
+        """
+        Pré-traite les logs en flux : masquage des parties variables et regroupement par template
+        
+        Args:
+            logs: Texte des logs ou itérable de lignes (fichier ouvert, stdin...)
+            max_templates: Nombre maximum de templates conservés en mémoire
+        
+        Returns:
+            Résumé compact des logs, à envoyer au LLM à la place du texte brut
+        """
+        if isinstance(logs, LogSource):
+            return logs.summary(max_templates)
+        return LogTemplateSummarizer(max_templates=max_templates).feed(logs).render()
+    
+    def structurer(
+        self,
+        logs: Logs,
+        format_logs: Optional[str] = None,
+        filtre: Optional[LogFilter] = None,
+    ) -> ColonnesLogs:
+        """
+        Détecte le format des logs et extrait horodatage, sévérité, source et message en colonnes
+        
+        Args:
+            logs: Texte des logs, itérable de lignes ou LogSource (extraction en parallèle, mémorisée)
+            format_logs: Format à utiliser (par défaut: détecté sur les premières lignes)
+            filtre: N'extrait que les lignes retenues par le filtre et leur contexte (sans les
+                marqueurs d'omission), au format détecté sur les logs d'origine
+        
+        Returns:
+            Les colonnes, avec leurs agrégats (sévérités, chronologie, sources, erreurs)
+        """
+        if filtre is not None and filtre.actif:
+            resultat = self.filtrer(logs, filtre)
+            return extraire_colonnes(resultat.lignes, format_logs or resultat.format)
+        if isinstance(logs, LogSource):
+            return logs.derived(("colonnes", format_logs), lambda: extraire_colonnes(logs, format_logs))
+        return extraire_colonnes(logs, format_logs)
+    
+    @staticmethod
+    def filtrer(logs: Logs, filtre: LogFilter) -> ResultatFiltre:
+        """
+        Filtre les logs localement : plage horaire, sévérité minimale, motifs, lignes de contexte
+        
+        Pour un fichier (LogSource), l'index des horodatages et les derniers résultats
+        sont mémorisés : changer de plage horaire ne relit pas tout le fichier.
+        Aucun appel au LLM : utilisable sans instancier l'outil (AnalyseurLogs.filtrer).
+        
+        Args:
+            logs: Texte des logs, itérable de lignes ou LogSource
+            filtre: Critères de filtrage
+        
+        Returns:
+            Les logs filtrés et le nombre de lignes retenues
+        """
+        if not isinstance(logs, LogSource):
+            return filtrer_logs(logs, filtre)
+        resultats = logs.derived(("filtres",), dict)
+        if filtre not in resultats:
+            if len(resultats) >= 4:
+                del resultats[next(iter(resultats))]
+            resultats[filtre] = filtrer_logs(logs, filtre)
+        return resultats[filtre]
+    
+    def _filtrer_si_actif(self, logs: Logs, filtre: Optional[LogFilter]) -> Logs:
+        if filtre is not None and filtre.actif:
+            return self.filtrer(logs, filtre).texte
+        return logs
+    
+    def _preparer(
+        self,
+        logs: Logs,
+        version: str,
+        pretraitement: bool,
+        agregats: bool = False,
+        filtre: Optional[LogFilter] = None,
+    ) -> Union[str, Iterable[str], None]:
+        """
+        Contenu à insérer dans le prompt, ou None si le fichier doit être analysé par blocs
+        
+        Un fichier (LogSource) n'est décodé en entier que s'il tient dans la fenêtre du modèle.
+        """
+        if agregats:
+            return self.structurer(logs, filtre=filtre).rendu()
+        logs = self._filtrer_si_actif(logs, filtre)
+        if pretraitement:
+            return self.resumer(logs)
+        if isinstance(logs, LogSource):
+            system_prompt, _ = self._construire_prompts("", version)
+            if logs.estimated_tokens() > self.llm_client.prompt_budget(system_prompt):
+                return None
+            return logs.text()
+        return logs
+    
+    def estimer_cout(
+        self,
+        logs: Logs,
+        prompt_version: Optional[str] = None,
+        pretraitement: bool = False,
+        agregats: bool = False,
+        filtre: Optional[LogFilter] = None,
+    ) -> EstimationRequete:
+        """
+        Estime les tokens et le coût de l'analyse, sans appeler le LLM
         
         Args:
             logs: Contenu des logs à analyser
             prompt_version: Version du prompt à utiliser (par défaut: celle de l'instance)
+            pretraitement: Estime l'envoi du résumé par templates au lieu des logs bruts
+            agregats: Estime l'envoi des seuls agrégats (voir structurer)
+            filtre: Estime l'envoi des seules lignes retenues par le filtre (voir filtrer)
         
         Returns:
-            Analyse structurée des logs
+            L'estimation de la requête (tokens, fenêtre de contexte, coût)
         """
         version = prompt_version or self.prompt_version
+        if agregats:
+            logs = self.structurer(logs, filtre=filtre).rendu()
+        else:
+            logs = self._filtrer_si_actif(logs, filtre)
+            if pretraitement:
+                logs = self.resumer(logs)
+        if isinstance(logs, LogSource):
+            # Estimation d'après la taille du fichier, sans le décoder
+            system_prompt, user_prompt = self._construire_prompts("", version)
+            estimation = self.llm_client.estimate(user_prompt, system_prompt)
+            return replace(estimation, tokens_prompt=estimation.tokens_prompt + logs.estimated_tokens())
+        system_prompt, user_prompt = self._construire_prompts(logs, version)
+        return self.llm_client.estimate(user_prompt, system_prompt)
+    
+    @tool_operation("analyseur_logs")
+    def analyser(
+        self,
+        logs: Logs,
+        prompt_version: Optional[str] = None,
+        pretraitement: bool = False,
+        agregats: bool = False,
+        filtre: Optional[LogFilter] = None,
+    ) -> str:
+        """
+        Analyse les logs fournis
         
-        # Charge le prompt
-        prompt_template = self.prompt_loader.load_prompt("analyseur_logs", version)
-        
-        # Extrait le prompt système et utilisateur
-        system_prompt, user_prompt_template = self.prompt_loader.extract_system_prompt(
-            prompt_template
-        )
+        Args:
+            logs: Contenu des logs à analyser (ou itérable de lignes si pretraitement, ou LogSource)
+            prompt_version: Version du prompt à utiliser (par défaut: celle de l'instance)
+            pretraitement: Envoie un résumé par templates au lieu des logs bruts
+            agregats: Envoie uniquement les agrégats calculés localement (format détecté,
+                sévérités, chronologie des erreurs, sources les plus actives)
+            filtre: N'envoie que les lignes retenues par le filtre (et leur contexte)
         
-        # Construit le prompt utilisateur final
-        if user_prompt_template:
-            user_prompt = user_prompt_template.replace(
-                "[Les logs de l'utilisateur seront insérés ici]",
-                logs
-            )
-        else:
-            # Si pas de marqueur, on ajoute les logs à la fin
-            user_prompt = f"{prompt_template}\n\n## LOGS À ANALYSER\n\n{logs}"
-            system_prompt = prompt_template
+        Returns:
+            Analyse structurée des logs (par blocs si les logs dépassent la fenêtre de contexte)
+        """
+        version = prompt_version or self.prompt_version
+        contenu = self._preparer(logs, version, pretraitement, agregats, filtre)
+        if contenu is None:
+            return self.analyser_par_blocs(logs, prompt_version=version)
+        logs = contenu
+        system_prompt, user_prompt = self._construire_prompts(logs, version)
         
         # Génère l'analyse
         try:
@@ -56,9 +263,374 @@ class AnalyseurLogs:
                 temperature=0.3  # Température basse pour une analyse précise
             )
             return analyse
+        except ContextOverflowError:
+            # Trop volumineux pour un seul appel : analyse par blocs
+            return self.analyser_par_blocs(logs, prompt_version=version)
+        except Exception as e:
+            return f"Erreur lors de l'analyse: {str(e)}"
+    
+    @tool_operation("analyseur_logs")
+    def analyser_stream(
+        self,
+        logs: Logs,
+        prompt_version: Optional[str] = None,
+        pretraitement: bool = False,
+        agregats: bool = False,
+        filtre: Optional[LogFilter] = None,
+    ) -> Iterator[str]:
+        """
+        Variante d'analyser qui restitue l'analyse en flux
+        
+        Args:
+            logs: Contenu des logs à analyser (ou itérable de lignes si pretraitement, ou LogSource)
+            prompt_version: Version du prompt à utiliser (par défaut: celle de l'instance)
+            pretraitement: Envoie un résumé par templates au lieu des logs bruts
+            agregats: Envoie uniquement les agrégats calculés localement
+            filtre: N'envoie que les lignes retenues par le filtre (et leur contexte)
+        
+        Yields:
+            Fragments de l'analyse au fur et à mesure de la génération
+        """
+        version = prompt_version or self.prompt_version
+        contenu = self._preparer(logs, version, pretraitement, agregats, filtre)
+        if contenu is None:
+            yield self.analyser_par_blocs(logs, prompt_version=version)
+            return
+        logs = contenu
+        system_prompt, user_prompt = self._construire_prompts(logs, version)
+        
+        try:
+            yield from self.llm_client.generate_stream(
+                prompt=user_prompt,
+                system_prompt=system_prompt,
+                temperature=0.3
+            )
+        except ContextOverflowError:
+            # Levée avant le premier fragment : bascule sur l'analyse par blocs
+            yield self.analyser_par_blocs(logs, prompt_version=version)
+        except Exception as e:
+            yield f"Erreur lors de l'analyse: {str(e)}"
+    
+    @tool_operation("analyseur_logs")
+    def analyser_par_blocs(
+        self,
+        logs: Logs,
+        prompt_version: Optional[str] = None,
+        taille_bloc: Optional[int] = None,
+        concurrence: Optional[int] = None,
+        progression: Optional[Callable[[int, int], None]] = None,
+        pretraitement: bool = False,
+        filtre: Optional[LogFilter] = None,
+    ) -> str:
+        """
+        Analyse de gros volumes de logs en map-reduce
+        
+        Les logs sont découpés en blocs bornés en tokens (sur les fins de ligne),
+        analysés en parallèle, puis une passe de fusion produit le rapport final.
+        
+        Args:
+            logs: Contenu des logs à analyser (texte, itérable de lignes ou LogSource)
+            prompt_version: Version du prompt à utiliser (par défaut: celle de l'instance)
+            taille_bloc: Budget de tokens par bloc (par défaut: Config.LOG_CHUNK_TOKENS),
+                réduit si besoin pour que chaque requête tienne dans la fenêtre du modèle
+            concurrence: Nombre d'appels LLM simultanés (par défaut: Config.LOG_CHUNK_CONCURRENCY)
+            progression: Callback appelé avec (blocs_terminés, total_blocs)
+            pretraitement: Découpe le résumé par templates au lieu des logs bruts
+            filtre: Ne découpe que les lignes retenues par le filtre (et leur contexte)
+        
+        Returns:
+            Analyse structurée des logs
+        """
+        version = prompt_version or self.prompt_version
+        taille_bloc = taille_bloc or Config.LOG_CHUNK_TOKENS
+        concurrence = concurrence or Config.LOG_CHUNK_CONCURRENCY
+        logs = self._filtrer_si_actif(logs, filtre)
+        if pretraitement:
+            logs = self.resumer(logs)
+        elif isinstance(logs, LogSource):
+            logs = logs.iter_lines()
+        taille_max = self._taille_bloc_max(logs, version)
+        if taille_max is not None:
+            taille_bloc = min(taille_bloc, taille_max)
+        
+        blocs = list(decouper_en_blocs(logs, taille_bloc))
+        if len(blocs) <= 1:
+            # Appel direct (et non analyser) : pas de nouvelle bascule vers les blocs
+            system_prompt, user_prompt = self._construire_prompts("\n".join(blocs), version)
+            try:
+                resultat = self.llm_client.generate(
+                    prompt=user_prompt,
+                    system_prompt=system_prompt,
+                    temperature=0.3
+                )
+            except Exception as e:
+                resultat = f"Erreur lors de l'analyse: {str(e)}"
+            if progression:
+                progression(1, 1)
+            return resultat
+        
+        # Map : analyse partielle de chaque bloc
+        try:
+            analyses = self._analyser_blocs(
+                blocs, version, concurrence, progression, self._sortie_partielle(taille_bloc)
+            )
+        except Exception as e:
+            return f"Erreur lors de l'analyse: {str(e)}"
+        
+        # Reduce : fusion des analyses partielles
+        try:
+            return self._fusionner(analyses, version, taille_bloc, len(blocs))
         except Exception as e:
             return f"Erreur lors de l'analyse: {str(e)}"
     
+    def _taille_bloc_max(self, logs: Union[str, Iterable[str]], version: str) -> Optional[int]:
+        """
+        Taille de bloc maximale (en tokens estimés) pour tenir dans la fenêtre du modèle
+        
+        Le découpage utilise une estimation rapide ; elle est corrigée par le rapport
+        observé, sur un échantillon des logs, avec le tokenizer du fournisseur.
+        """
+        consigne = CONSIGNE_BLOC.format(index=0, total=0)
+        system_prompt, gabarit = self._construire_prompts([consigne, "\n\n"], version)
+        budget = self.llm_client.prompt_budget(system_prompt) - self.llm_client.estimate(gabarit).tokens_prompt
+        if isinstance(logs, str) and logs:
+            echantillon = logs[:65536]
+            ratio = self.llm_client.estimate(echantillon).tokens_prompt / estimer_tokens(echantillon)
+            budget = int(budget / max(1.0, ratio))
+        return budget if budget > 0 else None
+    
+    def _analyser_blocs(
+        self,
+        blocs: List[str],
+        version: str,
+        concurrence: int,
+        progression: Optional[Callable[[int, int], None]],
+        max_tokens: Optional[int] = None,
+    ) -> List[str]:
+        """Analyse chaque bloc en parallèle et retourne les analyses dans l'ordre (max_tokens par analyse)"""
+        total = len(blocs)
+        analyses: List[Optional[str]] = [None] * total
+        erreurs = []
+        
+        def analyser_bloc(index: int) -> str:
+            consigne = CONSIGNE_BLOC.format(index=index + 1, total=total)
+            system_prompt, user_prompt = self._construire_prompts(
+                [consigne, "\n\n", blocs[index]], version
+            )
+            return self.llm_client.generate(
+                prompt=user_prompt,
+                system_prompt=system_prompt,
+                temperature=0.3,
+                max_tokens=max_tokens
+            )
+        
+        # Le callback de progression est appelé depuis le thread appelant
+        # (Streamlit n'accepte pas les mises à jour depuis les threads du pool)
+        with ThreadPoolExecutor(max_workers=max(1, concurrence)) as executor:
+            # Chaque bloc hérite d'une copie du contexte (étiquettes outil/version des métriques)
+            futures = {
+                executor.submit(contextvars.copy_context().run, analyser_bloc, i): i for i in range(total)
+            }
+            for termines, future in enumerate(as_completed(futures), start=1):
+                index = futures[future]
+                try:
+                    analyses[index] = future.result()
+                except Exception as e:
+                    erreurs.append(e)
+                    analyses[index] = f"[Bloc {index + 1} non analysé: {e}]"
+                if progression:
+                    progression(termines, total)
+        
+        if len(erreurs) == total:
+            raise erreurs[0]
+        
+        return analyses
+    
+    @staticmethod
+    def _sortie_partielle(taille_bloc: int) -> int:
+        """
+        Tokens de sortie d'une analyse partielle ou d'une synthèse intermédiaire
+        
+        Bornés à la moitié du budget d'un bloc : une passe de fusion peut
+        toujours regrouper au moins deux sections.
+        """
+        return max(1, min(Config.MAX_TOKENS, taille_bloc // 2))
+    
+    def _fusionner(self, analyses: List[str], version: str, taille_bloc: int, total: int) -> str:
+        """Fusionne les analyses partielles, par étapes si elles dépassent le budget"""
+        sections = [f"### Analyse du bloc {i}\n\n{a}" for i, a in enumerate(analyses, start=1)]
+        sortie = self._sortie_partielle(taille_bloc)
+        
+        # Fusion hiérarchique tant que les analyses ne tiennent pas dans un bloc
+        while len(sections) > 1 and sum(estimer_tokens(s) for s in sections) > taille_bloc:
+            groupes = self._regrouper(sections, taille_bloc)
+            if len(groupes) == len(sections):
+                # Sections trop longues pour être regroupées : tronquées, puis fusionnées deux à deux
+                sections = [self._tronquer(s, taille_bloc // 2) for s in sections]
+                groupes = [sections[i:i + 2] for i in range(0, len(sections), 2)]
+            sections = [
+                f"### Synthèse intermédiaire {i}\n\n{self._appel_fusion(g, version, total, sortie)}"
+                for i, g in enumerate(groupes, start=1)
+            ]
+        
+        # Jamais d'appel final au-delà du budget (réponse plus longue que demandé)
+        if len(sections) == 1:
+            sections = [self._tronquer(sections[0], taille_bloc)]
+        return self._appel_fusion(sections, version, total)
+    
+    @staticmethod
+    def _tronquer(section: str, tokens: int) -> str:
+        """Tronque une section à un nombre de tokens estimés (marqueur compris)"""
+        limite = max(1, tokens - 2) * CARACTERES_PAR_TOKEN
+        return section if len(section) <= limite else section[:limite] + "\n[...]"
+    
+    def _appel_fusion(
+        self,
+        sections: List[str],
+        version: str,
+        total: int,
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        """Envoie une passe de fusion au LLM"""
+        contenu = [CONSIGNE_FUSION.format(total=total), "\n\n", "\n\n".join(sections)]
+        system_prompt, user_prompt = self._construire_prompts(contenu, version)
+        return self.llm_client.generate(
+            prompt=user_prompt,
+            system_prompt=system_prompt,
+            temperature=0.3,
+            max_tokens=max_tokens
+        )
+    
+    @staticmethod
+    def _regrouper(sections: List[str], taille_bloc: int) -> List[List[str]]:
+        """Regroupe des sections consécutives dans des groupes bornés en tokens"""
+        groupes: List[List[str]] = []
+        courant: List[str] = []
+        taille = 0
+        for section in sections:
+            tokens = estimer_tokens(section)
+            if courant and taille + tokens > taille_bloc:
+                groupes.append(courant)
+                courant, taille = [], 0
+            courant.append(section)
+            taille += tokens
+        if courant:
+            groupes.append(courant)
+        return groupes
+    
+    @tool_operation("analyseur_logs")
+    def analyser_delta(self, declenchement: Declenchement, prompt_version: Optional[str] = None) -> str:
+        """
+        Analyse les lignes reçues depuis la dernière analyse d'un suivi, avec le résumé cumulé
+        
+        Args:
+            declenchement: Nouvelles lignes et résumé (voir StatistiquesSuivi.declencher)
+            prompt_version: Version du prompt à utiliser (par défaut: celle de l'instance)
+        
+        Returns:
+            Analyse structurée des nouvelles lignes
+        """
+        version = prompt_version or self.prompt_version
+        consigne = CONSIGNE_SUIVI.format(
+            source=declenchement.source,
+            motif=MOTIFS_SUIVI.get(declenchement.motif, declenchement.motif)
+        )
+        resume = f"## Résumé cumulé\n\n{declenchement.resume}"
+        delta = declenchement.delta
+        system_prompt, _ = self._construire_prompts("", version)
+        if estimer_tokens(consigne) + estimer_tokens(resume) + estimer_tokens(delta) > (
+            self.llm_client.prompt_budget(system_prompt)
+        ):
+            # Trop de nouvelles lignes pour la fenêtre du modèle : résumées par templates
+            delta = self.resumer(delta)
+        entete = f"## Nouvelles lignes ({declenchement.lignes}, dont {declenchement.erreurs} erreur(s))"
+        if declenchement.omises:
+            entete += f"\n[... {declenchement.omises} ligne(s) plus anciennes non conservées ...]"
+        system_prompt, user_prompt = self._construire_prompts(
+            [consigne, "\n\n", resume, "\n\n", entete, "\n", delta], version
+        )
+        try:
+            return self.llm_client.generate(
+                prompt=user_prompt,
+                system_prompt=system_prompt,
+                temperature=0.3
+            )
+        except Exception as e:
+            return f"Erreur lors de l'analyse: {str(e)}"
+    
+    def suivre(
+        self,
+        suivis: Sequence[Suivi],
+        seuils: Optional[SeuilsSuivi] = None,
+        prompt_version: Optional[str] = None,
+        verifier_injection: bool = True,
+        duree: Optional[float] = None,
+        arret: Optional[threading.Event] = None,
+        intervalle_lecture: Optional[float] = None,
+    ) -> Iterator[Declenchement]:
+        """
+        Suivi continu : statistiques glissantes, et analyse des seules nouvelles lignes quand un seuil est atteint
+        
+        Args:
+            suivis: Fichiers (SuiviFichier) ou flux (SuiviFlux) suivis
+            seuils: Conditions de déclenchement (par défaut: Config.LOG_FOLLOW_*)
+            prompt_version: Version du prompt à utiliser (par défaut: celle de l'instance)
+            verifier_injection: N'envoie pas les nouvelles lignes contenant une prompt injection
+            duree: Durée maximale du suivi en secondes (par défaut: jusqu'à la fin des flux ou l'arrêt)
+            arret: Événement qui interrompt le suivi
+            intervalle_lecture: Secondes entre deux lectures sans nouvelles lignes
+                (par défaut: Config.LOG_FOLLOW_POLL_SECONDS)
+        
+        Yields:
+            Chaque analyse déclenchée, avec son résultat ; à la fin du suivi, les lignes
+            reçues depuis la dernière analyse sont analysées (motif "fin")
+        """
+        seuils = seuils or SeuilsSuivi()
+        intervalle_lecture = intervalle_lecture or Config.LOG_FOLLOW_POLL_SECONDS
+        statistiques = [StatistiquesSuivi(suivi.nom) for suivi in suivis]
+        debut = time.monotonic()
+        
+        def analyser(stats: StatistiquesSuivi, motif: str) -> Declenchement:
+            declenchement = stats.declencher(motif)
+            if verifier_injection and self.test_prompt_injection(declenchement.delta):
+                declenchement.resultat = (
+                    "Erreur lors de l'analyse: tentative de prompt injection détectée dans les nouvelles lignes"
+                )
+            else:
+                declenchement.resultat = self.analyser_delta(declenchement, prompt_version)
+            return declenchement
+        
+        while True:
+            recues = 0
+            for suivi, stats in zip(suivis, statistiques):
+                lignes = suivi.lire()
+                recues += len(lignes)
+                stats.ajouter(lignes)
+            
+            maintenant = time.monotonic()
+            for stats in statistiques:
+                motif = stats.motif(seuils, maintenant)
+                if motif:
+                    yield analyser(stats, motif)
+            
+            fin = (
+                all(suivi.termine for suivi in suivis)
+                or (duree is not None and maintenant - debut >= duree)
+                or (arret is not None and arret.is_set())
+            )
+            if fin:
+                for stats in statistiques:
+                    if stats.lignes_delta:
+                        yield analyser(stats, MOTIF_FIN)
+                return
+            if not recues:
+                # Rien de nouveau : attente avant la prochaine lecture
+                if arret is not None:
+                    arret.wait(intervalle_lecture)
+                else:
+                    time.sleep(intervalle_lecture)
+    
+    @tool_operation("analyseur_logs")
     def test_prompt_injection(self, logs: str) -> bool:
         """
         Test simple de prompt injection
@@ -70,26 +642,22 @@ class AnalyseurLogs:
         Returns:
             True si injection détectée, False sinon
         """
-        # Patterns basiques de prompt injection
-        injection_patterns = [
-            "ignore previous instructions",
-            "forget everything",
-            "you are now",
-            "system:",
-            "assistant:",
-            "user:",
-            "ignore the above",
-            "disregard",
-            "new instructions:"
-        ]
-        
-        logs_lower = logs.lower()
-        for pattern in injection_patterns:
-            if pattern in logs_lower:
-                return True
-        
-        return False
-
-
-
-
+        return get_scanner("logs").contains(logs)
+    
+    @tool_operation("analyseur_logs")
+    def detecter_injections(self, logs: Logs) -> List[InjectionMatch]:
+        """
+        Liste les motifs d'injection trouvés, avec leur position
+        
+        Args:
+            logs: Texte des logs, blocs successifs d'un flux (fichier lu par morceaux) ou LogSource
+        
+        Returns:
+            Les occurrences trouvées, dans l'ordre des logs
+        """
+        scanner = get_scanner("logs")
+        if isinstance(logs, str):
+            return scanner.scan(logs)
+        if isinstance(logs, LogSource):
+            logs = logs.iter_chunks()
+        return list(scanner.scan_stream(logs))
@@ -3,19 +3,43 @@ Outil 5: Générateur de Documentation Infra (Mermaid)
 Génère de la documentation d'infrastructure avec diagrammes Mermaid
 """
 
-from typing import Optional
+from typing import Iterator, Optional, Tuple
+from app.utils.injection_scanner import get_scanner
 from app.utils.llm_client import LLMClient
+from app.utils.metrics import tool_operation
 from app.utils.prompt_loader import PromptLoader
+from app.utils.token_counter import EstimationRequete
 
 
 class GenerateurDocInfra:
     """Générateur de documentation infrastructure utilisant l'IA"""
     
-    def __init__(self, prompt_version: str = "v1"):
-        self.llm_client = LLMClient()
+    def __init__(self, prompt_version: str = "v1", llm_client: Optional[LLMClient] = None):
+        self.llm_client = llm_client or LLMClient()
         self.prompt_loader = PromptLoader()
         self.prompt_version = prompt_version
     
+    def _construire_prompts(self, informations: str, version: str) -> Tuple[str, str]:
+        """
+        Construit le prompt système et le prompt utilisateur
+        
+        Args:
+            informations: Informations sur l'infrastructure à documenter
+            version: Version du prompt à utiliser
+        
+        Returns:
+            Tuple (system_prompt, user_prompt)
+        """
+        # Prompt précompilé : l'entrée n'est copiée qu'une fois dans le prompt final
+        prompt = self.prompt_loader.compile_prompt(
+            "generateur_doc_infra",
+            version,
+            fallback_header="## INFORMATIONS SUR L'INFRASTRUCTURE",
+            input_name="informations"
+        )
+        return prompt.system_prompt, prompt.render(informations=informations)
+    
+    @tool_operation("generateur_doc_infra")
     def generer(self, informations: str, prompt_version: Optional[str] = None) -> str:
         """
         Génère de la documentation d'infrastructure
@@ -28,24 +52,7 @@ class GenerateurDocInfra:
             Documentation générée avec diagrammes Mermaid
         """
         version = prompt_version or self.prompt_version
-        
-        # Charge le prompt
-        prompt_template = self.prompt_loader.load_prompt("generateur_doc_infra", version)
-        
-        # Extrait le prompt système et utilisateur
-        system_prompt, user_prompt_template = self.prompt_loader.extract_system_prompt(
-            prompt_template
-        )
-        
-        # Construit le prompt utilisateur final
-        if user_prompt_template:
-            user_prompt = user_prompt_template.replace(
-                "[Les informations de l'utilisateur seront insérées ici]",
-                informations
-            )
-        else:
-            user_prompt = f"{prompt_template}\n\n## INFORMATIONS SUR L'INFRASTRUCTURE\n\n{informations}"
-            system_prompt = prompt_template
+        system_prompt, user_prompt = self._construire_prompts(informations, version)
         
         # Génère la documentation
         try:
@@ -58,22 +65,48 @@ class GenerateurDocInfra:
         except Exception as e:
             return f"Erreur lors de la génération: {str(e)}"
     
-    def test_prompt_injection(self, informations: str) -> bool:
-        """Test simple de prompt injection"""
-        injection_patterns = [
-            "ignore previous instructions",
-            "forget everything",
-            "you are now",
-            "system:",
-            "assistant:",
-            "ignore the above"
-        ]
+    @tool_operation("generateur_doc_infra")
+    def generer_stream(self, informations: str, prompt_version: Optional[str] = None) -> Iterator[str]:
+        """
+        Variante de generer qui restitue la réponse en flux
         
-        informations_lower = informations.lower()
-        for pattern in injection_patterns:
-            if pattern in informations_lower:
-                return True
-        return False
+        Args:
+            informations: Informations sur l'infrastructure à documenter
+            prompt_version: Version du prompt à utiliser
+        
+        Yields:
+            Fragments de texte au fur et à mesure de la génération
+        """
+        version = prompt_version or self.prompt_version
+        system_prompt, user_prompt = self._construire_prompts(informations, version)
+        
+        try:
+            yield from self.llm_client.generate_stream(
+                prompt=user_prompt,
+                system_prompt=system_prompt,
+                temperature=0.4
+            )
+        except Exception as e:
+            yield f"Erreur lors de la génération: {str(e)}"
+    
+    def estimer_cout(self, informations: str, prompt_version: Optional[str] = None) -> EstimationRequete:
+        """
+        Estime les tokens et le coût de la génération, sans appeler le LLM
+        
+        Args:
+            informations: Informations sur l'infrastructure
+            prompt_version: Version du prompt à utiliser (par défaut: celle de l'instance)
+        
+        Returns:
+            L'estimation de la requête (tokens, fenêtre de contexte, coût)
+        """
+        system_prompt, user_prompt = self._construire_prompts(informations, prompt_version or self.prompt_version)
+        return self.llm_client.estimate(user_prompt, system_prompt)
+    
+    @tool_operation("generateur_doc_infra")
+    def test_prompt_injection(self, informations: str) -> bool:
+        """Test simple de prompt injection (scanner partagé, jeu de règles standard)"""
+        return get_scanner("standard").contains(informations)
 
 
 
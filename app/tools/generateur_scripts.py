@@ -3,19 +3,43 @@ Outil 2: Générateur de Scripts Bash/Python
 Génère des scripts d'automatisation DevOps
 """
 
-from typing import Optional
+from typing import Iterator, Optional, Tuple
+from app.utils.injection_scanner import get_scanner
 from app.utils.llm_client import LLMClient
+from app.utils.metrics import tool_operation
 from app.utils.prompt_loader import PromptLoader
+from app.utils.token_counter import EstimationRequete
 
 
 class GenerateurScripts:
     """Générateur de scripts utilisant l'IA"""
     
-    def __init__(self, prompt_version: str = "v1"):
-        self.llm_client = LLMClient()
+    def __init__(self, prompt_version: str = "v1", llm_client: Optional[LLMClient] = None):
+        self.llm_client = llm_client or LLMClient()
         self.prompt_loader = PromptLoader()
         self.prompt_version = prompt_version
     
+    def _construire_prompts(self, besoin: str, version: str) -> Tuple[str, str]:
+        """
+        Construit le prompt système et le prompt utilisateur
+        
+        Args:
+            besoin: Description de la tâche à automatiser
+            version: Version du prompt à utiliser
+        
+        Returns:
+            Tuple (system_prompt, user_prompt)
+        """
+        # Prompt précompilé : l'entrée n'est copiée qu'une fois dans le prompt final
+        prompt = self.prompt_loader.compile_prompt(
+            "generateur_scripts",
+            version,
+            fallback_header="## BESOIN DE L'UTILISATEUR",
+            input_name="besoin"
+        )
+        return prompt.system_prompt, prompt.render(besoin=besoin)
+    
+    @tool_operation("generateur_scripts")
     def generer(self, besoin: str, prompt_version: Optional[str] = None) -> str:
         """
         Génère un script selon le besoin
@@ -28,24 +52,7 @@ class GenerateurScripts:
             Script généré avec documentation
         """
         version = prompt_version or self.prompt_version
-        
-        # Charge le prompt
-        prompt_template = self.prompt_loader.load_prompt("generateur_scripts", version)
-        
-        # Extrait le prompt système et utilisateur
-        system_prompt, user_prompt_template = self.prompt_loader.extract_system_prompt(
-            prompt_template
-        )
-        
-        # Construit le prompt utilisateur final
-        if user_prompt_template:
-            user_prompt = user_prompt_template.replace(
-                "[Le besoin de l'utilisateur sera inséré ici]",
-                besoin
-            )
-        else:
-            user_prompt = f"{prompt_template}\n\n## BESOIN DE L'UTILISATEUR\n\n{besoin}"
-            system_prompt = prompt_template
+        system_prompt, user_prompt = self._construire_prompts(besoin, version)
         
         # Génère le script
         try:
@@ -58,22 +65,48 @@ class GenerateurScripts:
         except Exception as e:
             return f"Erreur lors de la génération: {str(e)}"
     
-    def test_prompt_injection(self, besoin: str) -> bool:
-        """Test simple de prompt injection"""
-        injection_patterns = [
-            "ignore previous instructions",
-            "forget everything",
-            "you are now",
-            "system:",
-            "assistant:",
-            "ignore the above"
-        ]
+    @tool_operation("generateur_scripts")
+    def generer_stream(self, besoin: str, prompt_version: Optional[str] = None) -> Iterator[str]:
+        """
+        Variante de generer qui restitue la réponse en flux
         
-        besoin_lower = besoin.lower()
-        for pattern in injection_patterns:
-            if pattern in besoin_lower:
-                return True
-        return False
+        Args:
+            besoin: Description de la tâche à automatiser
+            prompt_version: Version du prompt à utiliser
+        
+        Yields:
+            Fragments de texte au fur et à mesure de la génération
+        """
+        version = prompt_version or self.prompt_version
+        system_prompt, user_prompt = self._construire_prompts(besoin, version)
+        
+        try:
+            yield from self.llm_client.generate_stream(
+                prompt=user_prompt,
+                system_prompt=system_prompt,
+                temperature=0.5
+            )
+        except Exception as e:
+            yield f"Erreur lors de la génération: {str(e)}"
+    
+    def estimer_cout(self, besoin: str, prompt_version: Optional[str] = None) -> EstimationRequete:
+        """
+        Estime les tokens et le coût de la génération, sans appeler le LLM
+        
+        Args:
+            besoin: Description du besoin de l'utilisateur
+            prompt_version: Version du prompt à utiliser (par défaut: celle de l'instance)
+        
+        Returns:
+            L'estimation de la requête (tokens, fenêtre de contexte, coût)
+        """
+        system_prompt, user_prompt = self._construire_prompts(besoin, prompt_version or self.prompt_version)
+        return self.llm_client.estimate(user_prompt, system_prompt)
+    
+    @tool_operation("generateur_scripts")
+    def test_prompt_injection(self, besoin: str) -> bool:
+        """Test simple de prompt injection (scanner partagé, jeu de règles standard)"""
+        return get_scanner("standard").contains(besoin)
 
 
 
@@ -3,19 +3,43 @@ Outil 4: Assistant Troubleshooting Réseau
 Aide au diagnostic et résolution de problèmes réseau
 """
 
-from typing import Optional
+from typing import Iterator, Optional, Tuple
+from app.utils.injection_scanner import get_scanner
 from app.utils.llm_client import LLMClient
+from app.utils.metrics import tool_operation
 from app.utils.prompt_loader import PromptLoader
+from app.utils.token_counter import EstimationRequete
 
 
 class TroubleshootingReseau:
     """Assistant troubleshooting réseau utilisant l'IA"""
     
-    def __init__(self, prompt_version: str = "v1"):
-        self.llm_client = LLMClient()
+    def __init__(self, prompt_version: str = "v1", llm_client: Optional[LLMClient] = None):
+        self.llm_client = llm_client or LLMClient()
         self.prompt_loader = PromptLoader()
         self.prompt_version = prompt_version
     
+    def _construire_prompts(self, probleme: str, version: str) -> Tuple[str, str]:
+        """
+        Construit le prompt système et le prompt utilisateur
+        
+        Args:
+            probleme: Description du problème réseau
+            version: Version du prompt à utiliser
+        
+        Returns:
+            Tuple (system_prompt, user_prompt)
+        """
+        # Prompt précompilé : l'entrée n'est copiée qu'une fois dans le prompt final
+        prompt = self.prompt_loader.compile_prompt(
+            "troubleshooting_reseau",
+            version,
+            fallback_header="## PROBLÈME RÉSEAU À RÉSOUDRE",
+            input_name="probleme"
+        )
+        return prompt.system_prompt, prompt.render(probleme=probleme)
+    
+    @tool_operation("troubleshooting_reseau")
     def diagnostiquer(self, probleme: str, prompt_version: Optional[str] = None) -> str:
         """
         Diagnostique un problème réseau
@@ -28,24 +52,7 @@ class TroubleshootingReseau:
             Diagnostic et solutions proposées
         """
         version = prompt_version or self.prompt_version
-        
-        # Charge le prompt
-        prompt_template = self.prompt_loader.load_prompt("troubleshooting_reseau", version)
-        
-        # Extrait le prompt système et utilisateur
-        system_prompt, user_prompt_template = self.prompt_loader.extract_system_prompt(
-            prompt_template
-        )
-        
-        # Construit le prompt utilisateur final
-        if user_prompt_template:
-            user_prompt = user_prompt_template.replace(
-                "[Le problème de l'utilisateur sera inséré ici]",
-                probleme
-            )
-        else:
-            user_prompt = f"{prompt_template}\n\n## PROBLÈME RÉSEAU À RÉSOUDRE\n\n{probleme}"
-            system_prompt = prompt_template
+        system_prompt, user_prompt = self._construire_prompts(probleme, version)
         
         # Génère le diagnostic
         try:
@@ -58,22 +65,48 @@ class TroubleshootingReseau:
         except Exception as e:
             return f"Erreur lors du diagnostic: {str(e)}"
     
-    def test_prompt_injection(self, probleme: str) -> bool:
-        """Test simple de prompt injection"""
-        injection_patterns = [
-            "ignore previous instructions",
-            "forget everything",
-            "you are now",
-            "system:",
-            "assistant:",
-            "ignore the above"
-        ]
+    @tool_operation("troubleshooting_reseau")
+    def diagnostiquer_stream(self, probleme: str, prompt_version: Optional[str] = None) -> Iterator[str]:
+        """
+        Variante de diagnostiquer qui restitue la réponse en flux
+        
+        Args:
+            probleme: Description du problème réseau
+            prompt_version: Version du prompt à utiliser
         
-        probleme_lower = probleme.lower()
-        for pattern in injection_patterns:
-            if pattern in probleme_lower:
-                return True
-        return False
+        Yields:
+            Fragments de texte au fur et à mesure de la génération
+        """
+        version = prompt_version or self.prompt_version
+        system_prompt, user_prompt = self._construire_prompts(probleme, version)
+        
+        try:
+            yield from self.llm_client.generate_stream(
+                prompt=user_prompt,
+                system_prompt=system_prompt,
+                temperature=0.3
+            )
+        except Exception as e:
+            yield f"Erreur lors du diagnostic: {str(e)}"
+    
+    def estimer_cout(self, probleme: str, prompt_version: Optional[str] = None) -> EstimationRequete:
+        """
+        Estime les tokens et le coût de le diagnostic, sans appeler le LLM
+        
+        Args:
+            probleme: Description du problème réseau
+            prompt_version: Version du prompt à utiliser (par défaut: celle de l'instance)
+        
+        Returns:
+            L'estimation de la requête (tokens, fenêtre de contexte, coût)
+        """
+        system_prompt, user_prompt = self._construire_prompts(probleme, prompt_version or self.prompt_version)
+        return self.llm_client.estimate(user_prompt, system_prompt)
+    
+    @tool_operation("troubleshooting_reseau")
+    def test_prompt_injection(self, probleme: str) -> bool:
+        """Test simple de prompt injection (scanner partagé, jeu de règles standard)"""
+        return get_scanner("standard").contains(probleme)
 
 
 
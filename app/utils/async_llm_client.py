@@ -0,0 +1,333 @@
+"""
+Client asynchrone pour les LLM (OpenAI, Claude et Google AI)
+Permet de lancer des dizaines de requêtes simultanées sans un thread par requête
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.config.config import Config, LLMProvider
+from app.utils.client_registry import create_async_client
+from app.utils.gemini_models import get_gemini_model
+from app.utils.llm_client import build_claude_system, build_openai_messages
+from app.utils.log_chunker import estimer_tokens
+from app.utils.metrics import record_llm_call, span
+from app.utils.rate_limiter import (
+    FATAL,
+    RATE_LIMIT,
+    backoff_delay,
+    classify_error,
+    get_rate_limiter,
+)
+from app.utils.response_cache import ResponseCache, get_response_cache
+from app.utils.token_counter import cout_usage
+from app.utils.usage import TokenUsage, from_anthropic, from_gemini, from_openai, set_last_usage
+
+
+class AsyncLLMClient:
+    """Client asynchrone avec plafond de concurrence, limitation de débit et retries"""
+
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        api_key: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        self.provider = provider or Config.LLM_PROVIDER
+        self.api_key = api_key or Config.get_api_key(self.provider)
+        self.max_concurrency = max_concurrency or Config.ASYNC_MAX_CONCURRENCY
+        self._client = create_async_client(self.provider, self.api_key)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Créé à la première utilisation, dans la boucle d'événements courante
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        use_cache: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> str:
+        """
+        Génère une réponse à partir d'un prompt
+
+        Args:
+            prompt: Le prompt utilisateur
+            system_prompt: Prompt système (persona, instructions)
+            temperature: Température de génération (0.0-1.0)
+            max_tokens: Nombre maximum de tokens
+            use_cache: Active le cache des réponses (par défaut: Config.CACHE_ENABLED)
+            timeout: Délai maximum en secondes, attente du créneau comprise
+            **kwargs: Arguments additionnels spécifiques au fournisseur
+
+        Returns:
+            La réponse générée par le LLM
+
+        Raises:
+            asyncio.TimeoutError: Si le délai est dépassé
+            asyncio.CancelledError: Si la tâche est annulée
+        """
+        temperature = temperature or Config.TEMPERATURE
+        max_tokens = max_tokens or Config.MAX_TOKENS
+        use_cache = Config.CACHE_ENABLED if use_cache is None else use_cache
+        model = kwargs.get("model", self._default_model())
+        start = time.perf_counter()
+
+        with span("llm_generate", provider=self.provider, model=model):
+            call = self._generate_cached(prompt, system_prompt, temperature, max_tokens, use_cache, **kwargs)
+            try:
+                response, usage = await (asyncio.wait_for(call, timeout) if timeout else call)
+            except Exception as e:
+                self._record_call(model, start, error=e)
+                raise
+        # Usage collecté par collect_usage (coûts de l'évaluation), comme pour LLMClient
+        set_last_usage(usage)
+        self._record_call(model, start, usage=usage)
+        return response
+
+    async def _generate_cached(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        use_cache: bool,
+        **kwargs,
+    ) -> Tuple[str, Optional[TokenUsage]]:
+        """
+        Cache puis appel avec retries
+
+        Le cache SQLite est lu et écrit dans un thread : la boucle d'événements
+        n'est pas bloquée pendant les accès disque.
+        """
+        if not use_cache:
+            return await self._generate_with_retry(prompt, system_prompt, temperature, max_tokens, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        key = ResponseCache.make_key(
+            self.provider,
+            kwargs.get("model", self._default_model()),
+            temperature,
+            max_tokens,
+            system_prompt,
+            prompt,
+            extra={k: v for k, v in kwargs.items() if k != "model"},
+        )
+        cached = await loop.run_in_executor(None, lambda: get_response_cache().get(key))
+        if cached is not None:
+            usage = TokenUsage(
+                provider=self.provider,
+                model=kwargs.get("model", self._default_model()),
+                cached_response=True,
+            )
+            return cached, usage
+
+        response, usage = await self._generate_with_retry(
+            prompt, system_prompt, temperature, max_tokens, **kwargs
+        )
+        if response:
+            await loop.run_in_executor(None, lambda: get_response_cache().set(key, response))
+        return response, usage
+
+    def _record_call(
+        self,
+        model: str,
+        start: float,
+        usage: Optional[TokenUsage] = None,
+        error: Optional[BaseException] = None,
+    ):
+        """Métriques d'un appel : durée, statut, tokens (y compris cache du fournisseur) et coût"""
+        duration = time.perf_counter() - start
+        if error is not None:
+            record_llm_call(self.provider, model, duration, "error")
+        elif usage is not None and usage.cached_response:
+            record_llm_call(usage.provider, usage.model, duration, "cache_hit")
+        elif usage is not None:
+            record_llm_call(usage.provider, usage.model, duration, "ok", usage=usage, cost=cout_usage(usage))
+        else:
+            record_llm_call(self.provider, model, duration, "ok")
+
+    async def generate_many(
+        self,
+        requests: Iterable[Dict[str, Any]],
+        return_exceptions: bool = True,
+    ) -> List[Any]:
+        """
+        Lance un lot de requêtes en parallèle (dans la limite de max_concurrency)
+
+        Args:
+            requests: Arguments de generate pour chaque requête
+            return_exceptions: Retourne les exceptions dans la liste au lieu
+                d'annuler tout le lot à la première erreur
+
+        Returns:
+            Les réponses (ou exceptions), dans l'ordre des requêtes
+        """
+        tasks = [asyncio.ensure_future(self.generate(**request)) for request in requests]
+        try:
+            return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+        except BaseException:
+            # Erreur ou annulation : on annule les requêtes encore en cours
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def aclose(self):
+        """Ferme les connexions HTTP du client"""
+        close = getattr(self._client, "close", None)
+        if close is not None and self.provider not in (LLMProvider.GOOGLE.value, LLMProvider.MOCK.value):
+            await close()
+
+    async def __aenter__(self) -> "AsyncLLMClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def _default_model(self) -> str:
+        """Retourne le modèle par défaut du fournisseur de ce client"""
+        return Config.get_model(self.provider)
+
+    async def _generate_with_retry(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        **kwargs,
+    ) -> Tuple[str, Optional[TokenUsage]]:
+        """Appelle le fournisseur sous le sémaphore et le limiteur de débit, avec retries"""
+        limiter = get_rate_limiter(self.provider, kwargs.get("model", self._default_model()))
+        tokens = estimer_tokens(system_prompt or "") + estimer_tokens(prompt) + max_tokens
+
+        attempt = 0
+        while True:
+            async with self._get_semaphore():
+                await limiter.acquire_async(tokens)
+                try:
+                    return await self._generate(
+                        prompt, system_prompt, temperature, max_tokens, **kwargs
+                    )
+                except Exception as e:
+                    kind = classify_error(e)
+                    if kind == FATAL or attempt >= Config.LLM_MAX_RETRIES:
+                        raise
+                    delay = backoff_delay(attempt, e)
+                    # Après un 429, tous les clients du processus marquent une pause
+                    if kind == RATE_LIMIT:
+                        limiter.pause(delay)
+                    attempt += 1
+            if kind != RATE_LIMIT:
+                await asyncio.sleep(delay)
+
+    async def _generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        **kwargs,
+    ) -> Tuple[str, Optional[TokenUsage]]:
+        """Appelle le fournisseur configuré (réponse et tokens consommés)"""
+        if self.provider == LLMProvider.OPENAI.value:
+            return await self._generate_openai(
+                prompt, system_prompt, temperature, max_tokens, **kwargs
+            )
+        if self.provider == LLMProvider.CLAUDE.value:
+            return await self._generate_claude(
+                prompt, system_prompt, temperature, max_tokens, **kwargs
+            )
+        if self.provider == LLMProvider.GOOGLE.value:
+            return await self._generate_google(
+                prompt, system_prompt, temperature, max_tokens, **kwargs
+            )
+        if self.provider == LLMProvider.MOCK.value:
+            return await self._generate_mock(prompt, system_prompt, max_tokens, **kwargs)
+
+        raise ValueError(f"Fournisseur LLM non supporté: {self.provider}")
+
+    async def _generate_openai(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        **kwargs,
+    ) -> Tuple[str, Optional[TokenUsage]]:
+        """Génère une réponse via OpenAI"""
+        model = kwargs.get("model", Config.OPENAI_MODEL)
+        response = await self._client.chat.completions.create(
+            model=model,
+            messages=build_openai_messages(system_prompt, prompt),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **{k: v for k, v in kwargs.items() if k != "model"},
+        )
+
+        usage = from_openai(self.provider, model, getattr(response, "usage", None))
+        return response.choices[0].message.content, usage
+
+    async def _generate_claude(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        **kwargs,
+    ) -> Tuple[str, Optional[TokenUsage]]:
+        """Génère une réponse via Claude (Anthropic)"""
+        model = kwargs.get("model", Config.CLAUDE_MODEL)
+        response = await self._client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system=build_claude_system(system_prompt),
+            messages=[{"role": "user", "content": prompt}],
+            **{k: v for k, v in kwargs.items() if k != "model"},
+        )
+
+        usage = from_anthropic(self.provider, model, getattr(response, "usage", None))
+        return response.content[0].text, usage
+
+    async def _generate_google(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        **kwargs,
+    ) -> Tuple[str, Optional[TokenUsage]]:
+        """Génère une réponse via Google AI (Gemini)"""
+        model_name = kwargs.get("model", Config.GOOGLE_MODEL)
+        model = get_gemini_model(self._client, model_name, system_prompt)
+        response = await model.generate_content_async(
+            prompt,
+            generation_config={
+                "temperature": temperature,
+                "max_output_tokens": max_tokens,
+            },
+        )
+
+        usage = from_gemini(self.provider, model_name, getattr(response, "usage_metadata", None))
+        return getattr(response, "text", str(response)), usage
+
+    async def _generate_mock(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        max_tokens: int,
+        **kwargs,
+    ) -> Tuple[str, Optional[TokenUsage]]:
+        """Génère une réponse simulée (aucun appel réseau)"""
+        return await self._client.acomplete(
+            prompt, system_prompt, max_tokens, kwargs.get("model", Config.MOCK_MODEL)
+        )
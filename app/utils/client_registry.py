@@ -0,0 +1,151 @@
+"""
+Registre des clients SDK des fournisseurs LLM
+Un seul client par (fournisseur, clé API) pour tout le processus, afin de
+réutiliser les pools de connexions HTTP keep-alive entre les requêtes.
+Les retries internes des SDK sont désactivés : ils sont gérés par LLMClient.
+"""
+
+import threading
+from typing import Any, Dict, Tuple
+
+from app.config.config import Config, LLMProvider
+from app.utils.gemini_models import clear_gemini_models
+
+
+_clients: Dict[Tuple[str, str], Any] = {}
+_lock = threading.Lock()
+
+
+def _http_client(asynchrone: bool = False):
+    """Client httpx avec un pool de connexions keep-alive"""
+    import httpx
+
+    client_class = httpx.AsyncClient if asynchrone else httpx.Client
+    return client_class(
+        limits=httpx.Limits(
+            max_connections=Config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(Config.HTTP_TIMEOUT, connect=10.0),
+    )
+
+
+def _create_client(provider: str, api_key: str) -> Any:
+    """Instancie le client SDK d'un fournisseur"""
+    if provider == LLMProvider.OPENAI.value:
+        try:
+            import openai
+        except ImportError:
+            raise ImportError(
+                "Le package 'openai' n'est pas installé. Installez-le avec: pip install openai"
+            )
+        return openai.OpenAI(api_key=api_key, http_client=_http_client(), max_retries=0)
+
+    if provider == LLMProvider.CLAUDE.value:
+        try:
+            import anthropic
+        except ImportError:
+            raise ImportError(
+                "Le package 'anthropic' n'est pas installé. Installez-le avec: pip install anthropic"
+            )
+        return anthropic.Anthropic(api_key=api_key, http_client=_http_client(), max_retries=0)
+
+    if provider == LLMProvider.GOOGLE.value:
+        try:
+            import google.generativeai as genai
+        except ImportError:
+            raise ImportError(
+                "Le package 'google-generativeai' n'est pas installé. "
+                "Installez-le avec: pip install google-generativeai"
+            )
+        # Pour Google, on stocke directement le module configuré
+        genai.configure(api_key=api_key)
+        return genai
+
+    if provider == LLMProvider.MOCK.value:
+        from app.utils.mock_llm import MockLLM
+
+        return MockLLM()
+
+    raise ValueError(f"Fournisseur LLM non supporté: {provider}")
+
+
+def create_async_client(provider: str, api_key: str) -> Any:
+    """
+    Instancie un client SDK asynchrone pour un fournisseur
+
+    Les clients asynchrones sont liés à une boucle d'événements : ils ne sont
+    pas enregistrés dans le registre partagé mais appartiennent à leur appelant.
+
+    Args:
+        provider: Fournisseur LLM (openai, claude, google, mock)
+        api_key: Clé API du fournisseur
+
+    Returns:
+        Le client SDK asynchrone
+    """
+    if provider == LLMProvider.OPENAI.value:
+        try:
+            import openai
+        except ImportError:
+            raise ImportError(
+                "Le package 'openai' n'est pas installé. Installez-le avec: pip install openai"
+            )
+        return openai.AsyncOpenAI(
+            api_key=api_key, http_client=_http_client(asynchrone=True), max_retries=0
+        )
+
+    if provider == LLMProvider.CLAUDE.value:
+        try:
+            import anthropic
+        except ImportError:
+            raise ImportError(
+                "Le package 'anthropic' n'est pas installé. Installez-le avec: pip install anthropic"
+            )
+        return anthropic.AsyncAnthropic(
+            api_key=api_key, http_client=_http_client(asynchrone=True), max_retries=0
+        )
+
+    # Gemini expose des méthodes *_async sur le même module configuré ; le client simulé aussi
+    return get_provider_client(provider, api_key)
+
+
+def get_provider_client(provider: str, api_key: str) -> Any:
+    """
+    Retourne le client SDK partagé pour un fournisseur et une clé API
+
+    Args:
+        provider: Fournisseur LLM (openai, claude, google, mock)
+        api_key: Clé API du fournisseur
+
+    Returns:
+        Le client SDK (créé au premier appel, réutilisé ensuite)
+    """
+    key = (provider, api_key or "")
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            # google.generativeai est configuré globalement : une seule clé active
+            if provider == LLMProvider.GOOGLE.value:
+                for existing in [k for k in _clients if k[0] == provider]:
+                    del _clients[existing]
+                # Les modèles et contenus mis en cache appartiennent à l'ancienne clé
+                clear_gemini_models()
+            client = _create_client(provider, api_key)
+            _clients[key] = client
+        return client
+
+
+def clear_clients():
+    """Ferme et oublie tous les clients enregistrés"""
+    with _lock:
+        for client in _clients.values():
+            close = getattr(client, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception:
+                    pass
+        _clients.clear()
+    clear_gemini_models()
@@ -0,0 +1,110 @@
+"""
+Bascule entre fournisseurs LLM et requêtes couvertes (hedging)
+Suit la latence observée par fournisseur pour calibrer le délai de couverture
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from app.config.config import Config
+
+
+class LatencyTracker:
+    """Fenêtre glissante des latences réussies, par fournisseur/modèle"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, model: str, seconds: float):
+        """Enregistre la durée d'un appel réussi"""
+        with self._lock:
+            samples = self._samples.setdefault((provider, model), deque(maxlen=self.window))
+            samples.append(seconds)
+
+    def percentile(self, provider: str, model: str, q: float = 0.95) -> Optional[float]:
+        """
+        Percentile des latences observées
+
+        Args:
+            provider: Fournisseur LLM
+            model: Nom du modèle
+            q: Percentile souhaité (0.0-1.0)
+
+        Returns:
+            Latence en secondes, ou None s'il y a trop peu d'échantillons
+        """
+        with self._lock:
+            samples = sorted(self._samples.get((provider, model), ()))
+        if len(samples) < Config.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+latency_tracker = LatencyTracker()
+
+# Pool dédié aux appels concurrents ; les appels perdants se terminent en arrière-plan
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-failover")
+
+
+def run_with_failover(
+    calls: Sequence[Callable[[], str]],
+    latency_budget: Optional[float] = None,
+    hedge_delay: Optional[float] = None,
+) -> str:
+    """
+    Exécute des appels équivalents dans l'ordre, jusqu'à obtenir une réponse
+
+    L'appel suivant est lancé quand le précédent échoue, quand il dépasse le
+    budget de latence, ou (hedging) quand le délai de couverture est écoulé
+    pour le deuxième appel. La première réponse obtenue l'emporte.
+
+    Args:
+        calls: Appels par ordre de préférence
+        latency_budget: Délai (s) au-delà duquel on lance l'appel suivant
+        hedge_delay: Délai (s) avant de doubler le premier appel par le deuxième
+
+    Returns:
+        La première réponse obtenue
+
+    Raises:
+        Exception: La dernière erreur si tous les appels échouent
+    """
+    pending: Dict[Future, int] = {}
+    errors: List[Exception] = []
+    next_index = 0
+
+    def launch():
+        nonlocal next_index
+        pending[_executor.submit(calls[next_index])] = next_index
+        next_index += 1
+
+    launch()
+    while pending:
+        timeout = None
+        if next_index < len(calls):
+            delays = [d for d in (latency_budget,) if d]
+            if hedge_delay and next_index == 1:
+                delays.append(hedge_delay)
+            timeout = min(delays) if delays else None
+
+        done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            # Délai écoulé : on lance l'appel suivant sans abandonner les précédents
+            launch()
+            continue
+
+        for future in done:
+            del pending[future]
+            try:
+                return future.result()
+            except Exception as e:
+                errors.append(e)
+
+        if not pending and next_index < len(calls):
+            launch()
+
+    raise errors[-1]
@@ -0,0 +1,102 @@
+"""
+Cache des modèles Gemini (GenerativeModel) par (modèle, prompt système)
+Le prompt système est transmis nativement (system_instruction) au lieu d'être
+recollé au texte utilisateur. S'il est assez long, il peut aussi être mis en
+cache côté Google (context caching) pour ne plus être retraité à chaque requête.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Set, Tuple
+
+from app.config.config import Config
+from app.utils.log_chunker import estimer_tokens
+
+
+# Marge avant l'expiration du cache Google, pour ne jamais utiliser un cache expiré
+_MARGE_EXPIRATION = 60.0
+
+# (modèle, prompt système) -> (modèle Gemini, contenu mis en cache ou None, expiration monotone ou None)
+_models: "OrderedDict[Tuple[str, str], Tuple[Any, Any, Optional[float]]]" = OrderedDict()
+# Couples pour lesquels la mise en cache a échoué (modèle non éligible, quota...) : pas de nouvel essai
+_context_cache_failures: Set[Tuple[str, str]] = set()
+_lock = threading.Lock()
+
+
+def _create_cached_model(genai, model_name: str, system_instruction: str) -> Tuple[Any, Any, float]:
+    """Crée le contenu mis en cache côté Google et le modèle qui s'appuie dessus"""
+    import datetime
+
+    from google.generativeai import caching
+
+    cached = caching.CachedContent.create(
+        model=model_name,
+        system_instruction=system_instruction,
+        ttl=datetime.timedelta(seconds=Config.GOOGLE_CONTEXT_CACHE_TTL),
+    )
+    model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+    expires = time.monotonic() + max(0.0, Config.GOOGLE_CONTEXT_CACHE_TTL - _MARGE_EXPIRATION)
+    return model, cached, expires
+
+
+def _use_context_cache(key: Tuple[str, str]) -> bool:
+    return (
+        Config.GOOGLE_CONTEXT_CACHE
+        and key not in _context_cache_failures
+        and estimer_tokens(key[1]) >= Config.GOOGLE_CONTEXT_CACHE_MIN_TOKENS
+    )
+
+
+def get_gemini_model(genai, model_name: str, system_instruction: Optional[str] = None) -> Any:
+    """
+    Retourne le modèle Gemini (réutilisé) pour un modèle et un prompt système
+
+    Args:
+        genai: Module google.generativeai configuré
+        model_name: Nom du modèle Gemini
+        system_instruction: Prompt système (persona, instructions)
+
+    Returns:
+        Le GenerativeModel, adossé au cache de contexte Google si activé et possible
+    """
+    key = (model_name, system_instruction or "")
+    with _lock:
+        entry = _models.get(key)
+        if entry is not None and (entry[2] is None or entry[2] > time.monotonic()):
+            _models.move_to_end(key)
+            return entry[0]
+        use_context_cache = _use_context_cache(key)
+
+    entry = None
+    if use_context_cache:
+        try:
+            entry = _create_cached_model(genai, model_name, key[1])
+        except Exception:
+            # Modèle non éligible, prompt trop court, SDK trop ancien... : modèle classique
+            with _lock:
+                _context_cache_failures.add(key)
+    if entry is None:
+        model = genai.GenerativeModel(model_name, system_instruction=system_instruction or None)
+        entry = (model, None, None)
+
+    with _lock:
+        _models[key] = entry
+        _models.move_to_end(key)
+        while len(_models) > Config.GOOGLE_MODEL_CACHE_SIZE:
+            _models.popitem(last=False)
+    return entry[0]
+
+
+def clear_gemini_models():
+    """Oublie les modèles et supprime les contenus mis en cache côté Google"""
+    with _lock:
+        entries = list(_models.values())
+        _models.clear()
+        _context_cache_failures.clear()
+    for _, cached, _ in entries:
+        if cached is not None:
+            try:
+                cached.delete()
+            except Exception:
+                pass
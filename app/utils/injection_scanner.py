@@ -0,0 +1,170 @@
+"""
+Détection de prompt injection partagée par tous les outils
+Tous les motifs sont compilés en une seule expression régulière, insensible
+à la casse : l'entrée est parcourue en un seul passage, sans copie en minuscules
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from app.config.config import Config
+
+
+# Jeux de règles intégrés (motifs littéraux)
+RULE_SETS: Dict[str, List[str]] = {
+    "standard": [
+        "ignore previous instructions",
+        "forget everything",
+        "you are now",
+        "system:",
+        "assistant:",
+        "ignore the above",
+    ],
+    "logs": [
+        "ignore previous instructions",
+        "forget everything",
+        "you are now",
+        "system:",
+        "assistant:",
+        "user:",
+        "ignore the above",
+        "disregard",
+        "new instructions:",
+    ],
+}
+
+# Préfixe d'une règle exprimée en expression régulière dans le fichier de règles
+REGEX_PREFIX = "re:"
+
+
+@dataclass(frozen=True)
+class InjectionMatch:
+    """Occurrence d'un motif suspect"""
+    position: int  # Position (en caractères) dans l'entrée complète
+    text: str      # Texte trouvé, tel qu'il apparaît dans l'entrée
+    rule: str      # Règle qui a détecté l'occurrence
+
+
+class InjectionScanner:
+    """Scanner multi-motifs en un seul passage"""
+
+    def __init__(self, rules: Sequence[str]):
+        """
+        Args:
+            rules: Motifs littéraux, ou expressions régulières préfixées par "re:"
+        """
+        self.rules = list(dict.fromkeys(rules))
+        alternatives = []
+        self._max_length = 1
+        for index, rule in enumerate(self.rules):
+            if rule.startswith(REGEX_PREFIX):
+                motif = rule[len(REGEX_PREFIX):]
+                # Longueur inconnue : on garde une marge raisonnable entre deux blocs
+                self._max_length = max(self._max_length, 256)
+            else:
+                motif = re.escape(rule)
+                self._max_length = max(self._max_length, len(rule))
+            alternatives.append(f"(?P<r{index}>{motif})")
+        self._regex = re.compile("|".join(alternatives) or r"(?!x)x", re.IGNORECASE)
+
+    def contains(self, text: str) -> bool:
+        """Indique si l'entrée contient au moins un motif (arrêt au premier trouvé)"""
+        return self._regex.search(text) is not None
+
+    def scan(self, text: str, offset: int = 0) -> List[InjectionMatch]:
+        """
+        Liste toutes les occurrences de motifs suspects
+
+        Args:
+            text: Entrée à analyser
+            offset: Décalage ajouté aux positions retournées
+
+        Returns:
+            Les occurrences, dans l'ordre de l'entrée
+        """
+        return [self._to_match(m, offset) for m in self._regex.finditer(text)]
+
+    def scan_stream(self, chunks: Iterable[str]) -> Iterator[InjectionMatch]:
+        """
+        Analyse une entrée découpée en blocs (fichier lu par morceaux, flux...)
+
+        Les motifs à cheval sur deux blocs sont détectés grâce à un recouvrement
+        de la longueur du plus long motif ; la mémoire reste bornée par la taille d'un bloc.
+
+        Args:
+            chunks: Blocs successifs de l'entrée
+
+        Yields:
+            Les occurrences, avec leur position dans l'entrée complète
+        """
+        tail = ""
+        consumed = 0  # Position, dans l'entrée complète, du début du bloc courant
+        for chunk in chunks:
+            if not chunk:
+                continue
+            buffer = tail + chunk if tail else chunk
+            start = consumed - len(tail)
+            for m in self._regex.finditer(buffer):
+                # Une occurrence entièrement dans le recouvrement a déjà été signalée
+                if m.end() > len(tail):
+                    yield self._to_match(m, start)
+            consumed += len(chunk)
+            tail = buffer[-(self._max_length - 1):] if self._max_length > 1 else ""
+
+    def contains_stream(self, chunks: Iterable[str]) -> bool:
+        """Variante de contains pour une entrée découpée en blocs"""
+        for _ in self.scan_stream(chunks):
+            return True
+        return False
+
+    def _to_match(self, match: "re.Match", offset: int) -> InjectionMatch:
+        rule = self.rules[int(match.lastgroup[1:])]
+        return InjectionMatch(position=offset + match.start(), text=match.group(0), rule=rule)
+
+
+def load_rules_file(path: str) -> List[str]:
+    """
+    Charge des règles supplémentaires depuis un fichier (une règle par ligne)
+
+    Les lignes vides et celles commençant par "#" sont ignorées.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return [
+            line.strip() for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+
+_scanners: Dict[str, InjectionScanner] = {}
+_scanners_lock = threading.Lock()
+
+
+def get_scanner(rule_set: str = "standard", extra_rules: Optional[Sequence[str]] = None) -> InjectionScanner:
+    """
+    Retourne le scanner (compilé une seule fois) d'un jeu de règles
+
+    Les règles du fichier Config.INJECTION_RULES_FILE, s'il est défini,
+    s'ajoutent à chaque jeu de règles.
+
+    Args:
+        rule_set: Nom du jeu de règles ("standard", "logs")
+        extra_rules: Règles supplémentaires propres à l'appelant
+
+    Returns:
+        Le scanner correspondant
+    """
+    key = "\x1f".join([rule_set, *(extra_rules or [])])
+    with _scanners_lock:
+        scanner = _scanners.get(key)
+        if scanner is None:
+            if rule_set not in RULE_SETS:
+                raise ValueError(f"Jeu de règles d'injection inconnu: {rule_set}")
+            rules = list(RULE_SETS[rule_set])
+            if Config.INJECTION_RULES_FILE:
+                rules.extend(load_rules_file(Config.INJECTION_RULES_FILE))
+            rules.extend(extra_rules or [])
+            scanner = InjectionScanner(rules)
+            _scanners[key] = scanner
+        return scanner
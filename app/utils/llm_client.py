@@ -1,53 +1,116 @@
 """
-Client abstrait pour les LLM (OpenAI, Claude et Google AI)
+Client abstrait pour les LLM (OpenAI, Claude et Google AI, ou fournisseur simulé)
 Permet de changer facilement de fournisseur via la configuration
 """
 
-from typing import Optional
+import time
+from typing import Iterator, List, Optional
 from app.config.config import Config, LLMProvider
+from app.utils.client_registry import get_provider_client
+from app.utils.failover import latency_tracker, run_with_failover
+from app.utils.gemini_models import get_gemini_model
+from app.utils.log_chunker import estimer_tokens
+from app.utils.metrics import record_llm_call, span
+from app.utils.rate_limiter import (
+    FATAL,
+    RATE_LIMIT,
+    backoff_delay,
+    classify_error,
+    get_rate_limiter,
+)
+from app.utils.response_cache import ResponseCache, get_response_cache
+from app.utils.token_counter import (
+    ContextOverflowError,
+    EstimationRequete,
+    budget_prompt,
+    cout_usage,
+    estimer_requete,
+    planifier_requete,
+)
+from app.utils.usage import (
+    TokenUsage,
+    from_anthropic,
+    from_gemini,
+    from_openai,
+    get_last_usage,
+    set_last_usage,
+)
+
+
+def build_claude_system(system_prompt: Optional[str]):
+    """
+    Prompt système Claude, marqué comme mis en cache (cache_control) si activé
+
+    Le prompt système des outils est statique : Anthropic le relit depuis son
+    cache tant qu'il reste identique octet pour octet (TTL de quelques minutes).
+    """
+    if not system_prompt or not Config.CLAUDE_PROMPT_CACHE:
+        return system_prompt or ""
+    return [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+
+
+def build_openai_messages(system_prompt: Optional[str], prompt: str) -> List[dict]:
+    """
+    Messages OpenAI : la partie statique (prompt système) toujours en tête
+
+    OpenAI met en cache les préfixes identiques d'au moins 1024 tokens ; rien de
+    variable ne doit donc précéder ou modifier le prompt système.
+    """
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    return messages
 
 
 class LLMClient:
     """Client abstrait pour interagir avec les LLM"""
 
-    def __init__(self):
-        self.provider = Config.LLM_PROVIDER
-        self.api_key = Config.get_api_key()
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        api_key: Optional[str] = None,
+        fallback_providers: Optional[List[str]] = None,
+        use_cache: Optional[bool] = None,
+    ):
+        self.provider = provider or Config.LLM_PROVIDER
+        # Cache des réponses pour ce client (par défaut: Config.CACHE_ENABLED)
+        self.use_cache = use_cache
+        self.api_key = api_key or Config.get_api_key(self.provider)
+        if fallback_providers is None:
+            fallback_providers = Config.LLM_FALLBACK_PROVIDERS
+        self.fallback_providers = [p for p in fallback_providers if p != self.provider]
+        self._fallbacks: Optional[List["LLMClient"]] = None
         self._client = None
         self._initialize_client()
 
     def _initialize_client(self):
-        """Initialise le client selon le fournisseur configuré"""
-        if self.provider == LLMProvider.OPENAI.value:
-            try:
-                import openai
-                self._client = openai.OpenAI(api_key=self.api_key)
-            except ImportError:
-                raise ImportError(
-                    "Le package 'openai' n'est pas installé. Installez-le avec: pip install openai"
-                )
+        """Récupère le client partagé du fournisseur (pool de connexions réutilisé)"""
+        self._client = get_provider_client(self.provider, self.api_key)
 
-        elif self.provider == LLMProvider.CLAUDE.value:
-            try:
-                import anthropic
-                self._client = anthropic.Anthropic(api_key=self.api_key)
-            except ImportError:
-                raise ImportError(
-                    "Le package 'anthropic' n'est pas installé. Installez-le avec: pip install anthropic"
-                )
+    def _fallback_clients(self) -> List["LLMClient"]:
+        """Clients de secours, créés à la première bascule (fournisseurs sans clé ignorés)"""
+        if self._fallbacks is None:
+            fallbacks = []
+            for provider in self.fallback_providers:
+                if not Config.get_api_key(provider):
+                    continue
+                try:
+                    fallbacks.append(LLMClient(provider=provider, fallback_providers=[]))
+                except ImportError:
+                    continue
+            self._fallbacks = fallbacks
+        return self._fallbacks
 
-        elif self.provider == LLMProvider.GOOGLE.value:
-            try:
-                import google.generativeai as genai
-
-                genai.configure(api_key=self.api_key)
-                # Pour Google, on stocke directement le module configuré
-                self._client = genai
-            except ImportError:
-                raise ImportError(
-                    "Le package 'google-generativeai' n'est pas installé. "
-                    "Installez-le avec: pip install google-generativeai"
-                )
+    @property
+    def last_usage(self) -> Optional[TokenUsage]:
+        """
+        Tokens consommés par le dernier appel du thread courant
+
+        Inclut les tokens lus et écrits dans le cache de prompt du fournisseur ;
+        cached_response vaut True si la réponse venait du cache local.
+        """
+        return get_last_usage()
 
     def generate(
         self,
@@ -55,24 +118,477 @@ class LLMClient:
         system_prompt: Optional[str] = None,
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
+        use_cache: Optional[bool] = None,
+        overflow: Optional[str] = None,
         **kwargs,
     ) -> str:
         """
         Génère une réponse à partir d'un prompt
 
+        Les réponses sont servies depuis le cache persistant lorsqu'une requête
+        identique (fournisseur, modèle, paramètres, prompts) a déjà été traitée.
+        Les erreurs transitoires (429, 5xx, timeouts) sont retentées avec backoff
+        exponentiel, dans la limite de débit configurée par fournisseur/modèle.
+        En cas d'échec ou de dépassement du budget de latence, la requête bascule
+        sur les fournisseurs de secours ; en mode hedging, elle est doublée vers
+        le deuxième fournisseur après un délai calé sur le p95 observé.
+        Avant l'envoi, la requête est comparée à la fenêtre de contexte du modèle.
+
         Args:
             prompt: Le prompt utilisateur
             system_prompt: Prompt système (persona, instructions)
             temperature: Température de génération (0.0-1.0)
             max_tokens: Nombre maximum de tokens
+            use_cache: Active le cache des réponses (par défaut: celui du client, sinon Config.CACHE_ENABLED)
+            overflow: Politique si la requête dépasse la fenêtre de contexte,
+                "reject" ou "truncate" (par défaut: Config.CONTEXT_OVERFLOW_POLICY)
             **kwargs: Arguments additionnels spécifiques au fournisseur
 
         Returns:
             La réponse générée par le LLM
+
+        Raises:
+            ContextOverflowError: Si la requête ne tient pas dans la fenêtre (politique "reject")
         """
         temperature = temperature or Config.TEMPERATURE
         max_tokens = max_tokens or Config.MAX_TOKENS
+        use_cache = self._cache_enabled(use_cache)
+        set_last_usage(None)
+        model = kwargs.get("model", self._default_model())
+        start = time.perf_counter()
+
+        with span("llm_generate", provider=self.provider, model=model):
+            try:
+                response = self._generate_cached(
+                    prompt, system_prompt, temperature, max_tokens, use_cache, overflow, **kwargs
+                )
+            except Exception as e:
+                self._record_call(model, start, error=e)
+                raise
+        self._record_call(model, start)
+        return response
+
+    def _generate_cached(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        use_cache: bool,
+        overflow: Optional[str],
+        **kwargs,
+    ) -> str:
+        """Cache, planification de la fenêtre puis appel avec bascule"""
+        if not use_cache:
+            prompt, max_tokens = self._plan(prompt, system_prompt, max_tokens, overflow, kwargs)
+            return self._generate_with_failover(prompt, system_prompt, temperature, max_tokens, **kwargs)
+
+        cache = get_response_cache()
+        key = self._cache_key(prompt, system_prompt, temperature, max_tokens, kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            self._record_cached_response(kwargs)
+            return cached
+
+        prompt, max_tokens = self._plan(prompt, system_prompt, max_tokens, overflow, kwargs)
+        response = self._generate_with_failover(prompt, system_prompt, temperature, max_tokens, **kwargs)
+        if response and self._served_by_primary():
+            cache.set(key, response)
+        return response
+
+    def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        use_cache: Optional[bool] = None,
+        overflow: Optional[str] = None,
+        **kwargs,
+    ) -> Iterator[str]:
+        """
+        Génère une réponse en flux, fragment de texte par fragment
+
+        Une réponse déjà en cache est restituée d'un bloc ; une réponse
+        streamée n'est mise en cache que si le flux est allé jusqu'au bout.
+
+        Args:
+            prompt: Le prompt utilisateur
+            system_prompt: Prompt système (persona, instructions)
+            temperature: Température de génération (0.0-1.0)
+            max_tokens: Nombre maximum de tokens
+            use_cache: Active le cache des réponses (par défaut: celui du client, sinon Config.CACHE_ENABLED)
+            overflow: Politique si la requête dépasse la fenêtre de contexte (voir generate)
+            **kwargs: Arguments additionnels spécifiques au fournisseur
+
+        Yields:
+            Les fragments de texte au fur et à mesure de leur génération
+        """
+        temperature = temperature or Config.TEMPERATURE
+        max_tokens = max_tokens or Config.MAX_TOKENS
+        use_cache = self._cache_enabled(use_cache)
+        set_last_usage(None)
+        model = kwargs.get("model", self._default_model())
+        start = time.perf_counter()
+        first_fragment = None
+
+        # Le span n'est pas activé : le contexte ne doit pas fuir vers l'appelant entre deux fragments
+        stream = span("llm_stream", provider=self.provider, model=model)
+        error = None
+        try:
+            for fragment in self._stream_cached(
+                prompt, system_prompt, temperature, max_tokens, use_cache, overflow, **kwargs
+            ):
+                if first_fragment is None:
+                    first_fragment = time.perf_counter() - start
+                yield fragment
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Flux abandonné par l'appelant compris (GeneratorExit)
+            stream.finish(error=error)
+            self._record_call(model, start, error=error, time_to_first_token=first_fragment)
+
+    def _stream_cached(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        use_cache: bool,
+        overflow: Optional[str],
+        **kwargs,
+    ) -> Iterator[str]:
+        """Cache, planification de la fenêtre puis flux avec bascule"""
+        if not use_cache:
+            prompt, max_tokens = self._plan(prompt, system_prompt, max_tokens, overflow, kwargs)
+            yield from self._stream_with_failover(prompt, system_prompt, temperature, max_tokens, **kwargs)
+            return
+
+        cache = get_response_cache()
+        key = self._cache_key(prompt, system_prompt, temperature, max_tokens, kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            self._record_cached_response(kwargs)
+            yield cached
+            return
+
+        prompt, max_tokens = self._plan(prompt, system_prompt, max_tokens, overflow, kwargs)
+        fragments = []
+        for fragment in self._stream_with_failover(prompt, system_prompt, temperature, max_tokens, **kwargs):
+            fragments.append(fragment)
+            yield fragment
+
+        response = "".join(fragments)
+        if response and self._served_by_primary():
+            cache.set(key, response)
+
+    def _record_call(
+        self,
+        model: str,
+        start: float,
+        error: Optional[BaseException] = None,
+        time_to_first_token: Optional[float] = None,
+    ):
+        """Métriques d'un appel : durée, statut, tokens (y compris cache du fournisseur) et coût"""
+        duration = time.perf_counter() - start
+        if error is not None:
+            status = "overflow" if isinstance(error, ContextOverflowError) else "error"
+            record_llm_call(self.provider, model, duration, status, time_to_first_token=time_to_first_token)
+            return
+        usage = get_last_usage()
+        if usage is not None and usage.cached_response:
+            record_llm_call(usage.provider, usage.model, duration, "cache_hit")
+            return
+        if usage is not None:
+            # Après une bascule, l'appel est imputé au fournisseur qui a répondu
+            record_llm_call(
+                usage.provider, usage.model, duration, "ok",
+                usage=usage, cost=cout_usage(usage), time_to_first_token=time_to_first_token,
+            )
+        else:
+            record_llm_call(self.provider, model, duration, "ok", time_to_first_token=time_to_first_token)
+
+    def estimate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        **kwargs,
+    ) -> EstimationRequete:
+        """
+        Estime les tokens et le coût d'une requête, sans l'envoyer
+
+        Args:
+            prompt: Le prompt utilisateur
+            system_prompt: Prompt système (persona, instructions)
+            max_tokens: Nombre maximum de tokens en sortie
+            **kwargs: Arguments additionnels (model)
+
+        Returns:
+            L'estimation (tokens d'entrée, sortie maximale, fenêtre, coût)
+        """
+        return estimer_requete(
+            prompt,
+            system_prompt,
+            self.provider,
+            kwargs.get("model", self._default_model()),
+            max_tokens or Config.MAX_TOKENS,
+        )
+
+    def prompt_budget(self, system_prompt: Optional[str] = None, max_tokens: Optional[int] = None, **kwargs) -> int:
+        """Tokens disponibles pour le prompt utilisateur dans la fenêtre du modèle"""
+        return budget_prompt(
+            system_prompt,
+            self.provider,
+            kwargs.get("model", self._default_model()),
+            max_tokens or Config.MAX_TOKENS,
+        )
+
+    def _plan(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        max_tokens: int,
+        overflow: Optional[str],
+        kwargs: dict,
+    ):
+        """Adapte la requête à la fenêtre de contexte (réduction de la sortie, troncature ou rejet)"""
+        return planifier_requete(
+            prompt,
+            system_prompt,
+            self.provider,
+            kwargs.get("model", self._default_model()),
+            max_tokens,
+            overflow,
+        )
+
+    def _cache_key(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        kwargs: dict,
+    ) -> str:
+        """Clé de cache d'une requête pour ce client"""
+        return ResponseCache.make_key(
+            self.provider,
+            kwargs.get("model", self._default_model()),
+            temperature,
+            max_tokens,
+            system_prompt,
+            prompt,
+            extra={k: v for k, v in kwargs.items() if k != "model"},
+        )
+
+    def _served_by_primary(self) -> bool:
+        """
+        True si la dernière réponse vient du fournisseur de ce client
+
+        Une réponse d'un fournisseur de secours n'est pas mise en cache sous la
+        clé du fournisseur principal : elle serait rejouée comme la sienne.
+        """
+        usage = get_last_usage()
+        return usage is None or usage.provider == self.provider
+
+    def _record_cached_response(self, kwargs: dict):
+        """Usage d'une réponse servie par le cache local (aucun token consommé)"""
+        set_last_usage(TokenUsage(
+            provider=self.provider,
+            model=kwargs.get("model", self._default_model()),
+            cached_response=True,
+        ))
+
+    def _cache_enabled(self, use_cache: Optional[bool]) -> bool:
+        """Cache activé pour un appel : paramètre de l'appel, puis du client, puis configuration"""
+        if use_cache is not None:
+            return use_cache
+        return Config.CACHE_ENABLED if self.use_cache is None else self.use_cache
+
+    def _default_model(self) -> str:
+        """Retourne le modèle par défaut du fournisseur de ce client"""
+        return Config.get_model(self.provider)
+
+    def _generate_with_failover(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        **kwargs,
+    ) -> str:
+        """Appelle le fournisseur principal puis, si besoin, les fournisseurs de secours"""
+        fallbacks = self._fallback_clients()
+        budget = Config.LLM_LATENCY_BUDGET or None
+        if not fallbacks:
+            return self._generate_with_retry(prompt, system_prompt, temperature, max_tokens, **kwargs)
+
+        # Le modèle demandé est propre au fournisseur principal
+        fallback_kwargs = {k: v for k, v in kwargs.items() if k != "model"}
 
+        def call(client: "LLMClient", client_kwargs: dict):
+            # Exécuté dans un thread du pool : l'usage est renvoyé avec la réponse
+            response = client._generate_with_retry(
+                prompt, system_prompt, temperature, max_tokens, **client_kwargs
+            )
+            return response, get_last_usage()
+
+        calls = [lambda: call(self, kwargs)] + [
+            lambda client=client: call(client, fallback_kwargs) for client in fallbacks
+        ]
+
+        hedge_delay = None
+        if Config.LLM_HEDGE_ENABLED:
+            p95 = latency_tracker.percentile(
+                self.provider, kwargs.get("model", self._default_model())
+            )
+            # Pas de hedging tant que le p95 n'est pas mesuré (trop peu d'échantillons) :
+            # un délai arbitraire doublerait la plupart des requêtes longues
+            if p95 is not None:
+                hedge_delay = max(p95, Config.LLM_HEDGE_MIN_DELAY)
+
+        response, usage = run_with_failover(calls, latency_budget=budget, hedge_delay=hedge_delay)
+        set_last_usage(usage)
+        return response
+
+    def _stream_with_failover(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        **kwargs,
+    ) -> Iterator[str]:
+        """Variante en flux : bascule tant qu'aucun fragment n'a été transmis"""
+        fallback_kwargs = {k: v for k, v in kwargs.items() if k != "model"}
+        candidates = [(self, kwargs)] + [(c, fallback_kwargs) for c in self._fallback_clients()]
+
+        for index, (client, client_kwargs) in enumerate(candidates):
+            started = False
+            if index:
+                # Fournisseur de secours : identifié même s'il ne renvoie pas d'usage
+                set_last_usage(TokenUsage(
+                    provider=client.provider,
+                    model=client_kwargs.get("model", client._default_model()),
+                ))
+            try:
+                for fragment in client._stream_with_retry(
+                    prompt, system_prompt, temperature, max_tokens, **client_kwargs
+                ):
+                    started = True
+                    yield fragment
+                return
+            except Exception:
+                if started or index == len(candidates) - 1:
+                    raise
+
+    def _rate_limiter_tokens(self, prompt: str, system_prompt: Optional[str], max_tokens: int) -> int:
+        """Tokens décomptés du budget TPM pour une requête (entrée estimée + sortie maximale)"""
+        return estimer_tokens(system_prompt or "") + estimer_tokens(prompt) + max_tokens
+
+    def _generate_with_retry(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        **kwargs,
+    ) -> str:
+        """Appelle le fournisseur sous limitation de débit, avec retries des erreurs transitoires"""
+        limiter = get_rate_limiter(self.provider, kwargs.get("model", self._default_model()))
+        tokens = self._rate_limiter_tokens(prompt, system_prompt, max_tokens)
+
+        attempt = 0
+        while True:
+            limiter.acquire(tokens)
+            try:
+                start = time.monotonic()
+                response = self._generate(prompt, system_prompt, temperature, max_tokens, **kwargs)
+                latency_tracker.record(
+                    self.provider,
+                    kwargs.get("model", self._default_model()),
+                    time.monotonic() - start,
+                )
+                return response
+            except Exception as e:
+                kind = classify_error(e)
+                if kind == FATAL or attempt >= Config.LLM_MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt, e)
+                if kind == RATE_LIMIT:
+                    # La pause s'applique à tous les appelants de ce fournisseur/modèle
+                    limiter.pause(delay)
+                else:
+                    time.sleep(delay)
+                attempt += 1
+
+    def _stream_with_retry(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        **kwargs,
+    ) -> Iterator[str]:
+        """
+        Variante en flux de _generate_with_retry
+
+        Une erreur n'est retentée que si aucun fragment n'a encore été transmis.
+        """
+        limiter = get_rate_limiter(self.provider, kwargs.get("model", self._default_model()))
+        tokens = self._rate_limiter_tokens(prompt, system_prompt, max_tokens)
+
+        attempt = 0
+        while True:
+            limiter.acquire(tokens)
+            started = False
+            try:
+                for fragment in self._stream(prompt, system_prompt, temperature, max_tokens, **kwargs):
+                    started = True
+                    yield fragment
+                return
+            except Exception as e:
+                kind = classify_error(e)
+                if started or kind == FATAL or attempt >= Config.LLM_MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt, e)
+                if kind == RATE_LIMIT:
+                    limiter.pause(delay)
+                else:
+                    time.sleep(delay)
+                attempt += 1
+
+    def _stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        **kwargs,
+    ) -> Iterator[str]:
+        """Appelle le point d'accès en flux du fournisseur configuré"""
+        if self.provider == LLMProvider.OPENAI.value:
+            return self._stream_openai(prompt, system_prompt, temperature, max_tokens, **kwargs)
+        if self.provider == LLMProvider.CLAUDE.value:
+            return self._stream_claude(prompt, system_prompt, temperature, max_tokens, **kwargs)
+        if self.provider == LLMProvider.GOOGLE.value:
+            return self._stream_google(prompt, system_prompt, temperature, max_tokens, **kwargs)
+        if self.provider == LLMProvider.MOCK.value:
+            return self._stream_mock(prompt, system_prompt, max_tokens, **kwargs)
+
+        raise ValueError(f"Fournisseur LLM non supporté: {self.provider}")
+
+    def _generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        **kwargs,
+    ) -> str:
+        """Appelle le fournisseur configuré, sans cache ni retry"""
         if self.provider == LLMProvider.OPENAI.value:
             return self._generate_openai(
                 prompt, system_prompt, temperature, max_tokens, **kwargs
@@ -85,6 +601,8 @@ class LLMClient:
             return self._generate_google(
                 prompt, system_prompt, temperature, max_tokens, **kwargs
             )
+        if self.provider == LLMProvider.MOCK.value:
+            return self._generate_mock(prompt, system_prompt, max_tokens, **kwargs)
 
         raise ValueError(f"Fournisseur LLM non supporté: {self.provider}")
 
@@ -97,21 +615,16 @@ class LLMClient:
         **kwargs,
     ) -> str:
         """Génère une réponse via OpenAI"""
-        messages = []
-
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-
-        messages.append({"role": "user", "content": prompt})
-
+        model = kwargs.get("model", Config.OPENAI_MODEL)
         response = self._client.chat.completions.create(
-            model=kwargs.get("model", Config.OPENAI_MODEL),
-            messages=messages,
+            model=model,
+            messages=build_openai_messages(system_prompt, prompt),
             temperature=temperature,
             max_tokens=max_tokens,
             **{k: v for k, v in kwargs.items() if k != "model"},
         )
 
+        set_last_usage(from_openai(self.provider, model, getattr(response, "usage", None)))
         return response.choices[0].message.content
 
     def _generate_claude(
@@ -123,17 +636,17 @@ class LLMClient:
         **kwargs,
     ) -> str:
         """Génère une réponse via Claude (Anthropic)"""
-        system_message = system_prompt or ""
-
+        model = kwargs.get("model", Config.CLAUDE_MODEL)
         response = self._client.messages.create(
-            model=kwargs.get("model", Config.CLAUDE_MODEL),
+            model=model,
             max_tokens=max_tokens,
             temperature=temperature,
-            system=system_message,
+            system=build_claude_system(system_prompt),
             messages=[{"role": "user", "content": prompt}],
             **{k: v for k, v in kwargs.items() if k != "model"},
         )
 
+        set_last_usage(from_anthropic(self.provider, model, getattr(response, "usage", None)))
         return response.content[0].text
 
     def _generate_google(
@@ -145,26 +658,125 @@ class LLMClient:
         **kwargs,
     ) -> str:
         """Génère une réponse via Google AI (Gemini)"""
-        # On combine simplement le system prompt et le prompt utilisateur
-        if system_prompt:
-            full_prompt = f"Système: {system_prompt}\n\nUtilisateur: {prompt}"
-        else:
-            full_prompt = prompt
-
+        # Modèle réutilisé, le prompt système est passé en system_instruction
         model_name = kwargs.get("model", Config.GOOGLE_MODEL)
-
-        model = self._client.GenerativeModel(model_name)
+        model = get_gemini_model(self._client, model_name, system_prompt)
         response = model.generate_content(
-            full_prompt,
+            prompt,
             generation_config={
                 "temperature": temperature,
                 "max_output_tokens": max_tokens,
             },
         )
 
+        set_last_usage(from_gemini(self.provider, model_name, getattr(response, "usage_metadata", None)))
         # L'API retourne généralement response.text
         return getattr(response, "text", str(response))
 
+    def _generate_mock(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        max_tokens: int,
+        **kwargs,
+    ) -> str:
+        """Génère une réponse simulée (aucun appel réseau)"""
+        texte, usage = self._client.complete(
+            prompt, system_prompt, max_tokens, kwargs.get("model", Config.MOCK_MODEL)
+        )
+        set_last_usage(usage)
+        return texte
+
+    def _stream_openai(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        **kwargs,
+    ) -> Iterator[str]:
+        """Génère une réponse en flux via OpenAI"""
+        model = kwargs.get("model", Config.OPENAI_MODEL)
+        stream = self._client.chat.completions.create(
+            model=model,
+            messages=build_openai_messages(system_prompt, prompt),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            # Le dernier événement du flux porte l'usage (dont les tokens en cache)
+            stream_options={"include_usage": True},
+            **{k: v for k, v in kwargs.items() if k != "model"},
+        )
+
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                set_last_usage(from_openai(self.provider, model, chunk.usage))
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _stream_claude(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        **kwargs,
+    ) -> Iterator[str]:
+        """Génère une réponse en flux via Claude (Anthropic)"""
+        model = kwargs.get("model", Config.CLAUDE_MODEL)
+        with self._client.messages.stream(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system=build_claude_system(system_prompt),
+            messages=[{"role": "user", "content": prompt}],
+            **{k: v for k, v in kwargs.items() if k != "model"},
+        ) as stream:
+            for text in stream.text_stream:
+                yield text
+            final = stream.get_final_message()
+            set_last_usage(from_anthropic(self.provider, model, getattr(final, "usage", None)))
 
+    def _stream_google(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        **kwargs,
+    ) -> Iterator[str]:
+        """Génère une réponse en flux via Google AI (Gemini)"""
+        model_name = kwargs.get("model", Config.GOOGLE_MODEL)
+        model = get_gemini_model(self._client, model_name, system_prompt)
+        response = model.generate_content(
+            prompt,
+            generation_config={
+                "temperature": temperature,
+                "max_output_tokens": max_tokens,
+            },
+            stream=True,
+        )
 
+        for chunk in response:
+            usage = getattr(chunk, "usage_metadata", None)
+            if usage is not None:
+                set_last_usage(from_gemini(self.provider, model_name, usage))
+            text = getattr(chunk, "text", "")
+            if text:
+                yield text
 
+    def _stream_mock(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        max_tokens: int,
+        **kwargs,
+    ) -> Iterator[str]:
+        """Génère une réponse simulée en flux, au débit configuré"""
+        for fragment, usage in self._client.stream(
+            prompt, system_prompt, max_tokens, kwargs.get("model", Config.MOCK_MODEL)
+        ):
+            if usage is not None:
+                set_last_usage(usage)
+            if fragment:
+                yield fragment
@@ -0,0 +1,281 @@
+"""
+Ingestion des logs compressés et des archives (.gz, .bz2, .xz, .zst, tar)
+Les fichiers sont décompressés en flux, jamais en entier en mémoire : chaque
+membre est normalisé dans un processus du pool (décompression, décodage,
+horodatage de chaque ligne), puis les membres sont fusionnés par ordre
+chronologique dans un fichier unique, lu ensuite par blocs (LogSource).
+"""
+
+import bz2
+import calendar
+import gzip
+import heapq
+import io
+import lzma
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from app.config.config import Config
+from app.utils.log_source import LogSource
+
+
+# Signatures des formats de compression
+SIGNATURES = (
+    (b"\x1f\x8b", "gz"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zst"),
+)
+
+# Extensions acceptées au téléversement (en plus de txt et log)
+EXTENSIONS_ARCHIVES = ["gz", "bz2", "xz", "zst", "tar", "tgz", "tbz2", "txz"]
+
+_TAILLE_COPIE = 1024 * 1024
+
+_MOIS = {m: i for i, m in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1
+)}
+
+# ISO 8601 / RFC 3339 : 2024-01-15T10:23:45.123+01:00, 2024-01-15 10:23:45,123
+_ISO = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:[.,](\d{1,9}))?(Z|[+-]\d{2}:?\d{2})?"
+)
+# Apache / nginx : [15/Jan/2024:10:23:45 +0000]
+_CLF = re.compile(r"(\d{2})/([A-Za-z]{3})/(\d{4}):(\d{2}):(\d{2}):(\d{2})(?: ([+-]\d{4}))?")
+# Syslog BSD (sans année) : Jan 15 10:23:45
+_SYSLOG = re.compile(r"\b([A-Z][a-z]{2}) {1,2}(\d{1,2}) (\d{2}):(\d{2}):(\d{2})\b")
+
+# Longueur du préfixe cherché : l'horodatage est en début de ligne
+_PREFIXE_HORODATAGE = 64
+
+
+def _decalage(zone: Optional[str]) -> int:
+    """Décalage horaire en secondes d'un suffixe Z, +01:00 ou -0500"""
+    if not zone or zone == "Z":
+        return 0
+    signe = -1 if zone[0] == "-" else 1
+    chiffres = zone[1:].replace(":", "")
+    return signe * (int(chiffres[:2]) * 3600 + int(chiffres[2:4]) * 60)
+
+
+def extraire_horodatage(ligne: str, annee: Optional[int] = None) -> Optional[float]:
+    """
+    Horodatage d'une ligne de log (ISO 8601, Apache/nginx ou syslog BSD)
+
+    Les horodatages sans fuseau sont considérés comme UTC.
+
+    Args:
+        ligne: Ligne de log
+        annee: Année des horodatages syslog, qui n'en ont pas (par défaut: année courante)
+
+    Returns:
+        Secondes depuis l'epoch, ou None si la ligne n'a pas d'horodatage reconnu
+    """
+    debut = ligne[:_PREFIXE_HORODATAGE]
+    try:
+        match = _ISO.search(debut)
+        if match:
+            a, mo, j, h, mi, s, fraction, zone = match.groups()
+            secondes = calendar.timegm((int(a), int(mo), int(j), int(h), int(mi), int(s)))
+            if fraction:
+                secondes += int(fraction) / 10 ** len(fraction)
+            return secondes - _decalage(zone)
+        match = _CLF.search(debut)
+        if match:
+            j, mois, a, h, mi, s, zone = match.groups()
+            mo = _MOIS.get(mois.lower())
+            if mo:
+                return calendar.timegm((int(a), mo, int(j), int(h), int(mi), int(s))) - _decalage(zone)
+        match = _SYSLOG.search(debut)
+        if match:
+            mois, j, h, mi, s = match.groups()
+            mo = _MOIS.get(mois.lower())
+            if mo:
+                annee = annee or time.gmtime().tm_year
+                return calendar.timegm((annee, mo, int(j), int(h), int(mi), int(s)))
+    except (ValueError, OverflowError):
+        return None
+    return None
+
+
+def detecter_compression(chemin: str) -> Optional[str]:
+    """
+    Format de compression d'un fichier, d'après sa signature
+
+    Returns:
+        "gz", "bz2", "xz", "zst", ou None pour un fichier non compressé
+    """
+    with open(chemin, "rb") as f:
+        entete = f.read(8)
+    for signature, nom in SIGNATURES:
+        if entete.startswith(signature):
+            return nom
+    return None
+
+
+def ouvrir_flux(chemin: str) -> BinaryIO:
+    """
+    Ouvre un fichier en lecture binaire, décompressé à la volée
+
+    Raises:
+        ImportError: Si le fichier est en zstd et que zstandard n'est pas installé
+    """
+    compression = detecter_compression(chemin)
+    if compression == "gz":
+        return gzip.open(chemin, "rb")
+    if compression == "bz2":
+        return bz2.open(chemin, "rb")
+    if compression == "xz":
+        return lzma.open(chemin, "rb")
+    if compression == "zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(
+                "Le package zstandard n'est pas installé (fichiers .zst). Installez-le avec: pip install zstandard"
+            )
+        fichier = open(chemin, "rb")
+        return zstandard.ZstdDecompressor().stream_reader(fichier, closefd=True)
+    return open(chemin, "rb")
+
+
+def est_archive_tar(chemin: str) -> bool:
+    """True si le fichier (une fois décompressé) est une archive tar"""
+    with ouvrir_flux(chemin) as flux:
+        entete = flux.read(512)
+    return len(entete) == 512 and entete[257:262] == b"ustar"
+
+
+def est_archive(chemin: str) -> bool:
+    """True si le fichier est compressé ou est une archive tar"""
+    return detecter_compression(chemin) is not None or est_archive_tar(chemin)
+
+
+def _extraire_membres(chemin: str, nom: str, dossier: str) -> List[Tuple[str, str]]:
+    """
+    Recopie les fichiers réguliers d'une archive tar, lue en flux, dans le dossier de travail
+
+    Les membres restent tels quels (éventuellement compressés) : leur
+    décompression est faite en parallèle par le pool.
+
+    Returns:
+        Liste de (nom du membre, chemin de la copie)
+    """
+    membres = []
+    with ouvrir_flux(chemin) as flux, tarfile.open(fileobj=flux, mode="r|") as archive:
+        for membre in archive:
+            if not membre.isfile():
+                continue
+            source = archive.extractfile(membre)
+            if source is None:
+                continue
+            descripteur, copie = tempfile.mkstemp(prefix="membre_", dir=dossier)
+            with os.fdopen(descripteur, "wb") as f:
+                shutil.copyfileobj(source, f, length=_TAILLE_COPIE)
+            membres.append((f"{nom}:{membre.name}", copie))
+    return membres
+
+
+def _normaliser_membre(chemin: str, dossier: str, annee: Optional[int]) -> Tuple[str, int]:
+    """
+    Décompresse et décode un membre, en préfixant chaque ligne d'une clé de tri chronologique
+
+    Exécuté dans un processus du pool. Une ligne sans horodatage (suite de trace,
+    ligne de continuation) hérite de celui de la ligne précédente.
+
+    Returns:
+        Tuple (chemin du fichier normalisé, nombre de lignes)
+    """
+    descripteur, sortie = tempfile.mkstemp(prefix="normalise_", dir=dossier)
+    cle = 0.0
+    lignes = 0
+    with ouvrir_flux(chemin) as flux, os.fdopen(descripteur, "w", encoding="utf-8") as f:
+        texte = io.TextIOWrapper(flux, encoding="utf-8", errors="replace", newline=None)
+        for ligne in texte:
+            horodatage = extraire_horodatage(ligne, annee)
+            if horodatage is not None:
+                cle = horodatage
+            # Clé de largeur fixe : l'ordre lexicographique est l'ordre chronologique
+            contenu = ligne.rstrip("\n")
+            f.write(f"{cle:020.6f}\t{contenu}\n")
+            lignes += 1
+    return sortie, lignes
+
+
+def _lignes_normalisees(chemin: str) -> Iterator[str]:
+    with open(chemin, "r", encoding="utf-8") as f:
+        yield from f
+
+
+def charger_archives(
+    chemins: List[str],
+    workers: Optional[int] = None,
+    dossier: Optional[str] = None,
+    annee: Optional[int] = None,
+    noms: Optional[List[str]] = None,
+) -> LogSource:
+    """
+    Fusionne des fichiers de logs compressés, archives tar et fichiers texte par ordre chronologique
+
+    Chaque fichier (ou membre d'archive) est supposé trié dans le temps, comme
+    le sont les logs rotatés ; la fusion (heapq.merge) ne garde qu'une ligne
+    par membre en mémoire.
+
+    Args:
+        chemins: Fichiers à charger (syslog.1.gz, app.log.2.xz, pods.tar.gz...)
+        workers: Processus de décompression (par défaut: Config.LOG_ARCHIVE_WORKERS, 0 = nombre de CPU)
+        dossier: Dossier de travail (par défaut: Config.LOG_SPOOL_DIR, sinon celui du système)
+        annee: Année des horodatages syslog (par défaut: année courante)
+        noms: Noms affichés des fichiers (par défaut: nom de chaque chemin), ex: fichiers téléversés
+
+    Returns:
+        Les logs fusionnés, dans un fichier temporaire lu par blocs
+
+    Raises:
+        ValueError: Si aucun fichier de logs n'a été trouvé
+    """
+    dossier = dossier or Config.LOG_SPOOL_DIR or None
+    if dossier:
+        os.makedirs(dossier, exist_ok=True)
+    workers = workers if workers is not None else Config.LOG_ARCHIVE_WORKERS
+    noms = noms or [os.path.basename(chemin) for chemin in chemins]
+    travail = tempfile.mkdtemp(prefix="archives_", dir=dossier)
+    try:
+        membres: List[Tuple[str, str]] = []
+        for chemin, nom in zip(chemins, noms):
+            if est_archive_tar(chemin):
+                membres.extend(_extraire_membres(chemin, nom, travail))
+            else:
+                membres.append((nom, chemin))
+        if not membres:
+            raise ValueError("Aucun fichier de logs trouvé dans les archives fournies")
+
+        # Décompression et horodatage des membres en parallèle
+        taches = [(chemin, travail, annee) for _, chemin in membres]
+        if len(taches) == 1 or workers == 1:
+            normalises = [_normaliser_membre(*tache) for tache in taches]
+        else:
+            with ProcessPoolExecutor(max_workers=min(len(taches), workers or os.cpu_count() or 1)) as executor:
+                normalises = list(executor.map(_normaliser_membre, *zip(*taches)))
+
+        # Fusion chronologique (à clé égale, l'ordre des fichiers fournis est conservé)
+        descripteur, sortie = tempfile.mkstemp(prefix="logs_", suffix=".log", dir=dossier)
+        try:
+            with os.fdopen(descripteur, "w", encoding="utf-8") as f:
+                flux = [_lignes_normalisees(chemin) for chemin, _ in normalises]
+                for ligne in heapq.merge(*flux, key=lambda ligne: ligne[:20]):
+                    f.write(ligne[21:])
+        except BaseException:
+            os.unlink(sortie)
+            raise
+    finally:
+        shutil.rmtree(travail, ignore_errors=True)
+
+    nom = noms[0] if len(noms) == 1 else f"{len(noms)} fichiers"
+    return LogSource(sortie, name=nom, owned=True, members=[nom_membre for nom_membre, _ in membres])
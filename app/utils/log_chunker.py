@@ -0,0 +1,88 @@
+"""
+Découpage des gros volumes de logs en blocs
+Produit des fenêtres bornées en tokens, coupées sur les fins de ligne
+"""
+
+from typing import Iterable, Iterator, Union
+
+
+# Estimation grossière : ~4 caractères par token pour du texte de logs
+CARACTERES_PAR_TOKEN = 4
+
+
+def estimer_tokens(texte: str) -> int:
+    """
+    Estime le nombre de tokens d'un texte
+
+    Args:
+        texte: Texte à mesurer
+
+    Returns:
+        Nombre de tokens estimé
+    """
+    return len(texte) // CARACTERES_PAR_TOKEN + 1
+
+
+def iter_lignes(texte: str) -> Iterator[str]:
+    """
+    Itère sur les lignes d'un texte sans construire de liste intermédiaire
+
+    Args:
+        texte: Texte à parcourir
+
+    Yields:
+        Chaque ligne, sans le caractère de fin de ligne
+    """
+    debut = 0
+    taille = len(texte)
+    while debut < taille:
+        fin = texte.find("\n", debut)
+        if fin == -1:
+            yield texte[debut:]
+            return
+        yield texte[debut:fin]
+        debut = fin + 1
+
+
+def decouper_en_blocs(
+    logs: Union[str, Iterable[str]],
+    max_tokens: int,
+) -> Iterator[str]:
+    """
+    Découpe des logs en blocs de taille bornée, sur les frontières de ligne
+
+    Une ligne plus longue que le budget est elle-même coupée en morceaux.
+
+    Args:
+        logs: Texte des logs ou itérable de lignes
+        max_tokens: Budget de tokens par bloc
+
+    Yields:
+        Les blocs de logs, dans l'ordre d'origine
+    """
+    max_caracteres = max(1, max_tokens) * CARACTERES_PAR_TOKEN
+    lignes = iter_lignes(logs) if isinstance(logs, str) else logs
+
+    bloc = []
+    taille_bloc = 0
+    for ligne in lignes:
+        ligne = ligne.rstrip("\r\n")
+
+        # Ligne trop longue : on vide le bloc courant puis on la coupe
+        if len(ligne) > max_caracteres:
+            if bloc:
+                yield "\n".join(bloc)
+                bloc, taille_bloc = [], 0
+            for i in range(0, len(ligne), max_caracteres):
+                yield ligne[i:i + max_caracteres]
+            continue
+
+        if bloc and taille_bloc + len(ligne) + 1 > max_caracteres:
+            yield "\n".join(bloc)
+            bloc, taille_bloc = [], 0
+
+        bloc.append(ligne)
+        taille_bloc += len(ligne) + 1
+
+    if bloc:
+        yield "\n".join(bloc)
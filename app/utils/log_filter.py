@@ -0,0 +1,313 @@
+"""
+Filtrage local des logs avant envoi au LLM
+Plage horaire, sévérité minimale, expressions régulières à inclure ou exclure
+et lignes de contexte autour des lignes retenues. Pour un fichier (LogSource),
+un index des horodatages échantillonné évite de relire tout le fichier à
+chaque nouvelle plage horaire.
+"""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, Optional, Pattern, Tuple, Union
+
+from app.config.config import Config
+from app.utils.log_chunker import iter_lignes
+from app.utils.log_parser import FORMAT_GENERIQUE, detecter_format, extraire_champs
+from app.utils.log_preprocessor import RANGS_SEVERITE
+from app.utils.log_source import LogSource
+
+
+# Marqueur inséré à la place des lignes écartées
+MARQUEUR_OMISSION = "[... {n} ligne(s) omise(s) par le filtre ...]"
+MARQUEUR_HORS_PLAGE = "[... lignes hors de la plage horaire omises ...]"
+
+# Sévérités proposées, de la moins grave à la plus grave
+NIVEAUX_FILTRE = ("DEBUG", "INFO", "NOTICE", "WARNING", "ERROR", "CRITICAL", "FATAL")
+
+
+def _compiler(motifs: Tuple[str, ...]) -> Optional[Pattern]:
+    """Compile une liste de motifs en une seule expression (alternative)"""
+    if not motifs:
+        return None
+    for motif in motifs:
+        try:
+            re.compile(motif)
+        except re.error as e:
+            raise ValueError(f"Expression régulière invalide « {motif} » : {e}")
+    return re.compile("|".join(f"(?:{motif})" for motif in motifs), re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class LogFilter:
+    """
+    Critères de filtrage des lignes de logs
+
+    Une ligne sans horodatage (suite de trace, continuation) appartient à
+    l'entrée précédente : elle hérite de son horodatage et de sa sévérité.
+    Les expressions régulières sont compilées une seule fois, à la création.
+    """
+    debut: Optional[float] = None  # Horodatage minimal (secondes depuis l'epoch, UTC)
+    fin: Optional[float] = None  # Horodatage maximal
+    severite_min: Optional[str] = None  # Ex: "WARNING" garde WARNING, ERROR, CRITICAL...
+    inclure: Tuple[str, ...] = ()  # La ligne doit correspondre à l'un de ces motifs
+    exclure: Tuple[str, ...] = ()  # La ligne ne doit correspondre à aucun de ces motifs
+    contexte: int = 0  # Lignes conservées avant et après chaque ligne retenue
+    _inclure: Optional[Pattern] = field(default=None, init=False, repr=False, compare=False)
+    _exclure: Optional[Pattern] = field(default=None, init=False, repr=False, compare=False)
+    _rang_max: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Tuples (et non listes) : le filtre reste hachable
+        object.__setattr__(self, "inclure", tuple(m for m in self.inclure if m))
+        object.__setattr__(self, "exclure", tuple(m for m in self.exclure if m))
+        object.__setattr__(self, "_inclure", _compiler(self.inclure))
+        object.__setattr__(self, "_exclure", _compiler(self.exclure))
+        if self.severite_min:
+            niveau = self.severite_min.upper()
+            if niveau not in RANGS_SEVERITE:
+                raise ValueError(
+                    f"Sévérité inconnue: {self.severite_min}. Sévérités disponibles: {', '.join(NIVEAUX_FILTRE)}"
+                )
+            object.__setattr__(self, "_rang_max", RANGS_SEVERITE[niveau])
+        if self.contexte < 0:
+            raise ValueError("Le nombre de lignes de contexte doit être positif")
+
+    @property
+    def actif(self) -> bool:
+        """True si au moins un critère est défini"""
+        return any((
+            self.debut is not None, self.fin is not None, self._rang_max is not None, self.inclure, self.exclure
+        ))
+
+    def retient(self, ligne: str, horodatage: Optional[float], severite: Optional[str]) -> bool:
+        """True si la ligne satisfait tous les critères"""
+        if self.debut is not None and (horodatage is None or horodatage < self.debut):
+            return False
+        if self.fin is not None and (horodatage is None or horodatage > self.fin):
+            return False
+        if self._rang_max is not None and (
+            severite is None or RANGS_SEVERITE.get(severite, self._rang_max + 1) > self._rang_max
+        ):
+            return False
+        if self._inclure is not None and not self._inclure.search(ligne):
+            return False
+        if self._exclure is not None and self._exclure.search(ligne):
+            return False
+        return True
+
+
+@dataclass
+class ResultatFiltre:
+    """Logs filtrés et statistiques du filtrage"""
+    texte: str
+    lignes_total: int
+    lignes_retenues: int  # Lignes satisfaisant les critères
+    lignes_contexte: int  # Lignes ajoutées comme contexte
+    lignes: List[str] = field(default_factory=list)  # Lignes retenues et de contexte, sans les marqueurs
+    format: str = FORMAT_GENERIQUE  # Format détecté sur les logs d'origine
+
+
+class IndexHorodatages:
+    """
+    Index échantillonné des horodatages d'un fichier (un point tous les pas_octets)
+
+    Construit sans lire tout le fichier ; si les horodatages sont croissants,
+    une plage horaire se traduit directement en plage d'octets à parcourir.
+    """
+
+    def __init__(self, source: LogSource, format_logs: str, pas_octets: int = 64 * 1024):
+        self.format = format_logs
+        self.positions = array("q")
+        self.horodatages = array("d")
+        for offset in range(0, source.size, pas_octets):
+            position, lignes = source.lines_at(offset, window=8192)
+            for ligne in lignes:
+                horodatage = extraire_champs(ligne, format_logs)[0][0]
+                if horodatage is not None:
+                    if not self.positions or position > self.positions[-1]:
+                        self.positions.append(position)
+                        self.horodatages.append(horodatage)
+                    break
+        # Dernier horodatage du fichier (fin de la période)
+        position, lignes = source.lines_at(max(0, source.size - 8192), count=1000, window=8192)
+        for ligne in reversed(lignes):
+            horodatage = extraire_champs(ligne, format_logs)[0][0]
+            if horodatage is not None:
+                if not self.positions or position > self.positions[-1]:
+                    self.positions.append(position)
+                    self.horodatages.append(horodatage)
+                break
+        self.croissant = all(a <= b for a, b in zip(self.horodatages, self.horodatages[1:]))
+
+    def periode(self) -> Optional[Tuple[float, float]]:
+        """Premier et dernier horodatage échantillonnés"""
+        if not self.horodatages:
+            return None
+        return min(self.horodatages), max(self.horodatages)
+
+    def plage(self, debut: Optional[float], fin: Optional[float]) -> Tuple[int, Optional[int]]:
+        """
+        Plage d'octets contenant toutes les lignes entre debut et fin
+
+        Returns:
+            Tuple (début, fin) en octets ; tout le fichier si l'index ne permet pas de la réduire
+        """
+        if not self.croissant or not self.horodatages:
+            return 0, None
+        premier = 0
+        if debut is not None:
+            # Dernier point strictement antérieur à debut : les lignes suivantes peuvent être dans la plage
+            i = bisect_left(self.horodatages, debut) - 1
+            premier = self.positions[i] if i >= 0 else 0
+        dernier = None
+        if fin is not None:
+            j = bisect_right(self.horodatages, fin)
+            dernier = self.positions[j] if j < len(self.positions) else None
+        return premier, dernier
+
+
+def periode_logs(
+    logs: Union[str, LogSource],
+    format_logs: Optional[str] = None,
+) -> Optional[Tuple[float, float]]:
+    """
+    Premier et dernier horodatage des logs (pour proposer une plage horaire)
+
+    Args:
+        logs: Texte des logs, ou LogSource (période lue dans l'index, sans parcourir le fichier)
+        format_logs: Format des logs (par défaut: détecté sur les premières lignes)
+
+    Returns:
+        Tuple (premier, dernier) en secondes depuis l'epoch, ou None si aucun horodatage
+    """
+    if isinstance(logs, LogSource):
+        return index_horodatages(logs, format_logs).periode()
+    format_logs = format_logs or detecter_format(iter_lignes(logs))
+    horodatages = [
+        h for h in (extraire_champs(ligne, format_logs)[0][0] for ligne in iter_lignes(logs)) if h is not None
+    ]
+    return (min(horodatages), max(horodatages)) if horodatages else None
+
+
+def index_horodatages(source: LogSource, format_logs: Optional[str] = None) -> IndexHorodatages:
+    """Index des horodatages d'un fichier, construit une fois puis mémorisé sur la source"""
+    format_logs = format_logs or source.derived(("format",), lambda: detecter_format(source.iter_lines()))
+    return source.derived(("index_horodatages", format_logs), lambda: IndexHorodatages(source, format_logs))
+
+
+# Nature des lignes produites par le filtrage
+RETENUE, CONTEXTE, OMISSION = "retenue", "contexte", "omission"
+
+
+def _selectionner(lignes: Iterable[str], filtre: LogFilter, format_logs: str) -> Iterator[Tuple[str, str]]:
+    """
+    Applique le filtre et le contexte
+
+    Yields:
+        (ligne ou marqueur, RETENUE, CONTEXTE ou OMISSION)
+    """
+    avant: deque = deque(maxlen=filtre.contexte)
+    apres = 0
+    omises = 0
+    horodatage = None
+    severite = None
+    for ligne in lignes:
+        champs, _ = extraire_champs(ligne, format_logs)
+        if champs[0] is not None:
+            # Nouvelle entrée : horodatage et sévérité propres
+            horodatage, severite = champs[0], champs[1]
+            severite_ligne = severite
+        else:
+            # Continuation : sévérité de l'entrée, sauf si la ligne en mentionne une
+            severite_ligne = champs[1] or severite
+
+        if filtre.retient(ligne, horodatage, severite_ligne):
+            omises -= len(avant)
+            if omises:
+                yield MARQUEUR_OMISSION.format(n=omises), OMISSION
+            for precedente in avant:
+                yield precedente, CONTEXTE
+            avant.clear()
+            omises = 0
+            apres = filtre.contexte
+            yield ligne, RETENUE
+        elif apres > 0:
+            apres -= 1
+            yield ligne, CONTEXTE
+        else:
+            if filtre.contexte:
+                avant.append(ligne)
+            omises += 1
+    if omises:
+        yield MARQUEUR_OMISSION.format(n=omises), OMISSION
+
+
+def filtrer_logs(
+    logs: Union[str, Iterable[str], LogSource],
+    filtre: LogFilter,
+    format_logs: Optional[str] = None,
+) -> ResultatFiltre:
+    """
+    Filtre des logs selon les critères, en conservant le contexte demandé
+
+    Args:
+        logs: Texte des logs, itérable de lignes ou LogSource (index des horodatages mémorisé)
+        filtre: Critères de filtrage
+        format_logs: Format des logs (par défaut: détecté sur les premières lignes)
+
+    Returns:
+        Les lignes conservées (marqueurs à la place des lignes omises) et les statistiques
+    """
+    sortie: List[str] = []
+    total = None
+    fin = None
+    if isinstance(logs, LogSource):
+        index = index_horodatages(logs, format_logs)
+        format_logs = index.format
+        debut, fin = index.plage(filtre.debut, filtre.fin)
+        lignes = logs.iter_lines(debut, fin)
+        total = logs.count_lines()
+        if debut > 0:
+            sortie.append(MARQUEUR_HORS_PLAGE)
+    elif isinstance(logs, str):
+        format_logs = format_logs or detecter_format(iter_lignes(logs))
+        lignes = iter_lignes(logs)
+    else:
+        # Flux à usage unique : l'échantillon de détection est réinjecté
+        lignes = iter(logs)
+        if format_logs is None:
+            echantillon = list(islice(lignes, Config.LOG_PARSE_SAMPLE_LINES))
+            format_logs = detecter_format(echantillon)
+            lignes = chain(echantillon, lignes)
+
+    lues = 0
+
+    def compter(source_lignes: Iterable[str]) -> Iterator[str]:
+        nonlocal lues
+        for ligne in source_lignes:
+            lues += 1
+            yield ligne
+
+    format_logs = format_logs or FORMAT_GENERIQUE
+    conservees: List[str] = []
+    nombres = {RETENUE: 0, CONTEXTE: 0, OMISSION: 0}
+    for ligne, nature in _selectionner(compter(lignes), filtre, format_logs):
+        sortie.append(ligne)
+        if nature != OMISSION:
+            conservees.append(ligne)
+        nombres[nature] += 1
+    if fin is not None:
+        sortie.append(MARQUEUR_HORS_PLAGE)
+
+    return ResultatFiltre(
+        texte="\n".join(sortie),
+        lignes_total=total if total is not None else lues,
+        lignes_retenues=nombres[RETENUE],
+        lignes_contexte=nombres[CONTEXTE],
+        lignes=conservees,
+        format=format_logs,
+    )
@@ -0,0 +1,329 @@
+"""
+Suivi continu de logs (mode follow, à la manière de tail -F)
+Les fichiers sont relus à partir du dernier offset connu (rotation et
+troncature détectées), l'entrée standard par un thread de lecture. Les
+statistiques glissantes (templates, erreurs) sont bornées en mémoire : le coût
+du suivi dépend du volume de nouvelles lignes, pas de la taille des fichiers.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, TextIO, Tuple, Union
+
+from app.config.config import Config
+from app.utils.log_preprocessor import RANGS_SEVERITE, LogTemplateSummarizer, detecter_severite
+
+
+# Rang de sévérité à partir duquel une ligne compte comme une erreur (ERROR, CRITICAL, FATAL...)
+RANG_ERREUR = RANGS_SEVERITE["ERROR"]
+
+# Motifs de déclenchement d'une analyse
+MOTIF_ERREURS = "erreurs"
+MOTIF_NOUVELLES_ERREURS = "nouvelles_erreurs"
+MOTIF_INTERVALLE = "intervalle"
+MOTIF_FIN = "fin"
+
+# Longueur maximale d'une ligne sans fin de ligne conservée en attente
+_LIGNE_MAX_OCTETS = 1024 * 1024
+
+
+class SuiviFichier:
+    """
+    Fichier suivi par offset : seuls les octets ajoutés depuis la dernière lecture sont lus
+
+    La rotation (nouveau fichier au même chemin) est détectée par le changement
+    d'inode, une fois l'ancien fichier lu jusqu'au bout ; la troncature
+    (copytruncate) par une taille inférieure à l'offset.
+    """
+
+    termine = False  # Un fichier suivi n'a pas de fin
+
+    def __init__(
+        self,
+        path: str,
+        depuis_debut: bool = False,
+        encoding: str = "utf-8",
+        taille_lecture: Optional[int] = None,
+    ):
+        """
+        Args:
+            path: Chemin du fichier (il peut ne pas encore exister)
+            depuis_debut: Lit le contenu existant (par défaut: seules les nouvelles lignes)
+            encoding: Encodage du fichier
+            taille_lecture: Octets lus au maximum par appel (par défaut: Config.LOG_READ_CHUNK_BYTES)
+        """
+        self.path = path
+        self.nom = path
+        self.encoding = encoding
+        self.taille_lecture = max(4096, taille_lecture or Config.LOG_READ_CHUNK_BYTES)
+        self.position = 0
+        self.rotations = 0
+        self._fichier = None
+        self._identite: Optional[Tuple[int, int]] = None
+        self._reste = b""
+        self._ouvrir(depuis_debut)
+
+    def _ouvrir(self, depuis_debut: bool) -> bool:
+        try:
+            fichier = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        etat = os.fstat(fichier.fileno())
+        self._fichier = fichier
+        self._identite = (etat.st_dev, etat.st_ino)
+        self.position = 0 if depuis_debut else etat.st_size
+        fichier.seek(self.position)
+        return True
+
+    def _decouper(self, donnees: bytes, final: bool = False) -> List[str]:
+        """Lignes complètes des données lues ; la fin de ligne incomplète reste en attente"""
+        donnees = self._reste + donnees
+        coupure = donnees.rfind(b"\n")
+        if final or (coupure == -1 and len(donnees) > _LIGNE_MAX_OCTETS):
+            coupure = len(donnees)
+        if coupure == -1:
+            self._reste = donnees
+            return []
+        self._reste = donnees[coupure + 1:]
+        return [ligne.decode(self.encoding, errors="replace").rstrip("\r") for ligne in donnees[:coupure].split(b"\n")]
+
+    def lire(self) -> List[str]:
+        """
+        Nouvelles lignes complètes depuis le dernier appel
+
+        Returns:
+            Les lignes lues (au plus taille_lecture octets), liste vide si rien de nouveau
+        """
+        if self._fichier is None:
+            # Fichier absent à l'ouverture ou pendant une rotation : lu dès sa création
+            if not self._ouvrir(depuis_debut=True):
+                return []
+        donnees = self._fichier.read(self.taille_lecture)
+        if donnees:
+            self.position += len(donnees)
+            return self._decouper(donnees)
+
+        # Plus rien à lire : le fichier a-t-il été remplacé ou tronqué ?
+        try:
+            etat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if (etat.st_dev, etat.st_ino) != self._identite:
+            lignes = self._decouper(b"", final=True) if self._reste else []
+            self._fichier.close()
+            self._fichier = None
+            self.rotations += 1
+            self._ouvrir(depuis_debut=True)
+            return lignes
+        if etat.st_size < self.position:
+            self._fichier.seek(0)
+            self.position = 0
+            self._reste = b""
+            self.rotations += 1
+        return []
+
+    def fermer(self):
+        if self._fichier is not None:
+            self._fichier.close()
+            self._fichier = None
+
+
+class SuiviFlux:
+    """
+    Flux texte suivi (entrée standard, tube) : un thread lit les lignes dans une file
+
+    La lecture ne bloque donc jamais la boucle de suivi ; le suivi se termine
+    à la fin du flux, une fois la file vidée.
+    """
+
+    def __init__(self, flux: TextIO, nom: str = "<stdin>", lignes_max: int = 10000):
+        """
+        Args:
+            flux: Flux texte à suivre (ex: sys.stdin)
+            nom: Nom affiché
+            lignes_max: Lignes rendues au maximum par appel à lire
+        """
+        self.nom = nom
+        self.lignes_max = lignes_max
+        self._file: "queue.Queue[str]" = queue.Queue(maxsize=lignes_max * 10)
+        self._fin = threading.Event()
+        self._thread = threading.Thread(target=self._lire_flux, args=(flux,), daemon=True)
+        self._thread.start()
+
+    def _lire_flux(self, flux: TextIO):
+        try:
+            for ligne in flux:
+                self._file.put(ligne.rstrip("\r\n"))
+        finally:
+            self._fin.set()
+
+    @property
+    def termine(self) -> bool:
+        """True si le flux est terminé et toutes ses lignes ont été lues"""
+        return self._fin.is_set() and self._file.empty()
+
+    def lire(self) -> List[str]:
+        """Lignes reçues depuis le dernier appel (sans attendre)"""
+        lignes = []
+        while len(lignes) < self.lignes_max:
+            try:
+                lignes.append(self._file.get_nowait())
+            except queue.Empty:
+                break
+        return lignes
+
+    def fermer(self):
+        pass
+
+
+Suivi = Union[SuiviFichier, SuiviFlux]
+
+
+@dataclass
+class SeuilsSuivi:
+    """
+    Conditions de déclenchement d'une analyse (0 désactive un critère)
+
+    Une analyse n'est déclenchée que s'il y a de nouvelles lignes, et jamais
+    moins de delai_min secondes après la précédente.
+    """
+    erreurs: Optional[int] = None  # Lignes d'erreur depuis la dernière analyse
+    nouvelles_erreurs: Optional[int] = None  # Templates d'erreur jamais vus auparavant
+    intervalle: Optional[float] = None  # Secondes écoulées depuis la dernière analyse
+    delai_min: Optional[float] = None  # Secondes minimum entre deux analyses
+
+    def __post_init__(self):
+        if self.erreurs is None:
+            self.erreurs = Config.LOG_FOLLOW_ERROR_THRESHOLD
+        if self.nouvelles_erreurs is None:
+            self.nouvelles_erreurs = Config.LOG_FOLLOW_NEW_ERROR_TEMPLATES
+        if self.intervalle is None:
+            self.intervalle = Config.LOG_FOLLOW_WINDOW_SECONDS
+        if self.delai_min is None:
+            self.delai_min = Config.LOG_FOLLOW_COOLDOWN_SECONDS
+        if min(self.erreurs, self.nouvelles_erreurs, self.intervalle, self.delai_min) < 0:
+            raise ValueError("Les seuils de suivi doivent être positifs")
+
+
+@dataclass
+class Declenchement:
+    """Analyse déclenchée : nouvelles lignes, résumé cumulé et résultat"""
+    source: str
+    motif: str  # MOTIF_ERREURS, MOTIF_NOUVELLES_ERREURS, MOTIF_INTERVALLE ou MOTIF_FIN
+    lignes: int  # Lignes reçues depuis la dernière analyse
+    erreurs: int
+    nouvelles_erreurs: int
+    omises: int  # Lignes les plus anciennes non conservées (plafond LOG_FOLLOW_MAX_DELTA_LINES)
+    delta: str
+    resume: str
+    horodatage: float = field(default_factory=time.time)
+    resultat: Optional[str] = None
+
+
+class StatistiquesSuivi:
+    """
+    Statistiques glissantes d'un flux suivi
+
+    Templates (résumé cumulé, mémoire bornée), erreurs par minute sur la
+    dernière heure et lignes reçues depuis la dernière analyse (plafonnées).
+    """
+
+    def __init__(self, nom: str, max_lignes_delta: Optional[int] = None, max_templates: int = 2000):
+        """
+        Args:
+            nom: Nom du flux suivi
+            max_lignes_delta: Lignes conservées depuis la dernière analyse
+                (par défaut: Config.LOG_FOLLOW_MAX_DELTA_LINES ; les plus anciennes sont écartées)
+            max_templates: Nombre maximum de templates du résumé cumulé
+        """
+        self.nom = nom
+        self.resume = LogTemplateSummarizer(max_templates=max_templates)
+        self.delta: deque = deque(maxlen=max_lignes_delta or Config.LOG_FOLLOW_MAX_DELTA_LINES)
+        self.lignes_delta = 0
+        self.erreurs_delta = 0
+        self.nouvelles_erreurs_delta = 0
+        self.erreurs_total = 0
+        self.analyses = 0
+        # (minute depuis l'epoch, nombre d'erreurs), pour la dernière heure
+        self.erreurs_par_minute: deque = deque(maxlen=60)
+        self.derniere_analyse = time.monotonic()
+
+    def ajouter(self, lignes: Iterable[str]):
+        """Ajoute des lignes reçues aux statistiques"""
+        for ligne in lignes:
+            if not ligne.strip():
+                continue
+            templates = len(self.resume.clusters) + self.resume.templates_evinces
+            self.resume.add_line(ligne)
+            severite = detecter_severite(ligne)
+            if severite is not None and RANGS_SEVERITE[severite] <= RANG_ERREUR:
+                self.erreurs_delta += 1
+                self.erreurs_total += 1
+                if len(self.resume.clusters) + self.resume.templates_evinces > templates:
+                    self.nouvelles_erreurs_delta += 1
+                minute = int(time.time() // 60)
+                if self.erreurs_par_minute and self.erreurs_par_minute[-1][0] == minute:
+                    self.erreurs_par_minute[-1] = (minute, self.erreurs_par_minute[-1][1] + 1)
+                else:
+                    self.erreurs_par_minute.append((minute, 1))
+            self.delta.append(ligne)
+            self.lignes_delta += 1
+
+    def motif(self, seuils: SeuilsSuivi, maintenant: Optional[float] = None) -> Optional[str]:
+        """
+        Motif de déclenchement d'une analyse, ou None si aucun seuil n'est atteint
+
+        Args:
+            seuils: Conditions de déclenchement
+            maintenant: Horloge monotone (par défaut: time.monotonic())
+        """
+        if not self.lignes_delta:
+            return None
+        ecoule = (maintenant if maintenant is not None else time.monotonic()) - self.derniere_analyse
+        if ecoule < seuils.delai_min:
+            return None
+        if seuils.erreurs and self.erreurs_delta >= seuils.erreurs:
+            return MOTIF_ERREURS
+        if seuils.nouvelles_erreurs and self.nouvelles_erreurs_delta >= seuils.nouvelles_erreurs:
+            return MOTIF_NOUVELLES_ERREURS
+        if seuils.intervalle and ecoule >= seuils.intervalle:
+            return MOTIF_INTERVALLE
+        return None
+
+    def rendu(self, limite: int = 10) -> str:
+        """Résumé cumulé compact : volumes, erreurs par minute et principaux templates"""
+        lignes = [f"- Erreurs depuis le début du suivi : {self.erreurs_total}"]
+        if self.erreurs_par_minute:
+            lignes.append("- Erreurs par minute (UTC) : " + ", ".join(
+                f"{time.strftime('%H:%M', time.gmtime(minute * 60))} → {nombre}"
+                for minute, nombre in self.erreurs_par_minute
+            ))
+        return "\n".join(lignes) + "\n\n" + self.resume.render(limite)
+
+    def declencher(self, motif: str, maintenant: Optional[float] = None) -> Declenchement:
+        """
+        Prépare l'analyse des lignes reçues et remet à zéro les compteurs de la fenêtre
+
+        Args:
+            motif: Motif du déclenchement
+            maintenant: Horloge monotone (par défaut: time.monotonic())
+        """
+        declenchement = Declenchement(
+            source=self.nom,
+            motif=motif,
+            lignes=self.lignes_delta,
+            erreurs=self.erreurs_delta,
+            nouvelles_erreurs=self.nouvelles_erreurs_delta,
+            omises=self.lignes_delta - len(self.delta),
+            delta="\n".join(self.delta),
+            resume=self.rendu(),
+        )
+        self.delta.clear()
+        self.lignes_delta = self.erreurs_delta = self.nouvelles_erreurs_delta = 0
+        self.analyses += 1
+        self.derniere_analyse = maintenant if maintenant is not None else time.monotonic()
+        return declenchement
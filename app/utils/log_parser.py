@@ -0,0 +1,496 @@
+"""
+Analyse structurée des logs : détection du format et extraction en colonnes
+Chaque ligne est réduite à (horodatage, sévérité, source, message) dans des
+colonnes compactes (module array, messages et sources codés par dictionnaire).
+Les agrégats (répartition par sévérité, chronologie des erreurs, sources les
+plus actives) sont calculés localement : seuls eux sont envoyés au LLM.
+"""
+
+import calendar
+import json
+import math
+import mmap
+import os
+import re
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from app.config.config import Config
+from app.utils.log_archive import extraire_horodatage
+from app.utils.log_chunker import iter_lignes
+from app.utils.log_preprocessor import RANGS_SEVERITE, detecter_severite, masquer_ligne
+from app.utils.log_source import LogSource
+
+
+# Champ extrait d'une ligne : (horodatage, sévérité, source, message)
+Champs = Tuple[Optional[float], Optional[str], Optional[str], str]
+
+# Sévérités des colonnes : rang de RANGS_SEVERITE, SEVERITE_INCONNUE si absente
+SEVERITE_INCONNUE = 255
+NOMS_SEVERITE = {0: "FATAL", 1: "CRITICAL", 2: "ERROR", 3: "WARNING", 4: "NOTICE", 5: "INFO", 6: "DEBUG",
+                 SEVERITE_INCONNUE: "INCONNUE"}
+RANG_ERREUR = RANGS_SEVERITE["ERROR"]
+
+# Au-delà, les nouveaux messages distincts sont regroupés (mémoire bornée)
+MAX_MESSAGES_DISTINCTS = 50000
+MAX_LONGUEUR_MESSAGE = 300
+
+# Pas de la chronologie des erreurs, du plus fin au plus large (secondes)
+PAS_CHRONOLOGIE = (1, 10, 60, 300, 900, 3600, 6 * 3600, 86400, 7 * 86400)
+MAX_INTERVALLES = 48
+
+_NIVEAUX_KLOG = {"I": "INFO", "W": "WARNING", "E": "ERROR", "F": "FATAL"}
+_CHAMPS_JSON_HORODATAGE = ("@timestamp", "timestamp", "time", "ts", "date")
+_CHAMPS_JSON_NIVEAU = ("level", "severity", "lvl", "loglevel", "log.level")
+_CHAMPS_JSON_SOURCE = ("logger", "service", "source", "component", "host", "pod", "app")
+_CHAMPS_JSON_MESSAGE = ("message", "msg", "log", "text")
+
+_SYSLOG = re.compile(
+    r"^([A-Z][a-z]{2} {1,2}\d{1,2} \d{2}:\d{2}:\d{2}) (\S+) ([^:\[\s]+)(?:\[\d+\])?: ?(.*)$"
+)
+_JOURNALD = re.compile(
+    r"^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?) (\S+) ([^:\[\s]+)(?:\[\d+\])?: ?(.*)$"
+)
+_NGINX_ACCES = re.compile(r'^(\S+) \S+ \S+ \[([^\]]+)\] "([^"]*)" (\d{3}) (\S+)(.*)$')
+_NGINX_ERREUR = re.compile(r"^(\d{4})/(\d{2})/(\d{2}) (\d{2}):(\d{2}):(\d{2}) \[(\w+)\] \d+#\d+: (?:\*\d+ )?(.*)$")
+_KLOG = re.compile(r"^([IWEF])(\d{2})(\d{2}) (\d{2}):(\d{2}):(\d{2})\.(\d+)\s+\d+ ([^:\]\s]+):\d+\] (.*)$")
+_CRI = re.compile(r"^(\d{4}-\d{2}-\d{2}T\S+) (stdout|stderr) [FP] (.*)$")
+_APPLICATIF = re.compile(
+    r"^\[?(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?)\]?\s+"
+    r"\[?([A-Za-z]+)\]?\s*(?:\[([^\]]+)\]|([\w.$-]+):)?\s*(.*)$"
+)
+
+
+def _severite_connue(niveau: Optional[str]) -> Optional[str]:
+    if niveau is None:
+        return None
+    niveau = str(niveau).upper()
+    return niveau if niveau in RANGS_SEVERITE else None
+
+
+def _extraire_syslog(ligne: str, annee: Optional[int]) -> Optional[Champs]:
+    match = _SYSLOG.match(ligne)
+    if not match:
+        return None
+    horodatage, _, programme, message = match.groups()
+    return extraire_horodatage(horodatage, annee), detecter_severite(message), programme, message
+
+
+def _extraire_journald(ligne: str, annee: Optional[int]) -> Optional[Champs]:
+    match = _JOURNALD.match(ligne)
+    if not match:
+        return None
+    horodatage, _, programme, message = match.groups()
+    return extraire_horodatage(horodatage), detecter_severite(message), programme, message
+
+
+def _extraire_nginx(ligne: str, annee: Optional[int]) -> Optional[Champs]:
+    match = _NGINX_ACCES.match(ligne)
+    if match:
+        client, horodatage, requete, statut, _, _ = match.groups()
+        code = int(statut)
+        severite = "ERROR" if code >= 500 else "WARNING" if code >= 400 else "INFO"
+        # Message : méthode, chemin sans paramètres et statut (regroupables)
+        parties = requete.split(" ")
+        chemin = parties[1].split("?", 1)[0] if len(parties) > 1 else requete
+        return extraire_horodatage(f"[{horodatage}]"), severite, client, f"{parties[0]} {chemin} {statut}"
+    match = _NGINX_ERREUR.match(ligne)
+    if match:
+        a, mo, j, h, mi, s, niveau, message = match.groups()
+        horodatage = calendar.timegm((int(a), int(mo), int(j), int(h), int(mi), int(s)))
+        return horodatage, _severite_connue(niveau), "nginx", message
+    return None
+
+
+def _extraire_kubernetes(ligne: str, annee: Optional[int]) -> Optional[Champs]:
+    match = _KLOG.match(ligne)
+    if match:
+        lettre, mo, j, h, mi, s, fraction, fichier, message = match.groups()
+        annee = annee or time.gmtime().tm_year
+        horodatage = calendar.timegm((annee, int(mo), int(j), int(h), int(mi), int(s)))
+        horodatage += int(fraction) / 10 ** len(fraction)
+        return horodatage, _NIVEAUX_KLOG[lettre], fichier, message
+    match = _CRI.match(ligne)
+    if match:
+        horodatage, flux, message = match.groups()
+        return extraire_horodatage(horodatage), detecter_severite(message), flux, message
+    return None
+
+
+def _extraire_json(ligne: str, annee: Optional[int]) -> Optional[Champs]:
+    if not ligne.startswith("{"):
+        return None
+    try:
+        donnees = json.loads(ligne)
+    except ValueError:
+        return None
+    if not isinstance(donnees, dict):
+        return None
+
+    def premier(champs):
+        for champ in champs:
+            valeur = donnees.get(champ)
+            if valeur not in (None, ""):
+                return valeur
+        return None
+
+    message = premier(_CHAMPS_JSON_MESSAGE)
+    message = ligne if message is None else str(message)
+    horodatage = premier(_CHAMPS_JSON_HORODATAGE)
+    if isinstance(horodatage, (int, float)):
+        # Epoch en secondes ou en millisecondes
+        horodatage = horodatage / 1000 if horodatage > 1e11 else float(horodatage)
+    elif horodatage is not None:
+        horodatage = extraire_horodatage(str(horodatage), annee)
+    severite = _severite_connue(premier(_CHAMPS_JSON_NIVEAU)) or detecter_severite(message)
+    source = premier(_CHAMPS_JSON_SOURCE)
+    return horodatage, severite, None if source is None else str(source), message
+
+
+def _extraire_applicatif(ligne: str, annee: Optional[int]) -> Optional[Champs]:
+    match = _APPLICATIF.match(ligne)
+    if not match or _severite_connue(match.group(2)) is None:
+        return None
+    horodatage, niveau, source_crochets, source_prefixe, message = match.groups()
+    return extraire_horodatage(horodatage), _severite_connue(niveau), source_crochets or source_prefixe, message
+
+
+def _extraire_generique(ligne: str, annee: Optional[int]) -> Champs:
+    return extraire_horodatage(ligne, annee), detecter_severite(ligne), None, ligne
+
+
+# Formats reconnus, dans l'ordre de priorité en cas d'égalité lors de la détection
+FORMATS: Dict[str, Callable[[str, Optional[int]], Optional[Champs]]] = {
+    "json": _extraire_json,
+    "kubernetes": _extraire_kubernetes,
+    "nginx": _extraire_nginx,
+    "journald": _extraire_journald,
+    "syslog": _extraire_syslog,
+    "applicatif": _extraire_applicatif,
+}
+FORMAT_GENERIQUE = "generique"
+
+# Proportion minimale de lignes reconnues pour retenir un format
+SEUIL_DETECTION = 0.6
+
+
+def detecter_format(lignes: Iterable[str], echantillon: Optional[int] = None) -> str:
+    """
+    Détecte le format des logs sur les premières lignes non vides
+
+    Args:
+        lignes: Lignes des logs (seules les premières sont lues)
+        echantillon: Nombre de lignes examinées (par défaut: Config.LOG_PARSE_SAMPLE_LINES)
+
+    Returns:
+        Nom du format (clé de FORMATS), ou "generique" si aucun ne domine
+    """
+    echantillon = echantillon or Config.LOG_PARSE_SAMPLE_LINES
+    scores = Counter()
+    total = 0
+    for ligne in lignes:
+        ligne = ligne.rstrip("\r\n")
+        if not ligne.strip():
+            continue
+        total += 1
+        for nom, extraire in FORMATS.items():
+            if extraire(ligne, None) is not None:
+                scores[nom] += 1
+        if total >= echantillon:
+            break
+    if not total or not scores:
+        return FORMAT_GENERIQUE
+    meilleur = max(FORMATS, key=lambda nom: scores[nom])
+    return meilleur if scores[meilleur] / total >= SEUIL_DETECTION else FORMAT_GENERIQUE
+
+
+class ColonnesLogs:
+    """
+    Lignes de logs structurées, stockées en colonnes
+
+    horodatages (array "d", NaN si absent), severites (array "B", rang de
+    sévérité), sources et messages (array "I", codes dans les vocabulaires
+    correspondants ; les messages sont des templates, parties variables masquées).
+    """
+
+    def __init__(self, format_logs: str):
+        self.format = format_logs
+        self.horodatages = array("d")
+        self.severites = array("B")
+        self.sources = array("I")
+        self.messages = array("I")
+        # Code 0 : source absente / messages au-delà de MAX_MESSAGES_DISTINCTS
+        self.vocabulaire_sources: List[str] = [""]
+        self.vocabulaire_messages: List[str] = ["<autres messages>"]
+        self.non_reconnues = 0  # Lignes analysées avec le format générique
+        self._codes_sources: Dict[str, int] = {"": 0}
+        self._codes_messages: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.severites)
+
+    def __getstate__(self):
+        # Les index inverses se reconstruisent à partir des vocabulaires
+        etat = self.__dict__.copy()
+        del etat["_codes_sources"], etat["_codes_messages"]
+        return etat
+
+    def __setstate__(self, etat):
+        self.__dict__.update(etat)
+        self._codes_sources = {s: i for i, s in enumerate(self.vocabulaire_sources)}
+        self._codes_messages = {m: i for i, m in enumerate(self.vocabulaire_messages) if i}
+
+    def _code_source(self, source: Optional[str]) -> int:
+        if not source:
+            return 0
+        code = self._codes_sources.get(source)
+        if code is None:
+            code = self._codes_sources[source] = len(self.vocabulaire_sources)
+            self.vocabulaire_sources.append(source)
+        return code
+
+    def _code_message(self, template: str) -> int:
+        code = self._codes_messages.get(template)
+        if code is None:
+            if len(self.vocabulaire_messages) > MAX_MESSAGES_DISTINCTS:
+                return 0
+            code = self._codes_messages[template] = len(self.vocabulaire_messages)
+            self.vocabulaire_messages.append(template)
+        return code
+
+    def ajouter(self, champs: Champs):
+        """Ajoute une ligne (horodatage, sévérité, source, message)"""
+        horodatage, severite, source, message = champs
+        self.horodatages.append(math.nan if horodatage is None else horodatage)
+        self.severites.append(RANGS_SEVERITE.get(severite, SEVERITE_INCONNUE) if severite else SEVERITE_INCONNUE)
+        self.sources.append(self._code_source(source))
+        self.messages.append(self._code_message(masquer_ligne(message[:MAX_LONGUEUR_MESSAGE])[0]))
+
+    def etendre(self, autre: "ColonnesLogs"):
+        """Ajoute à la suite les lignes d'une autre extraction (plage suivante du fichier)"""
+        codes_sources = array("I", (self._code_source(s) for s in autre.vocabulaire_sources))
+        codes_messages = array("I", [0]) + array(
+            "I", (self._code_message(m) for m in autre.vocabulaire_messages[1:])
+        )
+        self.horodatages.extend(autre.horodatages)
+        self.severites.extend(autre.severites)
+        self.sources.extend(codes_sources[code] for code in autre.sources)
+        self.messages.extend(codes_messages[code] for code in autre.messages)
+        self.non_reconnues += autre.non_reconnues
+
+    def histogramme_severites(self) -> Dict[str, int]:
+        """Nombre de lignes par sévérité, de la plus grave à la moins grave"""
+        octets = self.severites.tobytes()
+        histogramme = {}
+        for rang, nom in NOMS_SEVERITE.items():
+            total = octets.count(bytes((rang,)))
+            if total:
+                histogramme[nom] = total
+        return histogramme
+
+    def periode(self) -> Optional[Tuple[float, float]]:
+        """Premier et dernier horodatage, ou None si aucun"""
+        valeurs = [t for t in self.horodatages if t == t]
+        return (min(valeurs), max(valeurs)) if valeurs else None
+
+    def chronologie_erreurs(self, pas: Optional[int] = None) -> Tuple[int, List[Tuple[float, int, int]]]:
+        """
+        Lignes et erreurs (ERROR ou plus grave) par intervalle de temps
+
+        Args:
+            pas: Durée d'un intervalle en secondes (par défaut: choisie pour au plus MAX_INTERVALLES)
+
+        Returns:
+            Tuple (pas, liste de (début de l'intervalle, lignes, erreurs)) sur les intervalles non vides
+        """
+        periode = self.periode()
+        if periode is None:
+            return 0, []
+        if pas is None:
+            duree = periode[1] - periode[0]
+            pas = next((p for p in PAS_CHRONOLOGIE if duree / p <= MAX_INTERVALLES), PAS_CHRONOLOGIE[-1])
+        lignes = Counter(int(t // pas) for t in self.horodatages if t == t)
+        erreurs = Counter(
+            int(t // pas) for t, s in zip(self.horodatages, self.severites) if s <= RANG_ERREUR and t == t
+        )
+        return pas, [(i * pas, lignes[i], erreurs[i]) for i in sorted(lignes)]
+
+    def top_sources(self, limite: int = 10) -> List[Tuple[str, int, int]]:
+        """Sources les plus actives : (source, lignes, erreurs)"""
+        lignes = Counter(self.sources)
+        erreurs = Counter(c for c, s in zip(self.sources, self.severites) if s <= RANG_ERREUR)
+        del lignes[0]
+        return [(self.vocabulaire_sources[c], n, erreurs[c]) for c, n in lignes.most_common(limite)]
+
+    def top_erreurs(self, limite: int = 10) -> List[Tuple[str, int]]:
+        """Messages d'erreur (ERROR ou plus grave) les plus fréquents : (template, occurrences)"""
+        erreurs = Counter(m for m, s in zip(self.messages, self.severites) if s <= RANG_ERREUR)
+        return [(self.vocabulaire_messages[m], n) for m, n in erreurs.most_common(limite)]
+
+    def rendu(self, limite: int = 10) -> str:
+        """
+        Résumé des agrégats au format Markdown, destiné au LLM
+
+        Args:
+            limite: Nombre de sources et de messages d'erreur détaillés
+
+        Returns:
+            Statistiques des logs (aucune ligne brute)
+        """
+        def date(t: float) -> str:
+            return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(t))
+
+        total = len(self)
+        lignes = [
+            "Les logs ci-dessous ont été analysés localement : seuls les agrégats sont fournis "
+            "(répartition par sévérité, chronologie des erreurs, sources les plus actives, "
+            "messages d'erreur les plus fréquents avec parties variables masquées : "
+            "<TS>, <IP>, <UUID>, <HEX>, <NUM>).",
+            "",
+            f"- Format détecté : {self.format}",
+            f"- Lignes : {total}",
+        ]
+        if self.non_reconnues and self.format != FORMAT_GENERIQUE:
+            lignes.append(f"- Lignes hors format (continuations, traces) : {self.non_reconnues}")
+        periode = self.periode()
+        if periode:
+            lignes.append(f"- Période : {date(periode[0])} → {date(periode[1])} (UTC)")
+
+        lignes += ["", "### Répartition par sévérité", "", "| Sévérité | Lignes | % |", "|---|---|---|"]
+        for nom, nombre in self.histogramme_severites().items():
+            lignes.append(f"| {nom} | {nombre} | {100 * nombre / total:.1f} |")
+
+        pas, chronologie = self.chronologie_erreurs()
+        if chronologie:
+            lignes += ["", f"### Chronologie (intervalles de {pas} s)", "",
+                       "| Début (UTC) | Lignes | Erreurs |", "|---|---|---|"]
+            lignes.extend(f"| {date(debut)} | {n} | {e} |" for debut, n, e in chronologie)
+
+        sources = self.top_sources(limite)
+        if sources:
+            lignes += ["", "### Sources les plus actives", "", "| Source | Lignes | Erreurs |", "|---|---|---|"]
+            lignes.extend(f"| {source} | {n} | {e} |" for source, n, e in sources)
+
+        erreurs = self.top_erreurs(limite)
+        if erreurs:
+            lignes += ["", "### Messages d'erreur les plus fréquents", "", "| Occurrences | Message |", "|---|---|"]
+            lignes.extend(f"| {n} | {message.replace('|', '/')} |" for message, n in erreurs)
+
+        return "\n".join(lignes)
+
+
+def extraire_champs(ligne: str, format_logs: str, annee: Optional[int] = None) -> Tuple[Champs, bool]:
+    """
+    Extrait (horodatage, sévérité, source, message) d'une ligne
+
+    Args:
+        ligne: Ligne de log, sans fin de ligne
+        format_logs: Format des logs (clé de FORMATS ou "generique")
+        annee: Année des horodatages qui n'en ont pas
+
+    Returns:
+        Tuple (champs, True si la ligne suit le format ; sinon champs du format générique)
+    """
+    extraire = FORMATS.get(format_logs)
+    champs = extraire(ligne, annee) if extraire else None
+    if champs is None:
+        return _extraire_generique(ligne, annee), False
+    return champs, True
+
+
+def _extraire_lignes(lignes: Iterable[str], format_logs: str, annee: Optional[int]) -> ColonnesLogs:
+    """Extrait les champs de chaque ligne non vide (format générique pour les lignes hors format)"""
+    colonnes = ColonnesLogs(format_logs)
+    for ligne in lignes:
+        ligne = ligne.rstrip("\r\n")
+        if not ligne.strip():
+            continue
+        champs, reconnue = extraire_champs(ligne, format_logs, annee)
+        if not reconnue:
+            colonnes.non_reconnues += 1
+        colonnes.ajouter(champs)
+    return colonnes
+
+
+def _extraire_plage(
+    chemin: str,
+    debut: int,
+    fin: int,
+    format_logs: str,
+    annee: Optional[int],
+    encoding: str,
+) -> ColonnesLogs:
+    """Extrait une plage d'octets d'un fichier (exécuté dans un processus du pool)"""
+    with open(chemin, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        def lignes():
+            position = debut
+            while position < fin:
+                coupure = buffer.find(b"\n", position, fin)
+                suivante = fin if coupure == -1 else coupure + 1
+                yield buffer[position:suivante].decode(encoding, errors="replace")
+                position = suivante
+
+        return _extraire_lignes(lignes(), format_logs, annee)
+
+
+def extraire_colonnes(
+    logs: Union[str, Iterable[str], LogSource],
+    format_logs: Optional[str] = None,
+    workers: Optional[int] = None,
+    annee: Optional[int] = None,
+) -> ColonnesLogs:
+    """
+    Détecte le format des logs et les extrait en colonnes
+
+    Les fichiers (LogSource) plus gros que Config.LOG_PARSE_PARALLEL_BYTES sont
+    découpés en plages d'octets traitées en parallèle dans un pool de processus.
+
+    Args:
+        logs: Texte des logs, itérable de lignes ou LogSource
+        format_logs: Format à utiliser (par défaut: détecté sur les premières lignes)
+        workers: Processus d'extraction (par défaut: Config.LOG_PARSE_WORKERS, 0 = nombre de CPU)
+        annee: Année des horodatages qui n'en ont pas (syslog, klog ; par défaut: année courante)
+
+    Returns:
+        Les colonnes extraites
+
+    Raises:
+        ValueError: Si le format demandé est inconnu
+    """
+    if format_logs and format_logs != FORMAT_GENERIQUE and format_logs not in FORMATS:
+        raise ValueError(
+            f"Format de logs inconnu: {format_logs}. Formats disponibles: {', '.join(FORMATS)}, {FORMAT_GENERIQUE}"
+        )
+
+    if isinstance(logs, LogSource):
+        format_logs = format_logs or detecter_format(logs.iter_lines())
+        workers = workers if workers is not None else Config.LOG_PARSE_WORKERS
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or logs.size <= Config.LOG_PARSE_PARALLEL_BYTES:
+            return _extraire_lignes(logs.iter_lines(), format_logs, annee)
+        plages = logs.byte_ranges(workers * 2)
+        colonnes = ColonnesLogs(format_logs)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_extraire_plage, logs.path, debut, fin, format_logs, annee, logs.encoding)
+                for debut, fin in plages
+            ]
+            for future in futures:
+                colonnes.etendre(future.result())
+        return colonnes
+
+    if isinstance(logs, str):
+        format_logs = format_logs or detecter_format(iter_lignes(logs))
+        return _extraire_lignes(iter_lignes(logs), format_logs, annee)
+
+    # Flux à usage unique : l'échantillon de détection est conservé puis réinjecté
+    lignes = iter(logs)
+    if format_logs is None:
+        echantillon = list(islice(lignes, Config.LOG_PARSE_SAMPLE_LINES))
+        format_logs = detecter_format(echantillon)
+        lignes = chain(echantillon, lignes)
+    return _extraire_lignes(lignes, format_logs, annee)
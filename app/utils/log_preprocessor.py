@@ -0,0 +1,234 @@
+"""
+Pré-traitement local des logs avant envoi au LLM
+Masque les parties variables des lignes (IP, UUID, nombres, horodatages)
+et regroupe les lignes par template, en mémoire bornée
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from app.utils.log_chunker import iter_lignes
+
+
+# Parties variables masquées, dans l'ordre de priorité (les horodatages d'abord)
+MASQUES: List[Tuple[str, str, str]] = [
+    (
+        "ts",
+        "<TS>",
+        r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"
+        r"|(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}"
+        r"|\d{2}/(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)/\d{4}:\d{2}:\d{2}:\d{2}(?:\s[+-]\d{4})?",
+    ),
+    ("uuid", "<UUID>", r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"),
+    ("ipv4", "<IP>", r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d{1,5})?\b"),
+    ("ipv6", "<IP>", r"\b(?:[0-9a-f]{1,4}:){3,7}[0-9a-f]{1,4}\b"),
+    ("hexa", "<HEX>", r"\b0x[0-9a-f]+\b|\b[0-9a-f]{12,}\b"),
+    ("nombre", "<NUM>", r"\b\d+(?:\.\d+)?\b"),
+]
+
+_REGEX_MASQUES = re.compile(
+    "|".join(f"(?P<{nom}>{motif})" for nom, _, motif in MASQUES),
+    re.IGNORECASE,
+)
+_JETONS = {nom: jeton for nom, jeton, _ in MASQUES}
+
+_REGEX_SEVERITE = re.compile(
+    r"\b(EMERG|EMERGENCY|ALERT|FATAL|PANIC|CRIT|CRITICAL|ERROR|ERR|EXCEPTION|"
+    r"WARN|WARNING|NOTICE|INFO|DEBUG|TRACE)\b",
+    re.IGNORECASE,
+)
+
+# Rang de sévérité (plus petit = plus grave), utilisé pour ordonner le résumé
+RANGS_SEVERITE = {
+    "EMERG": 0, "EMERGENCY": 0, "ALERT": 0, "FATAL": 0, "PANIC": 0,
+    "CRIT": 1, "CRITICAL": 1,
+    "ERROR": 2, "ERR": 2, "EXCEPTION": 2,
+    "WARN": 3, "WARNING": 3,
+    "NOTICE": 4, "INFO": 5, "DEBUG": 6, "TRACE": 6,
+}
+RANG_INCONNU = 5
+
+
+def masquer_ligne(ligne: str) -> Tuple[str, Optional[str]]:
+    """
+    Remplace les parties variables d'une ligne par des jetons
+
+    Args:
+        ligne: Ligne de log brute
+
+    Returns:
+        Tuple (template, premier horodatage trouvé ou None)
+    """
+    horodatage = None
+
+    def remplacer(match):
+        nonlocal horodatage
+        nom = match.lastgroup
+        if nom == "ts" and horodatage is None:
+            horodatage = match.group(0)
+        return _JETONS[nom]
+
+    return _REGEX_MASQUES.sub(remplacer, ligne), horodatage
+
+
+def detecter_severite(ligne: str) -> Optional[str]:
+    """Retourne le niveau de sévérité le plus grave mentionné dans la ligne"""
+    niveaux = [m.group(1).upper() for m in _REGEX_SEVERITE.finditer(ligne)]
+    if not niveaux:
+        return None
+    return min(niveaux, key=lambda n: RANGS_SEVERITE[n])
+
+
+class _Cluster:
+    """Groupe de lignes partageant le même template"""
+
+    __slots__ = ("template", "count", "premier", "dernier", "exemples", "severite")
+
+    def __init__(self, template: str, severite: Optional[str]):
+        self.template = template
+        self.count = 0
+        self.premier: Optional[str] = None
+        self.dernier: Optional[str] = None
+        self.exemples: List[str] = []
+        self.severite = severite
+
+
+class LogTemplateSummarizer:
+    """
+    Regroupe un flux de lignes de logs en templates avec compteurs
+
+    La mémoire est bornée quel que soit le volume : nombre de templates,
+    nombre d'exemples par template et longueur des lignes conservées sont plafonnés.
+    Les templates les moins fréquents sont évincés lorsque le plafond est atteint.
+    """
+
+    def __init__(
+        self,
+        max_templates: int = 2000,
+        max_exemples: int = 3,
+        max_longueur: int = 500,
+    ):
+        self.max_templates = max_templates
+        self.max_exemples = max_exemples
+        self.max_longueur = max_longueur
+        self.clusters: Dict[str, _Cluster] = {}
+        self.lignes_lues = 0
+        self.lignes_evincees = 0
+        self.templates_evinces = 0
+
+    def add_line(self, ligne: str):
+        """
+        Ajoute une ligne au résumé
+
+        Args:
+            ligne: Ligne de log brute
+        """
+        ligne = ligne.rstrip("\r\n")
+        if not ligne.strip():
+            return
+        self.lignes_lues += 1
+
+        ligne = ligne[:self.max_longueur]
+        template, horodatage = masquer_ligne(ligne)
+
+        cluster = self.clusters.get(template)
+        if cluster is None:
+            if len(self.clusters) >= self.max_templates:
+                self._evincer()
+            cluster = _Cluster(template, detecter_severite(ligne))
+            self.clusters[template] = cluster
+
+        cluster.count += 1
+        if horodatage:
+            if cluster.premier is None:
+                cluster.premier = horodatage
+            cluster.dernier = horodatage
+        if len(cluster.exemples) < self.max_exemples:
+            cluster.exemples.append(ligne)
+
+    def feed(self, logs: Union[str, Iterable[str]]) -> "LogTemplateSummarizer":
+        """
+        Ajoute un texte ou un flux de lignes (fichier ouvert, générateur...)
+
+        Args:
+            logs: Texte des logs ou itérable de lignes
+
+        Returns:
+            Le résumé lui-même, pour chaîner les appels
+        """
+        lignes = iter_lignes(logs) if isinstance(logs, str) else logs
+        for ligne in lignes:
+            self.add_line(ligne)
+        return self
+
+    def _evincer(self):
+        """Évince le dixième le moins fréquent des templates"""
+        nombre = max(1, self.max_templates // 10)
+        moins_frequents = sorted(self.clusters.values(), key=lambda c: c.count)[:nombre]
+        for cluster in moins_frequents:
+            self.lignes_evincees += cluster.count
+            del self.clusters[cluster.template]
+        self.templates_evinces += len(moins_frequents)
+
+    def top_clusters(self, limite: Optional[int] = None) -> List[_Cluster]:
+        """Retourne les templates triés par gravité puis par fréquence"""
+        clusters = sorted(
+            self.clusters.values(),
+            key=lambda c: (RANGS_SEVERITE.get(c.severite, RANG_INCONNU), -c.count),
+        )
+        return clusters[:limite] if limite else clusters
+
+    def render(self, limite: int = 200) -> str:
+        """
+        Produit le résumé textuel destiné au LLM
+
+        Args:
+            limite: Nombre maximum de templates détaillés
+
+        Returns:
+            Résumé des logs au format Markdown
+        """
+        clusters = self.top_clusters(limite)
+        non_affiches = len(self.clusters) - len(clusters)
+
+        lignes = [
+            "Les logs ci-dessous ont été pré-traités localement : les lignes sont regroupées "
+            "par template (parties variables masquées : <TS> horodatage, <IP>, <UUID>, "
+            "<HEX>, <NUM>) avec leur nombre d'occurrences, premier et dernier horodatage "
+            "et quelques lignes d'exemple.",
+            "",
+            f"- Lignes lues : {self.lignes_lues}",
+            f"- Templates distincts : {len(self.clusters) + self.templates_evinces}",
+        ]
+        if self.lignes_evincees:
+            lignes.append(
+                f"- Lignes rares non détaillées (templates évincés) : {self.lignes_evincees}"
+            )
+        if non_affiches:
+            lignes.append(f"- Templates non affichés (les moins graves/fréquents) : {non_affiches}")
+
+        for i, cluster in enumerate(clusters, start=1):
+            severite = f" [{cluster.severite}]" if cluster.severite else ""
+            lignes.append("")
+            lignes.append(f"### Template {i} — {cluster.count} occurrence(s){severite}")
+            if cluster.premier:
+                lignes.append(f"Premier : {cluster.premier} | Dernier : {cluster.dernier}")
+            lignes.append(f"Template : {cluster.template}")
+            lignes.append("Exemples :")
+            lignes.extend(f"  {exemple}" for exemple in cluster.exemples)
+
+        return "\n".join(lignes)
+
+
+def resumer_logs(logs: Union[str, Iterable[str]], **options) -> str:
+    """
+    Résume des logs par templates en un seul passage
+
+    Args:
+        logs: Texte des logs ou itérable de lignes
+        **options: Options de LogTemplateSummarizer
+
+    Returns:
+        Résumé des logs au format Markdown
+    """
+    return LogTemplateSummarizer(**options).feed(logs).render()
@@ -0,0 +1,304 @@
+"""
+Fichiers de logs volumineux lus via mmap, par blocs
+Un fichier téléversé est d'abord recopié sur disque (spool), puis parcouru par
+blocs coupés sur les fins de ligne : comptage des lignes, détection d'injection
+et pré-traitement ne chargent jamais plus d'un bloc décodé en mémoire.
+"""
+
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from bisect import bisect_right
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional, Tuple
+
+from app.config.config import Config
+from app.utils.log_chunker import CARACTERES_PAR_TOKEN, iter_lignes
+
+
+class LogSource:
+    """
+    Fichier de logs sur disque, projeté en mémoire (mmap) et décodé bloc par bloc
+
+    Les blocs se terminent sur une fin de ligne : chacun se décode seul, et une
+    erreur d'encodage n'affecte que le bloc concerné (caractères remplacés).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        name: Optional[str] = None,
+        encoding: str = "utf-8",
+        chunk_size: Optional[int] = None,
+        owned: bool = False,
+        members: Optional[List[str]] = None,
+    ):
+        """
+        Args:
+            path: Chemin du fichier
+            name: Nom affiché (par défaut: nom du fichier)
+            encoding: Encodage du fichier (compatible ASCII : utf-8, latin-1...)
+            chunk_size: Taille des blocs en octets (par défaut: Config.LOG_READ_CHUNK_BYTES)
+            owned: Supprime le fichier à la fermeture (copie temporaire)
+            members: Fichiers d'origine fusionnés dans ce fichier (archives)
+        """
+        self.path = path
+        self.name = name or os.path.basename(path)
+        self.encoding = encoding
+        self.chunk_size = max(4096, chunk_size or Config.LOG_READ_CHUNK_BYTES)
+        self.owned = owned
+        self.members = members or [self.name]
+        self.size = os.path.getsize(path)
+        self.decode_errors = 0  # Blocs dont le décodage a remplacé des octets invalides
+        self._file: Optional[BinaryIO] = None
+        self._map: Optional[mmap.mmap] = None
+        self._lines: Optional[int] = None
+        # (position du bloc en caractères, début en octets, fin en octets, lignes avant le bloc)
+        self._index: Optional[List[Tuple[int, int, int, int]]] = None
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def spool(
+        cls,
+        fileobj: BinaryIO,
+        name: Optional[str] = None,
+        directory: Optional[str] = None,
+        **options,
+    ) -> "LogSource":
+        """
+        Recopie un flux binaire (fichier téléversé, stdin...) dans un fichier temporaire
+
+        La copie se fait par blocs : le contenu n'est jamais décodé ni dupliqué en mémoire.
+
+        Args:
+            fileobj: Flux binaire à recopier (lu depuis sa position courante)
+            name: Nom affiché
+            directory: Dossier du fichier temporaire (par défaut: Config.LOG_SPOOL_DIR, sinon celui du système)
+            **options: Options de LogSource (encoding, chunk_size)
+
+        Returns:
+            La source, propriétaire du fichier temporaire
+        """
+        directory = directory or Config.LOG_SPOOL_DIR
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        descripteur, path = tempfile.mkstemp(prefix="logs_", suffix=".log", dir=directory)
+        try:
+            with os.fdopen(descripteur, "wb") as f:
+                shutil.copyfileobj(fileobj, f, length=1024 * 1024)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return cls(path, name=name, owned=True, **options)
+
+    def __enter__(self) -> "LogSource":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Libère la projection mémoire et supprime la copie temporaire"""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self.owned and os.path.exists(self.path):
+                os.unlink(self.path)
+                self.owned = False
+
+    def _buffer(self):
+        """Projection mémoire du fichier (créée à la première lecture)"""
+        with self._lock:
+            if self._map is None and self.size:
+                self._file = open(self.path, "rb")
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map if self._map is not None else b""
+
+    def _chunk_bounds(self, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """Bornes (début, fin) en octets des blocs, coupés après une fin de ligne"""
+        buffer = self._buffer()
+        end = self.size if end is None else min(end, self.size)
+        debut = start
+        while debut < end:
+            fin = min(debut + self.chunk_size, end)
+            if fin < end:
+                coupure = buffer.rfind(b"\n", debut, fin)
+                if coupure != -1:
+                    fin = coupure + 1
+                else:
+                    # Ligne plus longue qu'un bloc : on coupe hors d'un caractère multi-octets UTF-8
+                    while fin > debut + 1 and buffer[fin] & 0xC0 == 0x80:
+                        fin -= 1
+            yield debut, fin
+            debut = fin
+
+    def byte_ranges(self, parts: int) -> List[Tuple[int, int]]:
+        """
+        Découpe le fichier en plages d'octets de tailles voisines, alignées sur les fins de ligne
+
+        Args:
+            parts: Nombre de plages souhaité
+
+        Returns:
+            Liste de (début, fin), contiguës et sans ligne coupée
+        """
+        buffer = self._buffer()
+        plages = []
+        debut = 0
+        pas = max(1, self.size // max(1, parts))
+        while debut < self.size:
+            fin = min(debut + pas, self.size)
+            if fin < self.size:
+                coupure = buffer.find(b"\n", fin - 1)
+                fin = self.size if coupure == -1 else coupure + 1
+            plages.append((debut, fin))
+            debut = fin
+        return plages
+
+    def _decode(self, debut: int, fin: int) -> str:
+        donnees = self._buffer()[debut:fin]
+        try:
+            return donnees.decode(self.encoding)
+        except UnicodeDecodeError:
+            self.decode_errors += 1
+            return donnees.decode(self.encoding, errors="replace")
+
+    def iter_chunks(self, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        """
+        Parcourt le fichier par blocs de texte décodé
+
+        Args:
+            start: Position de départ en octets (début d'une ligne)
+            end: Position de fin en octets (fin de ligne ; par défaut: fin du fichier)
+
+        Yields:
+            Les blocs, dans l'ordre, chacun terminé par une fin de ligne (sauf le dernier)
+        """
+        complet = start == 0 and end is None
+        index = []
+        position = 0
+        lignes = 0
+        for debut, fin in self._chunk_bounds(start, end):
+            bloc = self._decode(debut, fin)
+            if complet:
+                index.append((position, debut, fin, lignes))
+                position += len(bloc)
+                lignes += bloc.count("\n")
+            yield bloc
+        # Parcours complet : l'index permet de retrouver la ligne d'une position
+        if complet:
+            self._index = index
+
+    def iter_lines(self, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        """Parcourt le fichier (ou une plage d'octets) ligne par ligne, un bloc en mémoire à la fois"""
+        for bloc in self.iter_chunks(start, end):
+            yield from iter_lignes(bloc)
+
+    def lines_at(self, offset: int, count: int = 20, window: int = 65536) -> Tuple[int, List[str]]:
+        """
+        Quelques lignes complètes lues à partir d'une position quelconque (échantillonnage)
+
+        Args:
+            offset: Position en octets ; la lecture commence à la ligne suivante (sauf en 0)
+            count: Nombre maximum de lignes
+            window: Nombre maximum d'octets lus
+
+        Returns:
+            Tuple (position en octets de la première ligne, lignes)
+        """
+        buffer = self._buffer()
+        if offset > 0:
+            coupure = buffer.find(b"\n", offset - 1)
+            if coupure == -1:
+                return self.size, []
+            offset = coupure + 1
+        fin = min(offset + window, self.size)
+        if fin < self.size:
+            derniere = buffer.rfind(b"\n", offset, fin)
+            fin = derniere + 1 if derniere != -1 else fin
+        lignes = buffer[offset:fin].decode(self.encoding, errors="replace").splitlines()
+        return offset, lignes[:count]
+
+    def count_lines(self) -> int:
+        """Nombre de lignes, compté sur les octets sans décoder le fichier"""
+        if self._lines is None:
+            buffer = self._buffer()
+            total = 0
+            for debut, fin in self._chunk_bounds():
+                # Copie d'un seul bloc à la fois (mmap n'a pas de méthode count)
+                total += buffer[debut:fin].count(b"\n")
+            if self.size and buffer[self.size - 1:self.size] != b"\n":
+                total += 1
+            self._lines = total
+        return self._lines
+
+    def line_of(self, position: int) -> int:
+        """
+        Numéro de ligne (à partir de 1) d'une position en caractères
+
+        Args:
+            position: Position dans le texte décodé (ex: InjectionMatch.position)
+        """
+        if self._index is None:
+            for _ in self.iter_chunks():
+                pass
+        if not self._index:
+            return 1
+        i = bisect_right([entree[0] for entree in self._index], position) - 1
+        debut_caracteres, debut, fin, lignes = self._index[max(0, i)]
+        return lignes + self._decode(debut, fin).count("\n", 0, position - debut_caracteres) + 1
+
+    def head(self, lignes: int = 50) -> str:
+        """Premières lignes du fichier (aperçu)"""
+        apercu = []
+        for ligne in self.iter_lines():
+            apercu.append(ligne)
+            if len(apercu) >= lignes:
+                break
+        return "\n".join(apercu)
+
+    def text(self) -> str:
+        """Contenu complet décodé (à réserver aux fichiers qui tiennent dans la fenêtre du modèle)"""
+        return "".join(self.iter_chunks())
+
+    def estimated_tokens(self) -> int:
+        """Tokens estimés d'après la taille en octets, sans décoder le fichier"""
+        return self.size // CARACTERES_PAR_TOKEN + 1
+
+    def summary(self, max_templates: int = 2000) -> str:
+        """
+        Résumé par templates (LogTemplateSummarizer), calculé une fois par fichier
+
+        Args:
+            max_templates: Nombre maximum de templates conservés en mémoire
+        """
+        from app.utils.log_preprocessor import LogTemplateSummarizer
+
+        return self.derived(
+            ("summary", max_templates),
+            lambda: LogTemplateSummarizer(max_templates=max_templates).feed(self.iter_lines()).render(),
+        )
+
+    def derived(self, key, compute: Callable[[], Any]) -> Any:
+        """
+        Résultat d'un calcul sur le fichier (résumé, extraction...), mémorisé pour la durée de vie de la source
+
+        Args:
+            key: Clé du calcul (nom et paramètres)
+            compute: Fonction sans argument qui produit le résultat
+        """
+        if key not in self._derived:
+            self._derived[key] = compute()
+        return self._derived[key]
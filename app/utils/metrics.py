@@ -0,0 +1,414 @@
+"""
+Instrumentation légère : spans chronométrés, compteurs et histogrammes
+Export au format texte Prometheus et traces JSONL (Config.TRACE_FILE)
+
+Les étiquettes de contexte (outil, version du prompt) sont portées par une
+variable de contexte : tout span ou appel LLM effectué pendant une opération
+d'un outil est rattaché à cet outil et à cette version.
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.config.config import Config
+
+
+# Bornes des histogrammes de durée (secondes)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+_context_labels: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar("metrics_labels", default={})
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("metrics_span", default=None)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile approché par interpolation dans le bucket concerné"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Compteurs et histogrammes étiquetés, thread-safe"""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, help_text: str = "", **labels):
+        """Incrémente un compteur"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+            if help_text:
+                self._help.setdefault(name, help_text)
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        help_text: str = "",
+        **labels,
+    ):
+        """Ajoute une observation à un histogramme"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(buckets)
+            histogram.observe(value)
+            if help_text:
+                self._help.setdefault(name, help_text)
+
+    def quantile(self, name: str, q: float, **labels) -> Optional[float]:
+        """
+        Quantile approché d'un histogramme, toutes séries correspondant aux étiquettes confondues
+
+        Args:
+            name: Nom de l'histogramme
+            q: Quantile (0.0-1.0), ex: 0.95 pour le p95
+            **labels: Étiquettes à filtrer (ex: tool="analyseur_logs", version="vFinal")
+
+        Returns:
+            Valeur approchée, ou None sans observation
+        """
+        wanted = set(_label_key(labels))
+        merged: Optional[_Histogram] = None
+        with self._lock:
+            for key, histogram in self._histograms.get(name, {}).items():
+                if not wanted.issubset(key):
+                    continue
+                if merged is None:
+                    merged = _Histogram(histogram.buckets)
+                merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                merged.count += histogram.count
+                merged.total += histogram.total
+        return merged.quantile(q) if merged is not None else None
+
+    def render_prometheus(self) -> str:
+        """Exporte toutes les séries au format texte Prometheus (0.0.4)"""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                self._header(lines, name, "counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            for name in sorted(self._histograms):
+                self._header(lines, name, "histogram")
+                for key, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, le=_format_value(bound))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, le='+Inf')} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.total)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines: List[str], name: str, kind: str):
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def reset(self):
+        """Efface toutes les séries"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, **extra: str) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+registry = MetricsRegistry()
+
+
+class _TraceSink:
+    """Écrit une ligne JSON par span terminé dans Config.TRACE_FILE"""
+
+    def __init__(self):
+        self._file = None
+        self._path: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]):
+        path = Config.TRACE_FILE
+        if not path:
+            return
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None or self._path != path:
+                if self._file is not None:
+                    self._file.close()
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(path, "a", encoding="utf-8", buffering=1)
+                self._path = path
+            self._file.write(line)
+
+
+trace_sink = _TraceSink()
+
+
+def current_labels() -> Dict[str, str]:
+    """Étiquettes de contexte courantes (outil, version...)"""
+    return _context_labels.get()
+
+
+@contextmanager
+def labels(**values: Any) -> Iterator[None]:
+    """Ajoute des étiquettes de contexte pour la durée du bloc"""
+    merged = dict(_context_labels.get())
+    merged.update({k: str(v) for k, v in values.items() if v is not None})
+    token = _context_labels.set(merged)
+    try:
+        yield
+    finally:
+        _context_labels.reset(token)
+
+
+class Span:
+    """
+    Opération chronométrée
+
+    S'utilise comme gestionnaire de contexte, ou avec finish() quand le début
+    et la fin ne sont pas dans le même bloc (rendu d'une page Streamlit).
+    """
+
+    def __init__(self, name: str, **attributes: Any):
+        self.name = name
+        self.attributes = {k: str(v) for k, v in attributes.items() if v is not None}
+        self.span_id = uuid.uuid4().hex[:16]
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.start = time.perf_counter()
+        self.started_at = time.time()
+        self.duration: Optional[float] = None
+        self._token = None
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._token is not None:
+            _current_span.reset(self._token)
+            self._token = None
+        self.finish(error=exc)
+        return False
+
+    def set(self, **attributes: Any):
+        """Ajoute des attributs (et étiquettes de métriques) au span"""
+        self.attributes.update({k: str(v) for k, v in attributes.items() if v is not None})
+
+    def finish(self, error: Optional[BaseException] = None):
+        """Termine le span : histogramme de durée, compteur d'erreurs et trace JSONL"""
+        if self.duration is not None or not Config.METRICS_ENABLED:
+            return
+        self.duration = time.perf_counter() - self.start
+        series = dict(current_labels())
+        series.update(self.attributes)
+        registry.observe(
+            "toolkit_span_duration_seconds", self.duration,
+            help_text="Durée des opérations instrumentées", span=self.name, **series,
+        )
+        if error is not None:
+            registry.inc(
+                "toolkit_span_errors_total",
+                help_text="Opérations terminées en erreur", span=self.name, error=type(error).__name__, **series,
+            )
+        trace_sink.write({
+            "ts": self.started_at,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "span": self.name,
+            "duration_ms": round(self.duration * 1000, 3),
+            "labels": series,
+            "error": repr(error) if error is not None else None,
+        })
+
+
+def span(name: str, **attributes: Any) -> Span:
+    """Crée un span : `with span("prompt_load", prompt="analyseur_logs"): ...`"""
+    return Span(name, **attributes)
+
+
+def traced(name: str, attributes: Optional[Callable[..., Dict[str, Any]]] = None):
+    """
+    Décorateur : chronomètre chaque appel de la fonction dans un span
+
+    Args:
+        name: Nom du span
+        attributes: Fonction (mêmes arguments que la fonction décorée) qui
+            retourne les attributs du span
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            attrs = attributes(*args, **kwargs) if attributes else {}
+            with Span(name, **attrs):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def tool_operation(tool: str):
+    """
+    Décorateur des méthodes publiques des outils : étiquettes tool/version et span
+
+    La version est lue dans l'argument prompt_version, à défaut dans
+    self.prompt_version. Les générateurs (méthodes *_stream) sont chronométrés
+    jusqu'au dernier fragment, avec les étiquettes actives à chaque fragment.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def context(args, kwargs) -> Dict[str, str]:
+            bound = signature.bind_partial(*args, **kwargs)
+            version = bound.arguments.get("prompt_version") or getattr(args[0], "prompt_version", None)
+            return {"tool": tool, "version": version}
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def gen_wrapper(*args, **kwargs):
+                merged = {**current_labels(), **{k: v for k, v in context(args, kwargs).items() if v}}
+                token = _context_labels.set(merged)
+                try:
+                    operation = Span(func.__name__)
+                finally:
+                    _context_labels.reset(token)
+                generator = func(*args, **kwargs)
+                error = None
+                try:
+                    while True:
+                        # Les étiquettes ne sont actives que pendant le calcul de chaque fragment
+                        token = _context_labels.set(merged)
+                        try:
+                            fragment = next(generator)
+                        except StopIteration:
+                            return
+                        finally:
+                            _context_labels.reset(token)
+                        yield fragment
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    token = _context_labels.set(merged)
+                    try:
+                        operation.finish(error=error)
+                    finally:
+                        _context_labels.reset(token)
+            return gen_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with labels(**context(args, kwargs)):
+                with Span(func.__name__):
+                    return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_llm_call(
+    provider: str,
+    model: str,
+    duration: float,
+    status: str,
+    usage: Any = None,
+    cost: Optional[float] = None,
+    time_to_first_token: Optional[float] = None,
+):
+    """
+    Enregistre un appel LLM : durée, statut, tokens consommés et coût
+
+    Args:
+        provider: Fournisseur LLM
+        model: Nom du modèle
+        duration: Durée totale de l'appel (s)
+        status: "ok", "error" ou "cache_hit"
+        usage: TokenUsage de l'appel, s'il est connu
+        cost: Coût estimé en dollars, s'il est connu
+        time_to_first_token: Délai avant le premier fragment (appels en flux)
+    """
+    if not Config.METRICS_ENABLED:
+        return
+    series = dict(current_labels())
+    series.update(provider=provider, model=model)
+    registry.inc("toolkit_llm_requests_total", help_text="Appels LLM par statut", status=status, **series)
+    registry.observe(
+        "toolkit_llm_request_duration_seconds", duration,
+        help_text="Durée des appels LLM", status=status, **series,
+    )
+    if time_to_first_token is not None:
+        registry.observe(
+            "toolkit_llm_time_to_first_token_seconds", time_to_first_token,
+            help_text="Délai avant le premier fragment des appels en flux", **series,
+        )
+    if usage is not None:
+        for kind, value in (
+            ("input", usage.input_tokens),
+            ("output", usage.output_tokens),
+            ("cache_read", usage.cache_read_tokens),
+            ("cache_write", usage.cache_write_tokens),
+        ):
+            if value:
+                registry.inc("toolkit_llm_tokens_total", value, help_text="Tokens consommés", type=kind, **series)
+    if cost:
+        registry.inc("toolkit_llm_cost_dollars_total", cost, help_text="Coût estimé des appels LLM", **series)
@@ -0,0 +1,129 @@
+"""
+Fournisseur LLM simulé (LLM_PROVIDER=mock), sans réseau ni clé API
+Sert aux benchmarks et aux essais hors ligne : la latence avant le premier
+token et le débit de génération sont configurables (MOCK_LATENCY, MOCK_TOKENS_PER_SECOND).
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from app.config.config import Config, LLMProvider
+from app.utils.log_chunker import CARACTERES_PAR_TOKEN, estimer_tokens
+from app.utils.usage import TokenUsage
+
+
+# Paragraphes de la réponse synthétique, choisis selon l'empreinte du prompt
+_PARAGRAPHES = (
+    "Les entrées fournies ont été examinées ligne par ligne.",
+    "Aucune anomalie bloquante n'a été relevée dans l'extrait analysé.",
+    "Les erreurs répétées proviennent vraisemblablement d'une même cause racine.",
+    "Vérifier la configuration du service et redémarrer après correction.",
+    "Surveiller l'évolution des métriques pendant les prochaines heures.",
+    "Documenter l'incident et la correction appliquée.",
+)
+
+# Taille (en tokens) des fragments restitués en flux
+_TOKENS_PAR_FRAGMENT = 4
+
+
+class MockLLM:
+    """Client simulé : réponses fixes (MOCK_RESPONSE) ou synthétiques, latence et débit réglables"""
+
+    def __init__(
+        self,
+        latency: Optional[float] = None,
+        tokens_per_second: Optional[float] = None,
+        output_tokens: Optional[int] = None,
+        response: Optional[str] = None,
+    ):
+        self.latency = Config.MOCK_LATENCY if latency is None else latency
+        self.tokens_per_second = Config.MOCK_TOKENS_PER_SECOND if tokens_per_second is None else tokens_per_second
+        self.output_tokens = Config.MOCK_OUTPUT_TOKENS if output_tokens is None else output_tokens
+        self.response = Config.MOCK_RESPONSE if response is None else response
+
+    def _texte(self, prompt: str, max_tokens: int) -> str:
+        """Réponse fixe, ou réponse synthétique déterministe bornée par max_tokens"""
+        if self.response:
+            return self.response
+        tokens = max(1, min(self.output_tokens, max_tokens))
+        graine = hashlib.blake2b(prompt[-4096:].encode("utf-8", "replace"), digest_size=8).digest()
+        lignes = ["## Réponse simulée", ""]
+        taille = 0
+        index = 0
+        while taille < tokens * CARACTERES_PAR_TOKEN:
+            ligne = f"- {_PARAGRAPHES[(graine[index % len(graine)] + index) % len(_PARAGRAPHES)]}"
+            lignes.append(ligne)
+            taille += len(ligne) + 1
+            index += 1
+        return "\n".join(lignes)[:tokens * CARACTERES_PAR_TOKEN]
+
+    def _usage(self, model: str, prompt: str, system_prompt: Optional[str], texte: str) -> TokenUsage:
+        return TokenUsage(
+            provider=LLMProvider.MOCK.value,
+            model=model,
+            input_tokens=estimer_tokens(system_prompt or "") + estimer_tokens(prompt),
+            output_tokens=estimer_tokens(texte),
+        )
+
+    def _fragments(self, texte: str) -> List[str]:
+        pas = _TOKENS_PAR_FRAGMENT * CARACTERES_PAR_TOKEN
+        return [texte[i:i + pas] for i in range(0, len(texte), pas)]
+
+    def _duree_generation(self, texte: str) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return estimer_tokens(texte) / self.tokens_per_second
+
+    def complete(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        max_tokens: int,
+        model: str,
+    ) -> Tuple[str, TokenUsage]:
+        """
+        Réponse complète, après la latence et la durée de génération simulées
+
+        Returns:
+            Tuple (texte, usage)
+        """
+        texte = self._texte(prompt, max_tokens)
+        time.sleep(self.latency + self._duree_generation(texte))
+        return texte, self._usage(model, prompt, system_prompt, texte)
+
+    def stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        max_tokens: int,
+        model: str,
+    ) -> Iterator[Tuple[str, Optional[TokenUsage]]]:
+        """
+        Réponse en flux, au débit configuré
+
+        Yields:
+            Tuples (fragment, None), puis ("", usage) en fin de flux
+        """
+        texte = self._texte(prompt, max_tokens)
+        fragments = self._fragments(texte)
+        pause = self._duree_generation(texte) / len(fragments) if fragments else 0.0
+        time.sleep(self.latency)
+        for fragment in fragments:
+            if pause:
+                time.sleep(pause)
+            yield fragment, None
+        yield "", self._usage(model, prompt, system_prompt, texte)
+
+    async def acomplete(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        max_tokens: int,
+        model: str,
+    ) -> Tuple[str, TokenUsage]:
+        """Variante asynchrone de complete (n'occupe pas de thread pendant l'attente)"""
+        texte = self._texte(prompt, max_tokens)
+        await asyncio.sleep(self.latency + self._duree_generation(texte))
+        return texte, self._usage(model, prompt, system_prompt, texte)
@@ -1,12 +1,148 @@
 """
 Chargeur de prompts depuis les fichiers texte
 Gère le versionnement des prompts (v1, v2, vFinal)
+Les prompts analysés sont gardés en mémoire et rechargés quand le fichier change
 """
 
 import os
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 from app.config.config import Config
+from app.utils.metrics import traced
+
+
+# Marqueurs de fin du prompt système
+MARKERS = [
+    "## LOGS À ANALYSER",
+    "## INPUT UTILISATEUR",
+    "## DONNÉES À TRAITER"
+]
+
+# Emplacement d'insertion de l'entrée utilisateur, ex: "[Les logs de l'utilisateur seront insérés ici]"
+PLACEHOLDER_PATTERN = re.compile(r"\[[^\[\]\n]* ici\]")
+
+# Placeholders reconnus à la compilation : "{{nom}}" ou la forme française ci-dessus
+NAMED_PLACEHOLDER_PATTERN = re.compile(r"\{\{(\w+)\}\}|\[[^\[\]\n]* ici\]")
+_PLACEHOLDER_NAME = re.compile(r"^\[(?:les|le|la|l')\s*(\w+)", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class ParsedPrompt:
+    """Prompt chargé et découpé une fois pour toutes"""
+    content: str
+    system_prompt: str
+    user_template: str
+    placeholder_position: int  # Position du placeholder dans user_template (-1 si absent)
+
+
+def _placeholder_name(placeholder: str) -> str:
+    """Nom d'un placeholder français, ex: [Le problème de ...] -> probleme"""
+    match = _PLACEHOLDER_NAME.match(placeholder)
+    name = match.group(1) if match else "input"
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return name.lower()
+
+
+class CompiledPrompt:
+    """
+    Prompt précompilé : segments littéraux et placeholders nommés
+    
+    Le prompt utilisateur est assemblé en un seul passage : chaque entrée
+    n'est copiée qu'une fois, dans la chaîne finale.
+    """
+    
+    def __init__(self, system_prompt: str, segments: Sequence[str], names: Sequence[str]):
+        if len(segments) != len(names) + 1:
+            raise ValueError("Un prompt compilé doit avoir un segment de plus que de placeholders")
+        self.system_prompt = system_prompt
+        self.segments = tuple(segments)
+        self.names = tuple(names)
+    
+    @classmethod
+    def from_template(cls, system_prompt: str, template: str, default_name: str = "input") -> "CompiledPrompt":
+        """
+        Compile un modèle de prompt utilisateur
+        
+        Args:
+            system_prompt: Prompt système associé
+            template: Modèle contenant des placeholders "{{nom}}" ou "[... ici]"
+            default_name: Nom de l'entrée ajoutée en fin de modèle s'il n'a aucun placeholder
+        
+        Returns:
+            Le prompt compilé
+        """
+        segments, names = [], []
+        position = 0
+        for match in NAMED_PLACEHOLDER_PATTERN.finditer(template):
+            segments.append(template[position:match.start()])
+            names.append(match.group(1) or _placeholder_name(match.group(0)))
+            position = match.end()
+        
+        if not names:
+            # Sans placeholder, l'entrée est ajoutée à la fin du modèle
+            return cls(system_prompt, [f"{template}\n\n", ""], [default_name])
+        
+        segments.append(template[position:])
+        return cls(system_prompt, segments, names)
+    
+    def render(self, **inputs: Union[str, Sequence[str]]) -> str:
+        """
+        Assemble le prompt utilisateur final
+        
+        Args:
+            **inputs: Valeur de chaque placeholder ; une liste de chaînes est
+                insérée bout à bout sans concaténation intermédiaire
+        
+        Returns:
+            Le prompt utilisateur
+        
+        Raises:
+            ValueError: Si une entrée attendue n'est pas fournie
+        """
+        # Une seule entrée pour un seul placeholder : le nom n'a pas à correspondre
+        if len(inputs) == 1 and len(set(self.names)) == 1:
+            inputs = {self.names[0]: next(iter(inputs.values()))}
+        
+        parts: List[str] = [self.segments[0]]
+        for name, segment in zip(self.names, self.segments[1:]):
+            if name not in inputs:
+                raise ValueError(f"Entrée manquante pour le placeholder '{name}'")
+            value = inputs[name]
+            if isinstance(value, str):
+                parts.append(value)
+            else:
+                parts.extend(value)
+            parts.append(segment)
+        return "".join(parts)
+
+
+# Caches partagés par toutes les instances (une instance est créée par requête)
+_prompt_cache: Dict[Path, Tuple[int, int, ParsedPrompt]] = {}
+_version_index: Dict[Path, Tuple[int, List[str]]] = {}
+_indexed_dirs = set()
+_compiled_cache: Dict[Tuple[Path, str, str], Tuple[ParsedPrompt, CompiledPrompt]] = {}
+_cache_lock = threading.Lock()
+
+
+@lru_cache(maxsize=64)
+def _split_prompt(prompt_content: str) -> Tuple[str, str]:
+    """Découpe un prompt en (system_prompt, user_prompt) selon les marqueurs"""
+    system_prompt = prompt_content
+    user_prompt = ""
+    
+    for marker in MARKERS:
+        if marker in prompt_content:
+            parts = prompt_content.split(marker, 1)
+            system_prompt = parts[0].strip()
+            user_prompt = parts[1].strip() if len(parts) > 1 else ""
+            break
+    
+    return system_prompt, user_prompt
 
 
 class PromptLoader:
@@ -14,36 +150,135 @@ class PromptLoader:
     
     def __init__(self, prompts_dir: Optional[str] = None):
         self.prompts_dir = Path(prompts_dir or Config.PROMPTS_DIR)
+        self._build_index()
     
-    def load_prompt(self, tool_name: str, version: str = "v1") -> str:
+    def _build_index(self):
+        """Indexe une fois les versions disponibles de tous les outils"""
+        if self.prompts_dir in _indexed_dirs or not self.prompts_dir.is_dir():
+            return
+        _indexed_dirs.add(self.prompts_dir)
+        with os.scandir(self.prompts_dir) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    self.list_available_versions(entry.name)
+    
+    @traced("prompt_load", attributes=lambda self, tool_name, version="v1": {"prompt": tool_name, "version": version})
+    def load_parsed_prompt(self, tool_name: str, version: str = "v1") -> ParsedPrompt:
         """
-        Charge un prompt depuis un fichier
+        Charge un prompt déjà découpé en partie système et modèle utilisateur
+        
+        Le résultat est mis en cache et invalidé quand le fichier est modifié.
         
         Args:
             tool_name: Nom de l'outil (ex: "analyseur_logs")
             version: Version du prompt (ex: "v1", "v2", "vFinal")
         
         Returns:
-            Le contenu du prompt
+            Le prompt analysé
         
         Raises:
             FileNotFoundError: Si le fichier de prompt n'existe pas
         """
         prompt_file = self.prompts_dir / tool_name / f"{version}.txt"
         
-        if not prompt_file.exists():
+        try:
+            stat = prompt_file.stat()
+        except FileNotFoundError:
             raise FileNotFoundError(
                 f"Prompt non trouvé: {prompt_file}\n"
                 f"Vérifiez que le fichier existe dans {self.prompts_dir / tool_name}"
             )
         
+        cached = _prompt_cache.get(prompt_file)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        
         with open(prompt_file, "r", encoding="utf-8") as f:
-            return f.read()
+            content = f.read()
+        
+        system_prompt, user_template = _split_prompt(content)
+        match = PLACEHOLDER_PATTERN.search(user_template)
+        parsed = ParsedPrompt(
+            content=content,
+            system_prompt=system_prompt,
+            user_template=user_template,
+            placeholder_position=match.start() if match else -1,
+        )
+        
+        with _cache_lock:
+            _prompt_cache[prompt_file] = (stat.st_mtime_ns, stat.st_size, parsed)
+        return parsed
+    
+    def compile_prompt(
+        self,
+        tool_name: str,
+        version: str = "v1",
+        fallback_header: str = "## INPUT UTILISATEUR",
+        input_name: str = "input",
+    ) -> CompiledPrompt:
+        """
+        Charge un prompt et le compile pour un assemblage en un seul passage
+        
+        Si le prompt n'a pas de marqueur de fin du prompt système, fallback_header
+        joue ce rôle ; à défaut, tout le contenu sert de prompt système et le prompt
+        utilisateur se réduit à l'en-tête fallback_header suivi de l'entrée.
+        
+        Args:
+            tool_name: Nom de l'outil (ex: "analyseur_logs")
+            version: Version du prompt (ex: "v1", "v2", "vFinal")
+            fallback_header: En-tête du prompt utilisateur sans marqueur
+            input_name: Nom de l'entrée principale de l'outil
+        
+        Returns:
+            Le prompt compilé (mis en cache tant que le fichier ne change pas)
+        """
+        parsed = self.load_parsed_prompt(tool_name, version)
+        key = (self.prompts_dir / tool_name / f"{version}.txt", fallback_header, input_name)
+        
+        cached = _compiled_cache.get(key)
+        if cached and cached[0] is parsed:
+            return cached[1]
+        
+        if parsed.user_template:
+            compiled = CompiledPrompt.from_template(
+                parsed.system_prompt, parsed.user_template, default_name=input_name
+            )
+        elif fallback_header in parsed.content:
+            # L'en-tête de l'outil sert de marqueur de fin du prompt système
+            system_prompt, _, rest = parsed.content.partition(fallback_header)
+            compiled = CompiledPrompt.from_template(
+                system_prompt.strip(), (fallback_header + rest).strip(), default_name=input_name
+            )
+        else:
+            compiled = CompiledPrompt(parsed.content, [f"{fallback_header}\n\n", ""], [input_name])
+        
+        with _cache_lock:
+            _compiled_cache[key] = (parsed, compiled)
+        return compiled
+    
+    def load_prompt(self, tool_name: str, version: str = "v1") -> str:
+        """
+        Charge un prompt depuis un fichier
+        
+        Args:
+            tool_name: Nom de l'outil (ex: "analyseur_logs")
+            version: Version du prompt (ex: "v1", "v2", "vFinal")
+        
+        Returns:
+            Le contenu du prompt
+        
+        Raises:
+            FileNotFoundError: Si le fichier de prompt n'existe pas
+        """
+        return self.load_parsed_prompt(tool_name, version).content
     
     def list_available_versions(self, tool_name: str) -> list:
         """
         Liste les versions disponibles pour un outil
         
+        L'index est reconstruit uniquement si le dossier de l'outil a changé
+        (ajout, suppression ou renommage d'un fichier).
+        
         Args:
             tool_name: Nom de l'outil
         
@@ -52,15 +287,24 @@ class PromptLoader:
         """
         tool_dir = self.prompts_dir / tool_name
         
-        if not tool_dir.exists():
+        try:
+            mtime = tool_dir.stat().st_mtime_ns
+        except FileNotFoundError:
             return []
         
+        cached = _version_index.get(tool_dir)
+        if cached and cached[0] == mtime:
+            return list(cached[1])
+        
         versions = []
         for file in tool_dir.glob("*.txt"):
             version = file.stem
             versions.append(version)
+        versions.sort()
         
-        return sorted(versions)
+        with _cache_lock:
+            _version_index[tool_dir] = (mtime, versions)
+        return list(versions)
     
     def extract_system_prompt(self, prompt_content: str) -> Tuple[str, str]:
         """
@@ -73,25 +317,9 @@ class PromptLoader:
             Tuple (system_prompt, user_prompt)
         """
         # Le prompt système correspond à tout le contenu jusqu'à "## LOGS À ANALYSER"
-        # ou similaire. Pour l'instant, on retourne tout comme système.
-        # Cette méthode peut être améliorée selon la structure des prompts.
-        
-        # Recherche du marqueur de fin du prompt système
-        markers = [
-            "## LOGS À ANALYSER",
-            "## INPUT UTILISATEUR",
-            "## DONNÉES À TRAITER"
-        ]
-        
-        system_prompt = prompt_content
-        user_prompt = ""
-        
-        for marker in markers:
-            if marker in prompt_content:
-                parts = prompt_content.split(marker, 1)
-                system_prompt = parts[0].strip()
-                user_prompt = parts[1].strip() if len(parts) > 1 else ""
-                break
-        
-        return system_prompt, user_prompt
+        # ou similaire. Le découpage est mémorisé pour les contenus déjà vus.
+        return _split_prompt(prompt_content)
+
+
+
 
@@ -0,0 +1,196 @@
+"""
+Résilience des appels LLM : classification des erreurs, retries avec backoff
+exponentiel et jitter, et limitation de débit côté client (token bucket)
+par fournisseur/modèle, en requêtes et en tokens par minute
+"""
+
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.config.config import Config
+
+
+# Classes d'erreurs
+RATE_LIMIT = "rate_limit"
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+_TRANSIENT_STATUS = {408, 409, 425, 500, 502, 503, 504, 529}
+_TRANSIENT_NAMES = (
+    "APIConnectionError",
+    "APITimeoutError",
+    "InternalServerError",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "OverloadedError",
+    "Timeout",
+)
+
+
+class RetryAfterTooLongError(Exception):
+    """Le fournisseur demande d'attendre plus longtemps que LLM_RETRY_AFTER_MAX"""
+
+    def __init__(self, delay: float, error: Exception):
+        super().__init__(
+            f"Le fournisseur demande d'attendre {delay:.0f} s avant de réessayer "
+            f"(Retry-After, maximum accepté: {Config.LLM_RETRY_AFTER_MAX:.0f} s): {error}"
+        )
+        self.delay = delay
+        self.error = error
+
+
+def classify_error(error: Exception) -> str:
+    """
+    Classe une erreur de fournisseur
+
+    Args:
+        error: Exception levée par le SDK
+
+    Returns:
+        RATE_LIMIT (429), TRANSIENT (5xx, timeout, connexion) ou FATAL
+    """
+    status = getattr(error, "status_code", None)
+    if not isinstance(status, int):
+        status = getattr(error, "code", None)
+    name = type(error).__name__
+
+    if status == 429 or "RateLimit" in name or "ResourceExhausted" in name:
+        return RATE_LIMIT
+    if isinstance(status, int) and (status in _TRANSIENT_STATUS or status >= 500):
+        return TRANSIENT
+    if isinstance(error, (ConnectionError, TimeoutError)) or any(n in name for n in _TRANSIENT_NAMES):
+        return TRANSIENT
+    return FATAL
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Lit l'en-tête Retry-After de la réponse d'erreur, s'il existe (en secondes)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers or not hasattr(headers, "get"):
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt: int, error: Optional[Exception] = None) -> float:
+    """
+    Délai avant la prochaine tentative
+
+    Retry-After est respecté tel qu'envoyé s'il est fourni (un retry anticipé
+    recevrait un nouveau 429 et consommerait le budget de tentatives) ; sinon
+    backoff exponentiel avec jitter complet (tirage uniforme entre 0 et le
+    plafond de la tentative, borné par LLM_BACKOFF_MAX).
+
+    Args:
+        attempt: Numéro de la tentative échouée (0 pour la première)
+        error: Erreur ayant provoqué le retry
+
+    Returns:
+        Délai en secondes
+
+    Raises:
+        RetryAfterTooLongError: Si Retry-After dépasse Config.LLM_RETRY_AFTER_MAX (échec immédiat)
+    """
+    if error is not None:
+        delay = retry_after(error)
+        if delay is not None:
+            if Config.LLM_RETRY_AFTER_MAX and delay > Config.LLM_RETRY_AFTER_MAX:
+                raise RetryAfterTooLongError(delay, error) from error
+            return max(0.0, delay)
+    ceiling = min(Config.LLM_BACKOFF_MAX, Config.LLM_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+class TokenBucket:
+    """Seau à jetons thread-safe : capacité par minute, recharge continue"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """
+        Réserve des jetons (le solde peut devenir négatif)
+
+        Args:
+            amount: Nombre de jetons demandés
+            now: Horloge monotone courante
+
+        Returns:
+            Délai à attendre avant que la réservation soit couverte
+        """
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class ProviderRateLimiter:
+    """Limiteur de débit d'un couple fournisseur/modèle (RPM et TPM)"""
+
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self._requests = TokenBucket(rpm) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        """Réserve une requête de `tokens` tokens et retourne le délai d'attente"""
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._paused_until - now)
+            if self._requests is not None:
+                delay = max(delay, self._requests.reserve(1, now))
+            if self._tokens is not None:
+                delay = max(delay, self._tokens.reserve(tokens, now))
+            return delay
+
+    def acquire(self, tokens: int):
+        """Bloque jusqu'à ce que la requête puisse partir"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: int):
+        """Variante asynchrone d'acquire"""
+        import asyncio
+
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, delay: float):
+        """Suspend les envois (après un 429) pour tous les appelants du processus"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+
+_limiters: Dict[Tuple[str, str], ProviderRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, model: str) -> ProviderRateLimiter:
+    """Retourne le limiteur partagé d'un couple fournisseur/modèle"""
+    with _limiters_lock:
+        limiter = _limiters.get((provider, model))
+        if limiter is None:
+            limiter = ProviderRateLimiter(Config.LLM_RPM_LIMIT, Config.LLM_TPM_LIMIT)
+            _limiters[(provider, model)] = limiter
+        return limiter
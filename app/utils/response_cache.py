@@ -0,0 +1,168 @@
+"""
+Cache persistant des réponses LLM
+Stockage SQLite sur disque avec expiration (TTL) et éviction LRU bornée
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config.config import Config
+
+
+def _hash(texte: Optional[str]) -> str:
+    """Empreinte SHA-256 d'un texte (chaîne vide si None)"""
+    return hashlib.sha256((texte or "").encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Cache des réponses LLM partagé entre sessions et processus"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: Optional[int] = None,
+        max_entries: Optional[int] = None,
+    ):
+        self.path = path or Config.CACHE_PATH
+        self.ttl = Config.CACHE_TTL if ttl is None else ttl
+        self.max_entries = Config.CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        system_prompt: Optional[str],
+        prompt: str,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Construit la clé de cache d'une requête
+
+        Args:
+            provider: Fournisseur LLM
+            model: Nom du modèle
+            temperature: Température de génération
+            max_tokens: Nombre maximum de tokens
+            system_prompt: Prompt système (la version du prompt y est reflétée)
+            prompt: Prompt utilisateur
+            extra: Paramètres additionnels transmis au fournisseur
+
+        Returns:
+            Clé hexadécimale
+        """
+        elements = [
+            provider,
+            model,
+            repr(float(temperature)),
+            str(max_tokens),
+            _hash(system_prompt),
+            _hash(prompt),
+            json.dumps(extra or {}, sort_keys=True, default=str),
+        ]
+        return _hash("\x1f".join(elements))
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Retourne la réponse en cache, ou None si absente ou expirée
+
+        Args:
+            key: Clé de cache
+
+        Returns:
+            La réponse mise en cache ou None
+        """
+        maintenant = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            response, created = row
+            if self.ttl and maintenant - created > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (maintenant, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return response
+
+    def set(self, key: str, response: str):
+        """
+        Enregistre une réponse et évince les entrées les moins récemment utilisées
+
+        Args:
+            key: Clé de cache
+            response: Réponse à conserver
+        """
+        maintenant = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, response, maintenant, maintenant),
+            )
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def clear(self):
+        """Vide le cache et remet les compteurs à zéro"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Retourne les compteurs du cache (hits, misses, entrées)"""
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Retourne l'instance de cache partagée par le processus"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,307 @@
+"""
+Comptage des tokens et planification du budget de contexte avant envoi
+Utilise le tokenizer du fournisseur quand il est disponible localement
+(tiktoken pour OpenAI), sinon une estimation rapide qui fonctionne hors ligne
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Optional, Tuple
+
+from app.config.config import Config, LLMProvider
+from app.utils.log_chunker import estimer_tokens
+
+
+# Fenêtres de contexte (tokens) par préfixe de nom de modèle ; le plus long préfixe l'emporte
+FENETRES_CONTEXTE = {
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-4-turbo": 128000,
+    "gpt-4-1106": 128000,
+    "gpt-4-0125": 128000,
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "o1": 200000,
+    "o3": 200000,
+    "claude-": 200000,
+    "gemini-1.5-pro": 2097152,
+    "gemini-1.5-flash": 1048576,
+    "gemini-2": 1048576,
+    "gemini-pro": 32760,
+    "mock-": 128000,
+}
+FENETRE_PAR_DEFAUT = 8192
+
+# Prix indicatifs en dollars par million de tokens (entrée, sortie)
+PRIX_PAR_MILLION = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4-32k": (60.00, 120.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-3-5-sonnet": (3.00, 15.00),
+    "claude-3-opus": (15.00, 75.00),
+    "claude-3-haiku": (0.25, 1.25),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
+
+# Prix relatif des tokens lus et écrits dans le cache de prompt, par fournisseur
+FACTEURS_CACHE = {
+    LLMProvider.OPENAI.value: (0.5, 1.0),
+    LLMProvider.CLAUDE.value: (0.1, 1.25),
+    LLMProvider.GOOGLE.value: (0.25, 1.0),
+}
+
+# Au-delà, le comptage exact coûte plus cher que l'estimation n'apporte
+MAX_CARACTERES_COMPTAGE_EXACT = 200000
+
+# Sortie minimale acceptée quand la réponse doit être raccourcie pour tenir dans la fenêtre
+SORTIE_MINIMALE = 1024
+
+MARQUEUR_TRONCATURE = "\n\n[... {n} caractères tronqués pour tenir dans la fenêtre de contexte ...]\n\n"
+
+
+def _par_prefixe(table: dict, model: str) -> Any:
+    meilleur = None
+    for prefixe in table:
+        if model.startswith(prefixe) and (meilleur is None or len(prefixe) > len(meilleur)):
+            meilleur = prefixe
+    return table[meilleur] if meilleur is not None else None
+
+
+def fenetre_contexte(model: str) -> int:
+    """Fenêtre de contexte d'un modèle (Config.CONTEXT_WINDOW l'emporte si défini)"""
+    if Config.CONTEXT_WINDOW:
+        return Config.CONTEXT_WINDOW
+    return _par_prefixe(FENETRES_CONTEXTE, model) or FENETRE_PAR_DEFAUT
+
+
+def prix_modele(model: str) -> Optional[Tuple[float, float]]:
+    """Prix (entrée, sortie) en dollars par million de tokens, ou None si inconnu"""
+    return _par_prefixe(PRIX_PAR_MILLION, model)
+
+
+def cout_usage(usage: Any) -> Optional[float]:
+    """
+    Coût estimé d'un appel terminé, en dollars, à partir de son usage réel
+
+    Args:
+        usage: TokenUsage de l'appel
+
+    Returns:
+        Coût estimé, ou None si l'usage ou le prix du modèle est inconnu
+    """
+    if usage is None:
+        return None
+    prix = prix_modele(usage.model)
+    if prix is None:
+        return None
+    lecture, ecriture = FACTEURS_CACHE.get(usage.provider, (1.0, 1.0))
+    entree = usage.input_tokens + usage.cache_read_tokens * lecture + usage.cache_write_tokens * ecriture
+    return (entree * prix[0] + usage.output_tokens * prix[1]) / 1_000_000
+
+
+@lru_cache(maxsize=16)
+def _encodeur_openai(model: str):
+    """Encodeur tiktoken du modèle, ou None (tiktoken absent ou tables indisponibles hors ligne)"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base" if model.startswith(("gpt-4o", "o1", "o3")) else "cl100k_base")
+    except Exception:
+        return None
+
+
+def compter_tokens(texte: str, provider: Optional[str] = None, model: Optional[str] = None) -> int:
+    """
+    Compte (ou estime) les tokens d'un texte pour un fournisseur/modèle
+
+    Args:
+        texte: Texte à mesurer
+        provider: Fournisseur LLM (par défaut: Config.LLM_PROVIDER)
+        model: Nom du modèle (par défaut: celui du fournisseur)
+
+    Returns:
+        Nombre de tokens (exact si le tokenizer est disponible, estimé sinon)
+    """
+    if not texte:
+        return 0
+    provider = provider or Config.LLM_PROVIDER
+    if provider == LLMProvider.OPENAI.value and len(texte) <= MAX_CARACTERES_COMPTAGE_EXACT:
+        encodeur = _encodeur_openai(model or Config.get_model(provider))
+        if encodeur is not None:
+            return len(encodeur.encode(texte, disallowed_special=()))
+    return estimer_tokens(texte)
+
+
+def tronquer(texte: str, max_tokens: int, provider: Optional[str] = None, model: Optional[str] = None) -> str:
+    """
+    Tronque un texte pour qu'il tienne dans un budget de tokens
+
+    Le début et la fin (souvent les lignes les plus récentes des logs) sont
+    conservés ; le milieu est remplacé par un marqueur.
+
+    Args:
+        texte: Texte à tronquer
+        max_tokens: Budget de tokens
+        provider: Fournisseur LLM
+        model: Nom du modèle
+
+    Returns:
+        Le texte, tronqué si nécessaire
+    """
+    tokens = compter_tokens(texte, provider, model)
+    if tokens <= max_tokens:
+        return texte
+    # Proportion de caractères à garder, avec une marge pour le marqueur et l'imprécision
+    garder = int(len(texte) * max_tokens / tokens * 0.95) - len(MARQUEUR_TRONCATURE) - 10
+    if garder <= 0:
+        return ""
+    debut = garder // 3
+    fin = garder - debut
+    return texte[:debut] + MARQUEUR_TRONCATURE.format(n=len(texte) - garder) + texte[len(texte) - fin:]
+
+
+@dataclass(frozen=True)
+class EstimationRequete:
+    """Estimation des tokens et du coût d'une requête"""
+    provider: str
+    model: str
+    tokens_systeme: int
+    tokens_prompt: int
+    tokens_sortie: int  # Sortie maximale demandée (max_tokens)
+    fenetre: int
+
+    @property
+    def tokens_entree(self) -> int:
+        return self.tokens_systeme + self.tokens_prompt
+
+    @property
+    def tokens_total(self) -> int:
+        return self.tokens_entree + self.tokens_sortie
+
+    @property
+    def depasse(self) -> bool:
+        """True si l'entrée et la sortie maximale ne tiennent pas dans la fenêtre"""
+        return self.tokens_total > self.fenetre
+
+    @property
+    def cout(self) -> Optional[float]:
+        """Coût maximal estimé en dollars (sortie maximale), None si le prix est inconnu"""
+        prix = prix_modele(self.model)
+        if prix is None:
+            return None
+        return (self.tokens_entree * prix[0] + self.tokens_sortie * prix[1]) / 1_000_000
+
+
+class ContextOverflowError(ValueError):
+    """La requête ne tient pas dans la fenêtre de contexte du modèle"""
+
+    def __init__(self, estimation: EstimationRequete):
+        super().__init__(
+            f"Requête trop volumineuse pour {estimation.model} : {estimation.tokens_entree} tokens "
+            f"en entrée + {estimation.tokens_sortie} en sortie > fenêtre de {estimation.fenetre} tokens"
+        )
+        self.estimation = estimation
+
+
+def estimer_requete(
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+    max_tokens: Optional[int] = None,
+) -> EstimationRequete:
+    """
+    Estime les tokens d'une requête et la compare à la fenêtre du modèle
+
+    Args:
+        prompt: Le prompt utilisateur
+        system_prompt: Prompt système
+        provider: Fournisseur LLM (par défaut: Config.LLM_PROVIDER)
+        model: Nom du modèle (par défaut: celui du fournisseur)
+        max_tokens: Sortie maximale (par défaut: Config.MAX_TOKENS)
+
+    Returns:
+        L'estimation de la requête
+    """
+    provider = provider or Config.LLM_PROVIDER
+    model = model or Config.get_model(provider)
+    return EstimationRequete(
+        provider=provider,
+        model=model,
+        tokens_systeme=compter_tokens(system_prompt or "", provider, model),
+        tokens_prompt=compter_tokens(prompt, provider, model),
+        tokens_sortie=max_tokens or Config.MAX_TOKENS,
+        fenetre=fenetre_contexte(model),
+    )
+
+
+def planifier_requete(
+    prompt: str,
+    system_prompt: Optional[str],
+    provider: str,
+    model: str,
+    max_tokens: int,
+    politique: Optional[str] = None,
+) -> Tuple[str, int]:
+    """
+    Adapte une requête à la fenêtre de contexte avant de l'envoyer
+
+    Si seule la sortie maximale déborde, elle est réduite (jusqu'à SORTIE_MINIMALE).
+    Sinon, selon la politique : "reject" lève ContextOverflowError (l'appelant
+    peut basculer sur un traitement par blocs), "truncate" tronque le prompt utilisateur.
+
+    Args:
+        prompt: Le prompt utilisateur
+        system_prompt: Prompt système
+        provider: Fournisseur LLM
+        model: Nom du modèle
+        max_tokens: Sortie maximale demandée
+        politique: "reject" ou "truncate" (par défaut: Config.CONTEXT_OVERFLOW_POLICY)
+
+    Returns:
+        Tuple (prompt, max_tokens) à envoyer
+
+    Raises:
+        ContextOverflowError: Si la requête ne peut pas tenir dans la fenêtre
+    """
+    politique = politique or Config.CONTEXT_OVERFLOW_POLICY
+    estimation = estimer_requete(prompt, system_prompt, provider, model, max_tokens)
+    if not estimation.depasse:
+        return prompt, max_tokens
+
+    sortie_minimale = min(max_tokens, SORTIE_MINIMALE)
+    disponible = estimation.fenetre - estimation.tokens_entree
+    if disponible >= sortie_minimale:
+        return prompt, disponible
+
+    if politique == "truncate":
+        budget_prompt = estimation.fenetre - estimation.tokens_systeme - sortie_minimale
+        if budget_prompt > 0:
+            return tronquer(prompt, budget_prompt, provider, model), sortie_minimale
+
+    raise ContextOverflowError(estimation)
+
+
+def budget_prompt(
+    system_prompt: Optional[str],
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+    max_tokens: Optional[int] = None,
+) -> int:
+    """Tokens disponibles pour le prompt utilisateur, prompt système et sortie maximale déduits"""
+    estimation = estimer_requete("", system_prompt, provider, model, max_tokens)
+    return estimation.fenetre - estimation.tokens_systeme - estimation.tokens_sortie
@@ -0,0 +1,121 @@
+"""
+Consommation de tokens des appels LLM, y compris le cache de prompt des fournisseurs
+(lecture/écriture du cache Anthropic, préfixes mis en cache par OpenAI et Gemini)
+"""
+
+import contextvars
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Optional
+
+
+@dataclass(frozen=True)
+class TokenUsage:
+    """Tokens consommés par un appel"""
+    provider: str
+    model: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0   # Tokens d'entrée servis depuis le cache du fournisseur
+    cache_write_tokens: int = 0  # Tokens d'entrée écrits dans le cache (Anthropic)
+    cached_response: bool = False  # Réponse servie par le cache local, sans appel
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        """Part des tokens d'entrée lus depuis le cache du fournisseur"""
+        total = self.input_tokens + self.cache_read_tokens + self.cache_write_tokens
+        return self.cache_read_tokens / total if total else 0.0
+
+
+def _int(obj: Any, name: str) -> int:
+    value = getattr(obj, name, None) if obj is not None else None
+    return value if isinstance(value, int) else 0
+
+
+def from_openai(provider: str, model: str, usage: Any) -> Optional[TokenUsage]:
+    """
+    Usage d'une réponse OpenAI
+
+    prompt_tokens inclut les tokens lus depuis le cache : ils sont décomptés
+    de input_tokens pour que les trois compteurs d'entrée soient disjoints.
+    """
+    if usage is None:
+        return None
+    cached = _int(getattr(usage, "prompt_tokens_details", None), "cached_tokens")
+    return TokenUsage(
+        provider=provider,
+        model=model,
+        input_tokens=_int(usage, "prompt_tokens") - cached,
+        output_tokens=_int(usage, "completion_tokens"),
+        cache_read_tokens=cached,
+    )
+
+
+def from_anthropic(provider: str, model: str, usage: Any) -> Optional[TokenUsage]:
+    """Usage d'une réponse Anthropic (input_tokens exclut déjà les tokens du cache)"""
+    if usage is None:
+        return None
+    return TokenUsage(
+        provider=provider,
+        model=model,
+        input_tokens=_int(usage, "input_tokens"),
+        output_tokens=_int(usage, "output_tokens"),
+        cache_read_tokens=_int(usage, "cache_read_input_tokens"),
+        cache_write_tokens=_int(usage, "cache_creation_input_tokens"),
+    )
+
+
+def from_gemini(provider: str, model: str, usage: Any) -> Optional[TokenUsage]:
+    """Usage d'une réponse Gemini (usage_metadata)"""
+    if usage is None:
+        return None
+    cached = _int(usage, "cached_content_token_count")
+    return TokenUsage(
+        provider=provider,
+        model=model,
+        input_tokens=_int(usage, "prompt_token_count") - cached,
+        output_tokens=_int(usage, "candidates_token_count"),
+        cache_read_tokens=cached,
+    )
+
+
+# Dernier usage enregistré, par thread (chaque appelant lit le sien)
+_local = threading.local()
+
+# Usages collectés pendant une opération, y compris dans les threads qui héritent du contexte
+_collector: contextvars.ContextVar[Optional[List[TokenUsage]]] = contextvars.ContextVar(
+    "usage_collector", default=None
+)
+
+
+def set_last_usage(usage: Optional[TokenUsage]):
+    """Enregistre l'usage du dernier appel du thread courant"""
+    _local.usage = usage
+    collector = _collector.get()
+    if collector is not None and usage is not None:
+        collector.append(usage)
+
+
+@contextmanager
+def collect_usage() -> Iterator[List[TokenUsage]]:
+    """
+    Collecte l'usage de tous les appels effectués dans le bloc
+
+    Contrairement à get_last_usage, inclut les appels multiples d'une même
+    opération (analyse par blocs puis fusion, par exemple).
+
+    Yields:
+        La liste des usages, complétée au fil des appels
+    """
+    usages: List[TokenUsage] = []
+    token = _collector.set(usages)
+    try:
+        yield usages
+    finally:
+        _collector.reset(token)
+
+
+def get_last_usage() -> Optional[TokenUsage]:
+    """Usage du dernier appel du thread courant (None si inconnu)"""
+    return getattr(_local, "usage", None)
@@ -0,0 +1,88 @@
+"""
+Vérification de bout en bout de l'analyse par blocs sur une petite fenêtre de contexte
+
+Fait tourner analyser et analyser_par_blocs avec le fournisseur simulé sur
+un modèle à 8192 tokens (gpt-4) et des logs qui doivent être découpés : les
+analyses partielles, les synthèses intermédiaires et la fusion finale doivent
+tenir dans la fenêtre. Le scénario "reponses_longues" simule un modèle qui
+ignore max_tokens. Retourne 1 si une analyse échoue.
+
+Usage :
+    python benchmarks/analyse_petite_fenetre.py [--lignes 6000] [--scenarios ...]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ERREUR = "Erreur lors de l'analyse:"
+
+# Scénario -> variables d'environnement du fournisseur simulé
+SCENARIOS = {
+    "reponses_bornees": {"MOCK_OUTPUT_TOKENS": "1500"},
+    "reponses_longues": {"MOCK_RESPONSE": "analyse partielle détaillée " * 1500},
+}
+
+
+def executer(lignes: int) -> int:
+    """Analyse des logs synthétiques dans le processus courant (environnement déjà configuré)"""
+    sys.path.insert(0, REPO_ROOT)
+    from tools_throughput import generer_logs
+
+    from app.tools.analyseur_logs import AnalyseurLogs
+
+    logs = generer_logs(lignes)
+    analyseur = AnalyseurLogs(prompt_version="vFinal")
+    echecs = 0
+    for methode in ("analyser_par_blocs", "analyser"):
+        resultat = getattr(analyseur, methode)(logs)
+        if resultat.startswith(ERREUR):
+            print(f"ÉCHEC {methode}: {resultat[:200]}", file=sys.stderr)
+            echecs += 1
+        else:
+            print(f"{methode}: {len(resultat)} caractères", file=sys.stderr)
+    return 1 if echecs else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lignes", type=int, default=6000, help="Lignes de logs analysées (défaut: 6000)")
+    parser.add_argument("--scenarios", nargs="*", choices=list(SCENARIOS), help="Scénarios (défaut: tous)")
+    parser.add_argument("--interne", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interne:
+        return executer(args.lignes)
+
+    # Un processus par scénario : Config et le client simulé lisent l'environnement au démarrage
+    code = 0
+    for nom in args.scenarios or list(SCENARIOS):
+        environnement = dict(os.environ)
+        environnement.update({
+            "LLM_PROVIDER": "mock",
+            "LLM_FALLBACK_PROVIDERS": "",
+            "MOCK_MODEL": "gpt-4",
+            "MOCK_LATENCY": "0",
+            "MOCK_TOKENS_PER_SECOND": "0",
+            "CACHE_ENABLED": "false",
+            "LLM_RPM_LIMIT": "0",
+            "LLM_TPM_LIMIT": "0",
+            "MAX_TOKENS": "2000",
+            "CONTEXT_WINDOW": "0",
+        })
+        environnement.update(SCENARIOS[nom])
+        print(f"{nom}:", file=sys.stderr)
+        retour = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--interne", "--lignes", str(args.lignes)],
+            env=environnement,
+        ).returncode
+        code = code or retour
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
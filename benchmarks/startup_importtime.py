@@ -0,0 +1,117 @@
+"""
+Benchmark du temps de démarrage (python -X importtime)
+
+Mesure, dans un interpréteur neuf, le temps d'import des points d'entrée
+(CLI, outils) et vérifie qu'aucun module lourd (streamlit, SDK des
+fournisseurs) n'est chargé au démarrage. Code de retour 1 si un budget
+est dépassé ou si un module interdit est importé.
+
+Usage :
+    python benchmarks/startup_importtime.py [--repetitions 5] [--facteur 1.0]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Set, Tuple
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Scénario -> (instruction d'import, budget en millisecondes)
+SCENARIOS: Dict[str, Tuple[str, float]] = {
+    "package": ("import app.tools", 25.0),
+    "config": ("import app.config.config", 25.0),
+    "cli": ("import app.cli", 40.0),
+    "cli_analyseur": ("import app.cli, app.tools.analyseur_logs", 90.0),
+    "cli_generateur": ("import app.cli, app.tools.generateur_scripts", 90.0),
+}
+
+# Modules qui ne doivent jamais être chargés au démarrage
+FORBIDDEN = (
+    "streamlit",
+    "openai",
+    "anthropic",
+    "google.generativeai",
+    "httpx",
+    "asyncio",
+)
+
+
+def measure(statement: str) -> Tuple[float, Set[str]]:
+    """
+    Importe `statement` dans un interpréteur neuf
+
+    Returns:
+        (durée totale des imports en ms, noms des modules importés)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+        # Seuls les imports de premier niveau sont additionnés (le cumul inclut les autres)
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def run(repetitions: int, facteur: float) -> Tuple[Dict, List[str]]:
+    """Exécute tous les scénarios et retourne (rapport, liste des échecs)"""
+    report = {}
+    failures = []
+    for name, (statement, budget_ms) in SCENARIOS.items():
+        durations = []
+        modules: Set[str] = set()
+        for _ in range(repetitions):
+            duration, modules = measure(statement)
+            durations.append(duration)
+        median = statistics.median(durations)
+        budget = budget_ms * facteur
+        forbidden = sorted(
+            m for m in modules if any(m == f or m.startswith(f + ".") for f in FORBIDDEN)
+        )
+        report[name] = {
+            "import": statement,
+            "median_ms": round(median, 2),
+            "min_ms": round(min(durations), 2),
+            "budget_ms": budget,
+            "modules": len(modules),
+            "interdits": forbidden,
+        }
+        if median > budget:
+            failures.append(f"{name}: {median:.1f} ms > budget {budget:.1f} ms")
+        if forbidden:
+            failures.append(f"{name}: modules interdits importés: {', '.join(forbidden)}")
+    return report, failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repetitions", type=int, default=5,
+                        help="Nombre de mesures par scénario (médiane retenue)")
+    parser.add_argument("--facteur", type=float, default=1.0,
+                        help="Multiplicateur des budgets (machines lentes, CI)")
+    args = parser.parse_args()
+
+    report, failures = run(max(1, args.repetitions), args.facteur)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    for failure in failures:
+        print(f"RÉGRESSION {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
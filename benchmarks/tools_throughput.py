@@ -0,0 +1,246 @@
+"""
+Benchmark hors ligne des outils avec le fournisseur simulé (LLM_PROVIDER=mock)
+
+Fait tourner chaque outil sur des entrées représentatives (petits et très
+gros logs, descriptions courtes) puis simule des utilisateurs simultanés.
+Pour chaque scénario : débit, percentiles de latence et pic mémoire
+(tracemalloc), au format JSON. Avec --reference, compare à une mesure
+précédente et retourne 1 en cas de régression.
+
+Usage :
+    python benchmarks/tools_throughput.py [--latence 0.05] [--debit 0] [--echelle 1.0]
+        [--sortie baseline.json] [--reference baseline.json] [--tolerance 0.25]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Préfixes des réponses d'erreur des outils (qui retournent l'erreur au lieu de la lever)
+ERREURS = ("Erreur lors de l'analyse:", "Erreur lors de la génération:", "Erreur lors du diagnostic:")
+
+# Métriques comparées à la référence : (clé, True si une hausse est une régression,
+# écart absolu en dessous duquel la variation est ignorée)
+METRIQUES_REFERENCE = (
+    ("debit_rps", False, 0.0),
+    ("latence_p95_ms", True, 5.0),
+    ("memoire_pic_mo", True, 0.5),
+)
+
+NIVEAUX = ("INFO", "INFO", "INFO", "WARNING", "ERROR", "DEBUG")
+MESSAGES = (
+    "Connection from 10.0.{a}.{b} port {port} accepted",
+    "Failed password for user{b} from 192.168.{a}.{b} port {port} ssh2",
+    "nginx upstream timed out (110: Connection timed out) while reading response header",
+    "Out of memory: Killed process {port} (java) total-vm:{b}kB",
+    "GET /api/v1/items/{port} HTTP/1.1 200 {b}",
+    "disk /dev/sda{a} usage at {b}%",
+)
+
+
+def generer_logs(lignes: int, graine: int = 0) -> str:
+    """Logs syslog synthétiques, reproductibles"""
+    hasard = random.Random(graine)
+    sortie = []
+    for i in range(lignes):
+        message = hasard.choice(MESSAGES).format(
+            a=hasard.randint(0, 9), b=hasard.randint(0, 255), port=hasard.randint(1024, 65535)
+        )
+        sortie.append(
+            f"2024-01-15T{(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d} "
+            f"srv{hasard.randint(1, 4)} app[{1000 + i % 50}]: {hasard.choice(NIVEAUX)} {message}"
+        )
+    return "\n".join(sortie)
+
+
+def percentile(valeurs: List[float], q: float) -> float:
+    """Percentile par rang le plus proche (valeurs non vides)"""
+    ordonnees = sorted(valeurs)
+    rang = min(len(ordonnees) - 1, max(0, int(round(q * len(ordonnees) + 0.5)) - 1))
+    return ordonnees[rang]
+
+
+def construire_scenarios(echelle: float) -> Dict[str, Tuple[Callable[[int], Callable[[], str]], int, int]]:
+    """
+    Scénarios : nom -> (fabrique d'appel pour la requête i, requêtes, utilisateurs simultanés)
+
+    Les entrées sont générées une fois, avant toute mesure.
+    """
+    from app.tools.analyseur_logs import AnalyseurLogs
+    from app.tools.architecte_docker_k8s import ArchitecteDockerK8s
+    from app.tools.generateur_doc_infra import GenerateurDocInfra
+    from app.tools.generateur_scripts import GenerateurScripts
+    from app.tools.troubleshooting_reseau import TroubleshootingReseau
+
+    version = "vFinal"
+    petits_logs = generer_logs(max(10, int(200 * echelle)), graine=1)
+    gros_logs = generer_logs(max(1000, int(200000 * echelle)), graine=2)
+
+    analyseur = AnalyseurLogs(prompt_version=version)
+    outils = {
+        "generateur_scripts": (GenerateurScripts(prompt_version=version).generer,
+                               "Script bash de sauvegarde quotidienne de /etc avec rotation sur 7 jours"),
+        "architecte_docker_k8s": (ArchitecteDockerK8s(prompt_version=version).generer,
+                                  "API Flask + PostgreSQL + Redis, 3 réplicas, ingress TLS"),
+        "troubleshooting_reseau": (TroubleshootingReseau(prompt_version=version).diagnostiquer,
+                                   "Résolution DNS lente depuis les conteneurs, ping OK vers 8.8.8.8"),
+        "generateur_doc_infra": (GenerateurDocInfra(prompt_version=version).generer,
+                                 "2 load balancers HAProxy, 4 serveurs web, 1 cluster PostgreSQL primaire/réplica"),
+    }
+
+    def suffixe(i: int) -> str:
+        # Entrées toutes différentes : aucun regroupement ni cache ne fausse la mesure
+        return f"\n# requête {i}"
+
+    scenarios = {
+        "analyseur_petits_logs": (lambda i: lambda: analyseur.analyser(petits_logs + suffixe(i)), 20, 1),
+        "analyseur_gros_logs": (lambda i: lambda: analyseur.analyser(gros_logs + suffixe(i)), 2, 1),
+        "analyseur_gros_logs_pretraitement": (
+            lambda i: lambda: analyseur.analyser((gros_logs + suffixe(i)).splitlines(), pretraitement=True), 2, 1,
+        ),
+    }
+    for nom, (methode, texte) in outils.items():
+        scenarios[nom] = (lambda i, m=methode, t=texte: lambda: m(t + suffixe(i)), 20, 1)
+
+    melange = [(analyseur.analyser, petits_logs)] + list(outils.values())
+    scenarios["utilisateurs_simultanes"] = (
+        lambda i: lambda: melange[i % len(melange)][0](melange[i % len(melange)][1] + suffixe(i)),
+        max(20, int(200 * echelle)),
+        16,
+    )
+    return scenarios
+
+
+def mesurer(fabrique: Callable[[int], Callable[[], str]], requetes: int, utilisateurs: int) -> Dict:
+    """Chronomètre un scénario (sans tracemalloc, qui ralentit l'exécution)"""
+    latences: List[float] = []
+    erreurs = 0
+
+    def executer(i: int) -> Tuple[float, bool]:
+        appel = fabrique(i)
+        debut = time.perf_counter()
+        resultat = appel()
+        return time.perf_counter() - debut, isinstance(resultat, str) and resultat.startswith(ERREURS)
+
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=utilisateurs) as executor:
+        for latence, en_erreur in executor.map(executer, range(requetes)):
+            latences.append(latence)
+            erreurs += en_erreur
+    duree = time.perf_counter() - debut
+
+    return {
+        "requetes": requetes,
+        "utilisateurs": utilisateurs,
+        "erreurs": erreurs,
+        "duree_s": round(duree, 3),
+        "debit_rps": round(requetes / duree, 2),
+        "latence_p50_ms": round(percentile(latences, 0.50) * 1000, 2),
+        "latence_p95_ms": round(percentile(latences, 0.95) * 1000, 2),
+        "latence_p99_ms": round(percentile(latences, 0.99) * 1000, 2),
+    }
+
+
+def pic_memoire(fabrique: Callable[[int], Callable[[], str]], utilisateurs: int) -> float:
+    """Pic d'allocation (Mo) d'une vague de requêtes simultanées (entrées générées avant la mesure)"""
+    appels = [fabrique(i) for i in range(utilisateurs)]
+    tracemalloc.start()
+    try:
+        with ThreadPoolExecutor(max_workers=utilisateurs) as executor:
+            list(executor.map(lambda appel: appel(), appels))
+        _, pic = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(pic / (1024 * 1024), 2)
+
+
+def comparer(rapport: Dict, reference: Dict, tolerance: float) -> List[str]:
+    """Liste les régressions au-delà de la tolérance relative"""
+    if reference.get("parametres") != rapport["parametres"]:
+        return [f"paramètres différents de la référence: {reference.get('parametres')} != {rapport['parametres']}"]
+    regressions = []
+    for nom, mesures in rapport["scenarios"].items():
+        ancien = reference.get("scenarios", {}).get(nom)
+        if not ancien:
+            continue
+        for cle, hausse_mauvaise, plancher in METRIQUES_REFERENCE:
+            avant, apres = ancien.get(cle), mesures.get(cle)
+            if not avant or apres is None or abs(apres - avant) <= plancher:
+                continue
+            variation = (apres - avant) / avant
+            if (variation if hausse_mauvaise else -variation) > tolerance:
+                regressions.append(f"{nom}: {cle} {avant} -> {apres} ({variation:+.0%})")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latence", type=float, default=0.05,
+                        help="Latence simulée avant le premier token, en secondes (défaut: 0.05)")
+    parser.add_argument("--debit", type=float, default=0,
+                        help="Débit simulé en tokens/s (défaut: 0, génération instantanée)")
+    parser.add_argument("--echelle", type=float, default=1.0,
+                        help="Multiplicateur de la taille des entrées et du nombre de requêtes")
+    parser.add_argument("--scenarios", nargs="*", help="Scénarios à exécuter (défaut: tous)")
+    parser.add_argument("--sortie", "-o", help="Fichier JSON où écrire le rapport (référence future)")
+    parser.add_argument("--reference", help="Rapport JSON de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Dégradation relative tolérée par rapport à la référence (défaut: 0.25)")
+    args = parser.parse_args()
+
+    # Avant l'import de Config, qui lit les variables d'environnement
+    os.environ.update({
+        "LLM_PROVIDER": "mock",
+        "LLM_FALLBACK_PROVIDERS": "",
+        "CACHE_ENABLED": "false",
+        "LLM_RPM_LIMIT": "0",
+        "LLM_TPM_LIMIT": "0",
+        "MOCK_LATENCY": str(args.latence),
+        "MOCK_TOKENS_PER_SECOND": str(args.debit),
+    })
+    sys.path.insert(0, REPO_ROOT)
+
+    scenarios = construire_scenarios(args.echelle)
+    selection = args.scenarios or list(scenarios)
+    inconnus = [nom for nom in selection if nom not in scenarios]
+    if inconnus:
+        parser.error(f"Scénarios inconnus: {', '.join(inconnus)}")
+
+    rapport = {
+        "python": sys.version.split()[0],
+        "parametres": {"latence_s": args.latence, "debit_tps": args.debit, "echelle": args.echelle},
+        "scenarios": {},
+    }
+    for nom in selection:
+        fabrique, requetes, utilisateurs = scenarios[nom]
+        mesures = mesurer(fabrique, requetes, utilisateurs)
+        mesures["memoire_pic_mo"] = pic_memoire(fabrique, utilisateurs)
+        rapport["scenarios"][nom] = mesures
+        print(f"{nom}: {mesures['debit_rps']} req/s, p95 {mesures['latence_p95_ms']} ms", file=sys.stderr)
+
+    sortie = json.dumps(rapport, indent=2, ensure_ascii=False)
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            f.write(sortie + "\n")
+    print(sortie)
+
+    if args.reference:
+        with open(args.reference, "r", encoding="utf-8") as f:
+            regressions = comparer(rapport, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"RÉGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())